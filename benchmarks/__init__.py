@@ -0,0 +1,14 @@
+"""
+Tools to measure the performance of bomcheck.
+
+generate_boms:  writes synthetic, matched _sw/_sl BOM files (and optionally
+                a slow moving parts _sm file) for bomcheck to work on.
+bench_stages:   times each stage of bomcheck over datasets of increasing
+                size and saves the results to a JSON file.
+bench_startup:  times "import bomcheck", "bomcheck --version", and "bomcheck
+                --help", and fails if they import pandas.
+
+Run from the top directory of the bomcheck project, e.g.:
+
+    python -m benchmarks.bench_stages --assys 5,20,80 --out bench.json
+"""
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Time each stage of bomcheck on synthetic BOMs of increasing size and save
+the results to a JSON file.  Results from different versions of bomcheck,
+or different machines, can then be compared.  Example:
+
+    python -m benchmarks.bench_stages --assys 5,20,80 --out bench.json
+
+Stages timed:  get_fnames, gatherBOMs_from_fnames, deconstructMultilevelBOM,
+convert_sw_bom_to_sl_format, compare_a_sw_bom_to_a_sl_bom, concat_boms,
+export2xlsx, check_sm_parts, and bomcheck (i.e. all stages together).
+
+Each stage is run --repeat times.  The best (lowest) time, and all times,
+are recorded in seconds.  Only the stage itself is timed; inputs that a
+stage needs are prepared beforehand.
+"""
+
+import argparse
+import contextlib
+import copy
+import datetime
+import glob
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+from benchmarks.generate_boms import generate_boms
+
+
+def timeit(func, repeat, setup=None):
+    ''' Run func repeat times and return {'best': seconds, 'runs': [seconds,
+    ...]}.  If setup is given, it is called before each run, untimed, and
+    what it returns is passed to func.'''
+    runs = []
+    for _ in range(repeat):
+        args = setup() if setup else ()
+        with contextlib.redirect_stdout(io.StringIO()):  # bomcheck's messages aren't wanted
+            t0 = time.perf_counter()
+            func(*args)
+            runs.append(time.perf_counter() - t0)
+    return {'best': min(runs), 'runs': runs}
+
+
+def bench_dataset(bc, dirname, repeat):
+    ''' Time each stage of bomcheck on the BOM files in dirname.
+
+    Parameters
+    ----------
+    bc: module
+        The bomcheck module.
+    dirname: str
+        Directory containing _sw, _sl, and (optionally) _sm files.
+    repeat: int
+        No. of times to run each stage.
+
+    Returns
+    -------
+    out: dict
+        {stage name: {'best': seconds, 'runs': [seconds, ...]}, ...}
+    '''
+    import pandas as pd
+    bc.set_globals()
+    cfg = bc.cfg
+    stages = {}
+    stages['get_fnames'] = timeit(lambda: bc.get_fnames(dirname), repeat)
+    fnames = bc.get_fnames(dirname)
+    stages['gatherBOMs_from_fnames'] = timeit(lambda: bc.gatherBOMs_from_fnames(fnames), repeat)
+    with contextlib.redirect_stdout(io.StringIO()):
+        _, swdic, sldic, smdic = bc.gatherBOMs_from_fnames(fnames)
+
+    raw_sl = []   # SL BOMs as read from files, before being deconstructed
+    for f in sorted(glob.glob(os.path.join(dirname, '*_sl.xlsx'))):
+        k = os.path.basename(f)
+        raw_sl.append((k[:k.find('_')], pd.read_excel(f, na_values=[' '], engine='calamine')))
+
+    def deconstruct(frames):
+        for k, df in frames:
+            bc.deconstructMultilevelBOM(df, 'sl', k, True)
+    stages['deconstructMultilevelBOM'] = timeit(
+        deconstruct, repeat, lambda: ([(k, df.copy()) for k, df in raw_sl],))
+
+    def convert(frames):
+        for df in frames:
+            bc.convert_sw_bom_to_sl_format(df)
+    stages['convert_sw_bom_to_sl_format'] = timeit(
+        convert, repeat, lambda: ([df.copy() for df in swdic.values()],))
+
+    def key2(key):
+        return key.replace(' ', '') if cfg['del_whitespace'] else key
+    with contextlib.redirect_stdout(io.StringIO()):
+        converted = {key2(k): bc.convert_sw_bom_to_sl_format(df.copy())
+                     for k, df in swdic.items() if key2(k) in sldic}
+
+    def compare(pairs):
+        for dfsw, dfsl in pairs:
+            bc.compare_a_sw_bom_to_a_sl_bom(dfsw, dfsl)
+    stages['compare_a_sw_bom_to_a_sl_bom'] = timeit(
+        compare, repeat, lambda: ([(df.copy(), sldic[k].copy()) for k, df in converted.items()],))
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        lone, combined = bc.collect_checked_boms(copy.deepcopy(swdic), copy.deepcopy(sldic))
+    stages['concat_boms'] = timeit(
+        bc.concat_boms, repeat, lambda: ([(k, v.copy()) for k, v in lone.items()],
+                                         [(k, v.copy()) for k, v in combined.items()]))
+    results = bc.concat_boms([(k, v.copy()) for k, v in lone.items()],
+                             [(k, v.copy()) for k, v in combined.items()])
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        if results[1]:
+            df = results[1][0][1]
+            stages['export2xlsx'] = timeit(
+                lambda: bc.export2xlsx(os.path.join(tmpdir, 'bomcheck'), df, True), repeat)
+
+    if smdic:
+        cfg.update({'similar': '40', 'filter_age': '0', 'repeat': False, 'show_demand': False,
+                    'on_hand': False, 'filter_descrip': None, 'filter_pn': r'....-....-',
+                    'drop_bool': False})
+        stages['check_sm_parts'] = timeit(
+            bc.check_sm_parts.check_sm_parts, repeat,
+            lambda: ([copy.deepcopy(swdic), copy.deepcopy(sldic)], copy.deepcopy(smdic), cfg))
+
+    stages['bomcheck'] = timeit(lambda: bc.bomcheck(dirname), repeat)
+    return stages
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Time each stage of bomcheck on synthetic BOMs.')
+    parser.add_argument('--assys', default='5,20,80',
+                        help='comma separated list of no. of _sw/_sl file pairs; one dataset per value')
+    parser.add_argument('--depth', type=int, default=2, help='subassembly levels')
+    parser.add_argument('--rows', type=int, default=20, help='rows per assembly')
+    parser.add_argument('--subs', type=int, default=2, help='subassemblies per assembly')
+    parser.add_argument('--mismatch', type=float, default=0.05, help='mismatch rate')
+    parser.add_argument('--um_mix', type=float, default=0.2, help='fraction of non-default length units')
+    parser.add_argument('--fmt', choices=['xlsx', 'csv'], default='xlsx', help='format of _sw files')
+    parser.add_argument('--sm_rows', type=int, default=500,
+                        help='rows in the slow moving parts BOM (0: no check_sm_parts benchmark)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3, help='no. of times each stage is run')
+    parser.add_argument('--src', default=os.path.join(os.path.dirname(os.path.dirname(
+                        os.path.abspath(__file__))), 'src'),
+                        help='directory containing the bomcheck.py to benchmark.  '
+                        'Default: the src directory of this project')
+    parser.add_argument('--out', default='bench.json', help='JSON file to write results to')
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.abspath(args.src))
+    import pandas as pd
+    import bomcheck as bc
+
+    report = {'bomcheck_version': bc.__version__, 'bomcheck_file': os.path.abspath(bc.__file__),
+              'python': platform.python_version(), 'pandas': pd.__version__,
+              'platform': platform.platform(), 'cpus': os.cpu_count(),
+              'date': datetime.datetime.now().isoformat(timespec='seconds'),
+              'params': {k: v for k, v in vars(args).items() if k not in ('out', 'src')},
+              'datasets': []}
+    for n in [int(a) for a in args.assys.split(',')]:
+        with tempfile.TemporaryDirectory() as dirname:
+            counts = generate_boms(dirname, n, args.depth, args.rows, args.mismatch, args.um_mix,
+                                   args.fmt, args.subs, args.sm_rows, args.seed)
+            stages = bench_dataset(bc, dirname, args.repeat)
+        report['datasets'].append({'assys': n, 'counts': counts, 'stages': stages})
+        print(f'{n} assys: ' + ', '.join(f'{k} {v["best"]:.3f}s' for k, v in stages.items()))
+        with open(args.out, 'w') as f:   # write after each dataset, in case a later one is interrupted
+            json.dump(report, f, indent=2)
+    print('Results written to ' + args.out)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Time how long "import bomcheck", "bomcheck --version", and "bomcheck --help"
+take, and check that none of them imports pandas or the other modules that
+bomcheck only needs when it actually checks BOMs.  Example:
+
+    python -m benchmarks.bench_startup --repeat 10 --max_ms 400
+
+Exits with status 1 if a heavy module is imported, or if the median time of
+a command exceeds --max_ms; so it can be used to guard against startup time
+regressions.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+
+# modules that should not be imported unless BOMs are checked
+HEAVY = ['pandas', 'numpy', 'check_sm_parts', 'difflib', 'python_calamine',
+         'tomllib', 'tomli', 'webbrowser']
+
+# each command ends by printing the heavy modules that were imported
+COMMANDS = {
+    'import': "import bomcheck",
+    '--version': "sys.argv = ['bomcheck', '--version']\n"
+                 "import bomcheck\n"
+                 "try:\n    bomcheck.main()\nexcept SystemExit:\n    pass",
+    '--help': "sys.argv = ['bomcheck', '--help']\n"
+              "import bomcheck\n"
+              "try:\n    bomcheck.main()\nexcept SystemExit:\n    pass",
+}
+
+
+def run(code, src):
+    ''' Run code in a new python process.  Return (seconds, heavy modules
+    imported).'''
+    code = ('import sys, io, contextlib\n'
+            f'sys.path.insert(0, {src!r})\n'
+            'with contextlib.redirect_stdout(io.StringIO()):\n'
+            + ''.join('    ' + line + '\n' for line in code.splitlines()) +
+            f'print(",".join(m for m in {HEAVY!r} if m in sys.modules))\n')
+    t0 = time.perf_counter()
+    p = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True)
+    seconds = time.perf_counter() - t0
+    if p.returncode:
+        raise RuntimeError(p.stderr)
+    imported = p.stdout.strip().splitlines()[-1] if p.stdout.strip() else ''
+    return seconds, [m for m in imported.split(',') if m]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Time the startup of bomcheck.')
+    parser.add_argument('--repeat', type=int, default=10, help='no. of times each command is run')
+    parser.add_argument('--max_ms', type=float, default=None,
+                        help='fail if the median time of a command exceeds this many milliseconds')
+    parser.add_argument('--src', default=os.path.join(os.path.dirname(os.path.dirname(
+                        os.path.abspath(__file__))), 'src'),
+                        help='directory containing the bomcheck.py to benchmark.  '
+                        'Default: the src directory of this project')
+    parser.add_argument('--out', help='JSON file to write results to')
+    args = parser.parse_args()
+
+    src = os.path.abspath(args.src)
+    report = {'python': sys.version.split()[0], 'src': src, 'commands': {}}
+    failed = False
+    for name, code in COMMANDS.items():
+        times, imported = [], []
+        for _ in range(args.repeat):
+            seconds, imported = run(code, src)
+            times.append(seconds)
+        median_ms = statistics.median(times) * 1000
+        report['commands'][name] = {'median_ms': median_ms, 'runs_ms': [t * 1000 for t in times],
+                                    'heavy_imports': imported}
+        status = ''
+        if imported:
+            status += '  FAIL: imported ' + ', '.join(imported)
+            failed = True
+        if args.max_ms is not None and median_ms > args.max_ms:
+            status += f'  FAIL: slower than {args.max_ms:g} ms'
+            failed = True
+        print(f'{name:<12}{median_ms:8.1f} ms{status}')
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Generate synthetic, matched SolidWorks (_sw) and SyteLine (_sl) BOM files,
+and optionally a slow moving parts (_sm) BOM, for benchmarking bomcheck.
+
+Output is deterministic: the same arguments and seed always produce the
+same files.  Example:
+
+    python -m benchmarks.generate_boms C:/tmp/boms --assys 200 --depth 2
+"""
+
+import argparse
+import os
+import random
+from datetime import date, timedelta
+import pandas as pd
+
+
+DESCRIPS = ['ELBOW {s}" SR 90° FNPT 150# 316SS', 'NIPPLE {s}"MNPT X CLOSE 316SS',
+            'VLV BALL {s}" FNPT FP 2-PC 316/TF', 'BUSHING {s}"MNPT X .50"FNPT 316SS',
+            'GAUGE TMP {s}" 20-240°F 3" DIAL 304 SS', 'UNION {s}" FNPT 150# CS',
+            'SWITCH LEVEL {s}" MNPT N7 SST/SST', 'MOTOR {s}HP 4P 460V 254TC PREM',
+            'VLV SOL 2WAY {s}" 1PSI SS/VT 120V N4', 'CROSS {s}" FNPT 150# 316SS',
+            'STRAINER Y {s}" FNPT 316/316 SS', 'FLANGE ASSY {s}"150#X2"NPT CS/TEFL']
+STOCK = ['PIPE {s}" NOM DIA X SCH40 316SS', 'ANGLE 1/4"X{s}"X2"X20FT A-36 CS',
+         'CHANNEL C{s}X4.1 20FT ASTM A36 CS', 'STOCK FLAT 1/8"X{s}"X20FT CS']
+SIZES = ['.25', '.38', '.50', '.75', '1.0', '1.5', '2.0', '2.5', '3.0']
+# (unit string appended to a SW length, factor from inches to that unit)
+LENGTH_UMS = [('', 1.0), ('in', 1.0), ('mm', 25.4), ('ft', 1/12)]
+
+
+def _pn(rng, prefixes):
+    return '{}-{:04d}-{:03d}'.format(rng.choice(prefixes), rng.randrange(10000),
+                                     rng.randrange(1000))
+
+
+def _build_assy(rng, pn, descrip, depth, rows_per_assy, prefixes, um_mix, subs_per_assy):
+    ''' Recursively build an assembly.  Returns a dict with keys pn,
+    descrip, and rows.  Each row is a dict: pn, descrip, qty, length_in,
+    sw_um, children (an assy dict or None).'''
+    rows = []
+    n_subs = subs_per_assy if depth > 0 else 0
+    for i in range(rows_per_assy):
+        row = {'qty': rng.randint(1, 8), 'length_in': None, 'sw_um': ('', 1.0),
+               'children': None}
+        if i < n_subs:
+            row['pn'] = _pn(rng, prefixes)
+            row['descrip'] = 'SUBASSY ' + row['pn']
+            row['qty'] = 1
+            row['children'] = _build_assy(rng, row['pn'], row['descrip'], depth - 1,
+                                          rows_per_assy, prefixes, um_mix, subs_per_assy)
+        elif rng.random() < 0.2:
+            row['pn'] = _pn(rng, ['5500', '6600', '6602', '6652'])
+            row['descrip'] = rng.choice(STOCK).format(s=rng.choice(SIZES))
+            row['length_in'] = round(rng.uniform(2, 120), 2)
+            if rng.random() < um_mix:
+                row['sw_um'] = rng.choice(LENGTH_UMS[1:])
+        else:
+            row['pn'] = _pn(rng, prefixes)
+            row['descrip'] = rng.choice(DESCRIPS).format(s=rng.choice(SIZES))
+            if rng.random() < 0.05:
+                row['descrip'] += ', NACE'   # commas in descriptions occur in SW csv exports
+        rows.append(row)
+    return {'pn': pn, 'descrip': descrip, 'rows': rows}
+
+
+def _sw_rows(assy, prefix=''):
+    out = []
+    for i, r in enumerate(assy['rows'], 1):
+        itemno = prefix + str(i)
+        length = ''
+        if r['length_in'] is not None:
+            um, factor = r['sw_um']
+            length = '{:g}{}'.format(round(r['length_in'] * factor, 3), um)
+        out.append([itemno, r['qty'], length, r['descrip'], r['pn']])
+        if r['children']:
+            out += _sw_rows(r['children'], itemno + '.')
+    return out
+
+
+def _sl_rows(rng, assy, level, mismatch_rate):
+    out = []
+    for r in assy['rows']:
+        qty, um, descrip = r['qty'], 'EA', r['descrip']
+        if r['length_in'] is not None:
+            qty, um = round(r['qty'] * r['length_in'] / 12, 2), 'FT'
+        if rng.random() < mismatch_rate:
+            kind = rng.choice(['qty', 'descrip', 'missing', 'extra'])
+            if kind == 'qty':
+                qty = qty + 1
+            elif kind == 'descrip':
+                descrip = descrip + ' REV B'
+            elif kind == 'missing' and not r['children']:
+                continue
+            elif kind == 'extra':
+                out.append([level, _pn(rng, ['3002', '3012']), 'EXTRA PART', 1, 'EA', 'Material', None])
+        out.append([level, r['pn'], descrip, qty, um, 'Material', None])
+        if r['children']:
+            out += _sl_rows(rng, r['children'], level + 1, mismatch_rate)
+    return out
+
+
+def _write_sw(fname, title, rows, fmt):
+    columns = ['ITEM NO.', 'QTY.', 'LENGTH', 'DESCRIPTION', 'PART NUMBER']
+    if fmt == 'csv':
+        with open(fname, 'w', encoding='ISO-8859-1') as f:
+            f.write(title + ',,,,\n')
+            f.write(','.join(columns) + '\n')
+            for r in rows:
+                f.write(','.join(str(x) for x in r) + '\n')
+    else:
+        df = pd.DataFrame(rows, columns=columns)
+        with pd.ExcelWriter(fname, engine='xlsxwriter') as writer:
+            df.to_excel(writer, index=False, startrow=1)
+            writer.sheets['Sheet1'].write(0, 0, title)
+
+
+def _write_sm(fname, rng, pns, sm_rows, today):
+    columns = ['Item', 'Description', 'Unit Cost', 'Movement?', 'Qty On Hand',
+               'Year n-1 Usage', 'Last Receipt', 'Year n-2 Usage', 'Last Movement (Days)']
+    rows = []
+    for i in range(sm_rows):
+        pn, descrip = rng.choice(pns)
+        pn = pn[:10] + '{:03d}'.format(rng.randrange(1000))   # same common_pn, e.g. 3012-0075-
+        if rng.random() < 0.3:
+            descrip = descrip.replace('316SS', '304SS').replace('150#', '300#')
+        rows.append([pn, descrip, '${:,.2f}'.format(rng.uniform(1, 3000)),
+                     rng.choice(['No Demand', 'Demand']), rng.randint(0, 40),
+                     rng.randint(0, 20), today - timedelta(days=rng.randint(30, 2000)),
+                     rng.randint(0, 20), rng.randint(0, 900)])
+    rows.append(['', '', '$0.00', '', None, None, None, None, None])   # last two rows of a
+    rows.append(['Total', '', '$0.00', '', None, None, None, None, None])  # SM BOM are garbage
+    df = pd.DataFrame(rows, columns=columns)
+    df.to_excel(fname, index=False, engine='xlsxwriter')
+
+
+def generate_boms(outdir, assys=10, depth=1, rows_per_assy=20, mismatch_rate=0.05,
+                  um_mix=0.2, fmt='xlsx', subs_per_assy=2, sm_rows=0, seed=0):
+    ''' Write matched _sw/_sl BOM files to outdir.
+
+    Parameters
+    ----------
+    outdir: str
+        Directory to write files to.  Created if it doesn't exist.
+    assys: int
+        Number of top level assemblies, i.e. number of _sw/_sl file pairs.
+    depth: int
+        Number of subassembly levels below each top level assembly.
+    rows_per_assy: int
+        Number of rows (parts and subassemblies) in each assembly.
+    mismatch_rate: float
+        Fraction of SL rows whose qty or description is altered, or that
+        are missing, or that get an extra part added.
+    um_mix: float
+        Fraction of SW length values given a unit of measure other than
+        the default (e.g. 610mm or 2ft instead of 24).
+    fmt: str
+        "xlsx" or "csv".  Format of the _sw files (_sl files are always
+        xlsx).
+    subs_per_assy: int
+        Number of subassemblies in each assembly (while depth remains).
+    sm_rows: int
+        If > 0, also write a slow moving parts BOM with this many rows.
+    seed: int
+        Random seed.
+
+    Returns
+    -------
+    out: dict
+        Counts of files, assemblies, and rows written.
+    '''
+    rng = random.Random(seed)
+    os.makedirs(outdir, exist_ok=True)
+    prefixes = ['{:04d}'.format(3000 + 7*i) for i in range(40)]
+    today = date(2025, 1, 1)
+    stats = {'sw_files': 0, 'sl_files': 0, 'sm_files': 0, 'sw_rows': 0, 'sl_rows': 0}
+    pns = []
+    for n in range(assys):
+        top = '{:04d}-{:04d}-{:03d}'.format(6890, n, 1)
+        assy = _build_assy(rng, top, 'SYSTEM ' + top, depth, rows_per_assy, prefixes,
+                           um_mix, subs_per_assy)
+        sw = _sw_rows(assy)
+        sl = [[0, top, assy['descrip'], 1, 'EA', 'Material', None]] + _sl_rows(rng, assy, 1, mismatch_rate)
+        pns += [(r[4], r[3]) for r in sw if not r[3].startswith('SUBASSY')]
+        _write_sw(os.path.join(outdir, top + '_sw.' + fmt), top, sw, fmt)
+        dfsl = pd.DataFrame(sl, columns=['Level', 'Item', 'Description', 'Qty Per', 'UM',
+                                         'Type', 'Obsolete Date'])
+        dfsl.to_excel(os.path.join(outdir, top + '_sl.xlsx'), index=False, engine='xlsxwriter')
+        stats['sw_files'] += 1
+        stats['sl_files'] += 1
+        stats['sw_rows'] += len(sw)
+        stats['sl_rows'] += len(sl)
+    if sm_rows and pns:
+        _write_sm(os.path.join(outdir, 'inventory_sm.xlsx'), rng, pns, sm_rows, today)
+        stats['sm_files'] = 1
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate synthetic _sw/_sl BOMs for benchmarking bomcheck.')
+    parser.add_argument('outdir', help='directory to write BOM files to')
+    parser.add_argument('--assys', type=int, default=10, help='no. of _sw/_sl file pairs')
+    parser.add_argument('--depth', type=int, default=1, help='subassembly levels')
+    parser.add_argument('--rows', type=int, default=20, help='rows per assembly')
+    parser.add_argument('--mismatch', type=float, default=0.05, help='mismatch rate')
+    parser.add_argument('--um_mix', type=float, default=0.2, help='fraction of non-default length units')
+    parser.add_argument('--fmt', choices=['xlsx', 'csv'], default='xlsx', help='format of _sw files')
+    parser.add_argument('--subs', type=int, default=2, help='subassemblies per assembly')
+    parser.add_argument('--sm_rows', type=int, default=0, help='rows in a slow moving parts BOM')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    print(generate_boms(args.outdir, args.assys, args.depth, args.rows, args.mismatch,
+                        args.um_mix, args.fmt, args.subs, args.sm_rows, args.seed))
+
+
+if __name__ == '__main__':
+    main()
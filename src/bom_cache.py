@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+@author: Ken Carlton
+
+A persistent, on-disk cache of BOMs that bomcheck has read from _sw and _sl
+files.  What is stored for each file is the dictionary of BOMs that results
+after the file's BOM has been deconstructed (see the function
+deconstructMultilevelBOM in bomcheck.py); i.e. {assypn1: BOM1, assypn2: BOM2,
+...}.  A file found in the cache need not be read again.
+
+An entry is looked up by the file's pathname, its modification time, its
+size, and the settings of cfg that affect how a BOM is read (see
+read_settings).  If any of these change, the file is read anew.  When the
+cache grows larger than its size limit, the least recently used entries are
+deleted.
+
+Slow moving parts BOMs are kept separately, in a ColumnCache, with each
+column stored in a .npy file that is memory-mapped when read back.  They
+count toward the same size limit.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import sys
+import time
+
+
+# cfg keys whose values affect what is extracted from a BOM file
+CFG_KEYS = ['part_num', 'qty', 'descrip', 'um_sl', 'level_sl', 'itm_sw',
+            'length_sw', 'obs']
+
+# cfg keys whose values also affect it if cfg['drop_at_read'] is True
+DROP_KEYS = ['drop_at_read', 'drop_bool', 'drop', 'exceptions']
+
+
+def read_settings(cfg):
+    ''' Return a dictionary of the settings of cfg that affect what is
+    extracted from a BOM file.'''
+    settings = {k: cfg.get(k) for k in CFG_KEYS}
+    if cfg.get('drop_at_read'):
+        settings.update({k: cfg.get(k) for k in DROP_KEYS})
+    return settings
+
+
+def default_cachedir():
+    ''' Return the directory where the cache is stored if the user has not
+    specified one; e.g. C:/Users/ken/AppData/Local/bomcheck/cache on MS
+    Windows, or /home/ken/.cache/bomcheck otherwise.'''
+    if sys.platform.startswith('win') and os.environ.get('LOCALAPPDATA'):
+        return os.path.join(os.environ['LOCALAPPDATA'], 'bomcheck', 'cache')
+    return os.path.join(os.path.expanduser('~'), '.cache', 'bomcheck')
+
+
+class BomCache:
+    ''' On-disk cache of deconstructed BOMs.
+
+    Parameters
+    ----------
+    cachedir: str, optional
+        Directory where cached BOMs are stored.  Created if it doesn't
+        exist.  Default: the value that default_cachedir() returns.
+    max_mb: float, optional
+        Size limit of the cache in megabytes.  Default: 500
+    salt: str, optional
+        Any string; e.g. a software version no.  Entries stored with a
+        different salt are not found.  Default: ''
+
+    Examples
+    --------
+    >>> cache = BomCache('C:/tmp/bomcache', max_mb=100)
+    >>> cache.get('C:/boms/095544_sl.xlsx', 'sl', cfg)   # None if not cached
+    >>> cache.stats()
+    {'hits': 0, 'misses': 1, 'stores': 0, 'evictions': 0, 'files': 0, 'bytes': 0}
+    '''
+
+    def __init__(self, cachedir=None, max_mb=500, salt=''):
+        self.cachedir = cachedir or default_cachedir()
+        self.max_bytes = int(float(max_mb) * 1024 * 1024)
+        self.salt = salt
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        os.makedirs(self.cachedir, exist_ok=True)
+        self.columns = ColumnCache(os.path.join(self.cachedir, 'columns'), salt,
+                                   on_store=self._columns_stored)
+        self._bytes = (sum(e.stat().st_size for e in self._entries()) +
+                       sum(nbytes for _, nbytes, _ in self.columns.entries()))
+
+    def _entries(self):
+        return [e for e in os.scandir(self.cachedir)
+                if e.is_file() and e.name.endswith('.pkl')]
+
+    def key(self, filename, bomtype, cfg):
+        ''' Return the key, a hex string, that identifies filename in the
+        cache.  Return None if filename can't be found.'''
+        try:
+            st = os.stat(filename)
+        except OSError:
+            return None
+        settings = read_settings(cfg)
+        s = json.dumps([os.path.abspath(filename), st.st_mtime_ns, st.st_size,
+                        bomtype, settings, self.salt], sort_keys=True, default=str)
+        return hashlib.sha1(s.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cachedir, key + '.pkl')
+
+    def get(self, filename, bomtype, cfg):
+        ''' Return (dic, printStrs) stored for filename, or None if not
+        found.  dic is the dictionary of BOMs extracted from the file, and
+        printStrs is a list of messages that were generated when the file
+        was read.'''
+        key = self.key(filename, bomtype, cfg)
+        path = self._path(key) if key else None
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'rb') as f:
+                    value = pickle.load(f)
+                os.utime(path)   # mark as recently used
+                self.hits += 1
+                return value
+            except Exception:   # corrupt, or written by another version of pandas
+                self._remove(path)
+        self.misses += 1
+        return None
+
+    def put(self, filename, bomtype, cfg, dic, printStrs):
+        ''' Store the dictionary of BOMs extracted from filename, and the
+        messages generated when reading it, then delete least recently used
+        entries if the cache has grown beyond its size limit.'''
+        key = self.key(filename, bomtype, cfg)
+        if not key:
+            return
+        path = self._path(key)
+        tmp = path + '.' + str(os.getpid()) + '.tmp'
+        try:
+            with open(tmp, 'wb') as f:
+                pickle.dump((dic, list(printStrs)), f, protocol=pickle.HIGHEST_PROTOCOL)
+            old = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(tmp, path)   # atomic; other bomcheck processes never see a partial file
+        except OSError:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            return
+        self._bytes += os.path.getsize(path) - old
+        self.stores += 1
+        if self._bytes > self.max_bytes:
+            self.evict()
+
+    def _remove(self, path):
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+            self._bytes -= size
+        except OSError:
+            pass
+
+    def _columns_stored(self):
+        self._bytes = (sum(e.stat().st_size for e in self._entries()) +
+                       sum(nbytes for _, nbytes, _ in self.columns.entries()))
+        if self._bytes > self.max_bytes:
+            self.evict()
+
+    def evict(self):
+        ''' Delete least recently used entries, those of self.columns
+        included, until the cache is within its size limit.'''
+        entries = [(e.stat().st_mtime, e.stat().st_size, e.path, False) for e in self._entries()]
+        entries += [(mtime, nbytes, path, True) for path, nbytes, mtime in self.columns.entries()]
+        entries.sort()
+        self._bytes = sum(e[1] for e in entries)
+        for mtime, nbytes, path, is_columns in entries:
+            if self._bytes <= self.max_bytes:
+                break
+            if is_columns:
+                self.columns.remove(path)
+                self._bytes -= nbytes
+            else:
+                self._remove(path)
+            self.evictions += 1
+
+    def clear(self):
+        ''' Delete all entries of the cache, those of self.columns
+        included.'''
+        for e in self._entries():
+            self._remove(e.path)
+        self.columns.clear()
+        self._bytes = 0
+
+    def stats(self):
+        ''' Return a dictionary showing hits, misses, stores, and
+        evictions since the cache object was created, and the no. of files
+        and bytes presently in the cache.'''
+        return {'hits': self.hits, 'misses': self.misses, 'stores': self.stores,
+                'evictions': self.evictions,
+                'files': len(self._entries()) + len(self.columns.entries()),
+                'bytes': self._bytes}
+
+
+class ColumnCache:
+    ''' On-disk cache of DataFrames derived from files; e.g. the slow
+    moving parts BOM derived from a _sm.xlsx file.  Each column of a
+    DataFrame is stored in its own .npy file, which is memory-mapped when
+    read back, so that a large DataFrame is loaded quickly.  Only the latest
+    DataFrame derived from a given file is kept.
+
+    Along with the DataFrame are stored the fingerprint of the file (its
+    modification time and size) and a hash of each row of the data from
+    which the DataFrame was derived.  Thus, when the file changes, rows whose
+    hashes are unchanged need not be processed again.  (See
+    read_sm_cached in bomcheck.py.)
+
+    Columns of numbers are memory-mapped as they are.  Columns of strings
+    are stored as fixed width unicode arrays, which are compact and need no
+    pickling, but they are copied whole into Python strings when read back;
+    for them memory-mapping saves nothing.
+
+    Entries whose files no longer exist are deleted whenever a DataFrame is
+    stored.  Otherwise entries are deleted by the BomCache that the
+    ColumnCache belongs to, when it exceeds its size limit.
+
+    Parameters
+    ----------
+    cachedir: str
+        Directory where DataFrames are stored.  Created when first needed.
+    salt: str, optional
+        Any string; e.g. a software version no.  DataFrames stored with a
+        different salt are not found.  Default: ''
+    on_store: function, optional
+        Called, without arguments, after a DataFrame has been stored.
+        Default: None
+    '''
+
+    def __init__(self, cachedir, salt='', on_store=None):
+        self.cachedir = cachedir
+        self.salt = salt
+        self.on_store = on_store
+
+    def fingerprint(self, filename):
+        ''' Return [modification time, size] of filename, or None if it
+        can't be found.'''
+        try:
+            st = os.stat(filename)
+        except OSError:
+            return None
+        return [st.st_mtime_ns, st.st_size]
+
+    def _name(self, filename):
+        s = json.dumps([os.path.abspath(filename), self.salt])
+        return hashlib.sha1(s.encode('utf-8')).hexdigest()
+
+    def get(self, filename):
+        ''' Return what was last stored for filename: a dictionary with
+        keys fingerprint, df, rowhashes, and raw_dtypes (see put).  Return
+        None if nothing is stored.'''
+        import numpy as np
+        import pandas as pd
+        try:
+            meta_path = os.path.join(self.cachedir, self._name(filename) + '.json')
+            with open(meta_path) as f:
+                meta = json.load(f)
+            d = os.path.join(self.cachedir, meta['dir'])
+            mmap_mode = 'c' if meta['rows'] else None   # an empty array can't be memory-mapped
+            columns = {}
+            for n, (col, kind) in enumerate(meta['columns']):
+                path = os.path.join(d, str(n) + '.npy')
+                if kind == 'object':
+                    columns[col] = np.load(path, allow_pickle=True)
+                elif kind == 'str':
+                    columns[col] = np.load(path, mmap_mode=mmap_mode).astype(object)
+                else:
+                    columns[col] = np.load(path, mmap_mode=mmap_mode)
+            rowhashes = np.load(os.path.join(d, 'rowhashes.npy'), mmap_mode=mmap_mode)
+            os.utime(meta_path)   # mark as recently used
+        except Exception:   # not stored, or stored incompletely
+            return None
+        return {'fingerprint': meta['fingerprint'], 'df': pd.DataFrame(columns),
+                'rowhashes': rowhashes, 'raw_dtypes': meta['raw_dtypes']}
+
+    def put(self, filename, fingerprint, df, rowhashes, raw_dtypes):
+        ''' Store df, a DataFrame derived from filename, replacing whatever
+        was stored for filename before.
+
+        Parameters
+        ----------
+        filename: str
+            Pathname of the file
+        fingerprint: list
+            What fingerprint(filename) returned before the file was read
+        df: DataFrame
+            DataFrame derived from the file.  Its index is not stored.
+        rowhashes: numpy array
+            Hashes of the rows of the data that df was derived from.
+        raw_dtypes: list
+            dtypes, as strings, of the data that df was derived from.
+        '''
+        import numpy as np
+        name = self._name(filename)
+        dirname = name + '.' + str(os.getpid()) + '.' + str(time.time_ns())
+        d = os.path.join(self.cachedir, dirname)
+        meta = {'fingerprint': fingerprint, 'dir': dirname, 'columns': [],
+                'rows': len(df), 'raw_dtypes': raw_dtypes,
+                'filename': os.path.abspath(filename)}
+        try:
+            os.makedirs(d)
+            for n, col in enumerate(df.columns):
+                values = df[col].to_numpy()
+                path = os.path.join(d, str(n) + '.npy')
+                if values.dtype != object:
+                    kind = 'array'
+                    np.save(path, values)
+                elif all(isinstance(v, str) for v in values):
+                    kind = 'str'
+                    np.save(path, values.astype(str))
+                else:
+                    kind = 'object'
+                    np.save(path, values, allow_pickle=True)
+                meta['columns'].append([col, kind])
+            np.save(os.path.join(d, 'rowhashes.npy'), np.asarray(rowhashes))
+            old = None
+            path = os.path.join(self.cachedir, name + '.json')
+            if os.path.exists(path):
+                with open(path) as f:
+                    old = json.load(f).get('dir')
+            tmp = path + '.' + str(os.getpid()) + '.tmp'
+            with open(tmp, 'w') as f:
+                json.dump(meta, f)
+            os.replace(tmp, path)   # atomic; other bomcheck processes never see a partial entry
+        except (OSError, ValueError):
+            shutil.rmtree(d, ignore_errors=True)
+            return
+        if old and old != dirname:
+            shutil.rmtree(os.path.join(self.cachedir, old), ignore_errors=True)
+        self.prune()
+        if self.on_store:
+            self.on_store()
+
+    def entries(self):
+        ''' Return [(path, nbytes, mtime), ...], one for each DataFrame
+        stored.  path is that of the entry's .json file, nbytes the size of
+        all of its files, and mtime the time it was last stored or read.'''
+        found = []
+        try:
+            names = [e for e in os.scandir(self.cachedir)
+                     if e.is_file() and e.name.endswith('.json')]
+        except OSError:
+            return found
+        for e in names:
+            try:
+                with open(e.path) as f:
+                    d = os.path.join(self.cachedir, json.load(f)['dir'])
+                nbytes = e.stat().st_size + sum(x.stat().st_size for x in os.scandir(d))
+                found.append((e.path, nbytes, e.stat().st_mtime))
+            except (OSError, ValueError, KeyError):
+                continue
+        return found
+
+    def remove(self, path):
+        ''' Delete the entry whose .json file is path.'''
+        try:
+            with open(path) as f:
+                d = json.load(f).get('dir')
+            os.remove(path)
+        except (OSError, ValueError):
+            return
+        if d:
+            shutil.rmtree(os.path.join(self.cachedir, d), ignore_errors=True)
+
+    def prune(self):
+        ''' Delete entries whose files no longer exist.'''
+        for path, _, _ in self.entries():
+            try:
+                with open(path) as f:
+                    filename = json.load(f).get('filename')
+            except (OSError, ValueError):
+                continue
+            if filename and not os.path.exists(filename):
+                self.remove(path)
+
+    def clear(self):
+        ''' Delete all entries, including any left incomplete.'''
+        shutil.rmtree(self.cachedir, ignore_errors=True)
@@ -0,0 +1,398 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+@author: Ken Carlton
+
+A local, long running bomcheck server.  Programs like bomcheckgui, or
+scripts, send it requests over HTTP instead of starting bomcheck anew each
+time.  The server keeps in memory what it has learned between requests:
+BOMs that it has read from files (files that have not changed are not read
+again), results of assemblies that it has checked (an assembly whose BOMs
+and settings have not changed is not checked again), the cfg settings and
+state derived from them, and, if cfg['jobs'] > 1, worker processes that
+have already imported pandas.
+
+Start it from the command line with:
+
+    bomcheck --serve 8765
+
+Requests and replies are JSON.  Endpoints:
+
+    POST /check     {"fn": "C:/myprojects/project1", "settings": {...}}
+                    Check the BOMs of fn (a filename, directory name, or list
+                    thereof, like the fn of the function bomcheck).  settings,
+                    optional, changes cfg settings, e.g. {"accuracy": 4}.
+    POST /recheck   {"assy": "0300-2024-045"}
+                    Check one assembly of the last check again, reading its
+                    files anew if they have changed.
+    GET  /results?i=1&assy=0300-2024-045
+                    Results of the last check: i=1, BOM check; i=0, SW BOMs
+                    for which no ERP BOM was found.  assy is optional.
+    GET  /stats     How well the in-memory stores and caches are working.
+
+Only SW and SL BOMs are checked.  Slow moving parts (_sm) files are ignored.
+"""
+
+import collections
+import json
+import os
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class BomStore:
+    ''' In-memory store of BOMs read from files, limited in size.  When the
+    limit is exceeded, the least recently used files are dropped.
+
+    Parameters
+    ----------
+    max_mb: float, optional
+        Size limit in megabytes.  Default: 1000
+    '''
+
+    def __init__(self, max_mb=1000):
+        self.max_bytes = int(float(max_mb) * 1024 * 1024)
+        self.entries = collections.OrderedDict()  # {pathname: (stat, dic, printStrs, nbytes)}
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, pathname, stat):
+        ''' Return (dic, printStrs) stored for pathname, or None if not
+        found or if the file has changed, i.e. stat differs from the stat
+        stored with it.  (stat may also include the settings that the file
+        was read with.)'''
+        entry = self.entries.get(pathname)
+        if entry is None or entry[0] != stat:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(pathname)
+        self.hits += 1
+        return entry[1], entry[2]
+
+    def put(self, pathname, stat, dic, printStrs):
+        ''' Store the BOMs (dic) read from pathname, and the messages
+        generated when reading it.'''
+        self.discard(pathname)
+        nbytes = sum(int(df.memory_usage(index=True, deep=True).sum()) for df in dic.values())
+        self.entries[pathname] = (stat, dic, list(printStrs), nbytes)
+        self.bytes += nbytes
+        while self.bytes > self.max_bytes and len(self.entries) > 1:
+            oldest = next(iter(self.entries))
+            self.discard(oldest)
+            self.evictions += 1
+
+    def discard(self, pathname):
+        entry = self.entries.pop(pathname, None)
+        if entry is not None:
+            self.bytes -= entry[3]
+
+    def stats(self):
+        return {'files': len(self.entries), 'bytes': self.bytes, 'max_bytes': self.max_bytes,
+                'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
+
+
+class BomServer:
+    ''' What the HTTP server does on receiving a request.  Only one request
+    is worked on at a time.
+
+    Parameters
+    ----------
+    session: bomcheck.BomcheckSession
+        Session whose settings are used, and whose results are updated.
+    bc: module
+        The bomcheck module.
+    max_mb: float, optional
+        Size limit, in megabytes, of the BOMs kept in memory.
+        Default: 1000
+    '''
+
+    def __init__(self, session, bc, max_mb=1000):
+        self.session = session
+        self.bc = bc
+        self.store = BomStore(max_mb)
+        self.lock = threading.Lock()
+        self.checked = {}      # {assy pn: (signature, DataFrame, printStrs)}
+        self.assys = {}        # assys of the last check: {assy pn: (key, swfile, slfile)}
+        self.last = None       # signature of the last check's results
+        self.started = time.time()
+        self.requests = 0
+        self.assys_checked = 0
+        self.assys_reused = 0
+        self.last_check = {}
+
+    def stat(self, pathname):
+        st = os.stat(pathname)
+        return (st.st_mtime_ns, st.st_size)
+
+    def load(self, files):
+        ''' Return, for each (bomtype, k, pathname) in files, the (dic,
+        printStrs, stat) of the file; from the store if the file hasn't
+        changed, otherwise by reading the file.  Also return the no. of
+        files read.'''
+        bc = self.bc
+        loaded = [None] * len(files)
+        tasks, todo = [], []
+        settings = repr(sorted(bc.bom_cache.read_settings(self.session.cfg).items()))
+        for n, (bomtype, k, pathname) in enumerate(files):
+            stat = self.stat(pathname)
+            found = self.store.get(pathname, (stat, settings))
+            if found is not None:
+                loaded[n] = found + (stat,)
+            else:
+                tasks.append((bomtype, k, pathname))
+                todo.append((n, stat))
+        for (n, stat), task, (dic, printStrs, from_cache) in zip(todo, tasks, bc.ingest_tasks(tasks)):
+            loaded[n] = (dic, printStrs, stat)
+            if dic:
+                self.store.put(task[2], (stat, settings), dic, printStrs)
+        return loaded, len(tasks)
+
+    def settings_key(self):
+        ''' Return a string that changes whenever a setting that can affect
+        the result of checking an assembly changes.'''
+        ignore = ('jobs', 'stats', 'cache', 'cache_dir', 'cache_mb', 'export', 'engine')
+        return repr(sorted((k, v) for k, v in self.bc.picklable_cfg().items() if k not in ignore))
+
+    def check_assys(self, assys):
+        ''' Check assys, a list of (key2, dfsw, dfsl), in worker processes if
+        cfg['jobs'] > 1.  Return [(DataFrame, printStrs), ...], one for each
+        assy.'''
+        bc = self.bc
+        jobs = bc.get_jobs()
+        if jobs > 1 and len(assys) > 1:
+            _cfg = bc.picklable_cfg()
+            with bc.worker_pool(jobs) as executor:
+                out = executor.map(bc.check_assys, [([assy], _cfg) for assy in assys],
+                                   chunksize=max(1, len(assys) // (jobs * 4)))
+                return [(checked[0], printStrs) for checked, printStrs in out]
+        out = []
+        session = self.session
+        printStrs = session.printStrs
+        for assy in assys:
+            session.printStrs = []   # to find which messages belong to which assy
+            out.append((bc.check_assy(*assy), session.printStrs))
+        session.printStrs = printStrs
+        return out
+
+    def add_messages(self, messages):
+        printStrs = self.session.printStrs
+        for printStr in messages:
+            if printStr not in printStrs:
+                printStrs.append(printStr)
+
+    def check(self, fn, settings=None):
+        ''' Check the BOMs found from fn, like the function bomcheck does.
+        Returns a summary of what was done.'''
+        bc = self.bc
+        t0 = time.perf_counter()
+        session = self.session
+        session.printStrs = []
+        cfg = session.cfg
+        if settings:
+            cfg.update(settings)
+        filesdic = {}   # like in bomcheck.gatherBOMs_from_fnames, the last file of a given pn is used
+        for f in bc.get_fnames(fn, bomtypes=('sw', 'sl')):
+            bomtype = bc.bom_type(f)
+            if bomtype in ('sw', 'sl'):
+                k = os.path.basename(f)
+                filesdic[(bomtype, k[:k.find('_')])] = f
+        files = ([(t, k, f) for (t, k), f in filesdic.items() if t == 'sw'] +
+                 [(t, k, f) for (t, k), f in filesdic.items() if t == 'sl'])
+        loaded, nread = self.load(files)
+
+        swdic, sldic, source = {}, {}, {}   # source: {(bomtype, assy pn): (pathname, stat)}
+        for (bomtype, k, f), (dic, printStrs, stat) in zip(files, loaded):
+            self.add_messages(printStrs)
+            (swdic if bomtype == 'sw' else sldic).update(dic)
+            for key in dic:
+                source[(bomtype, key)] = (f, stat)
+        if cfg.get('mtltest'):
+            bc.typeNotMtl({k: v.copy() for k, v in sldic.items()})
+
+        settings_key = self.settings_key()
+        assys = {}      # {key2: (key, signature)}, in the order that bomcheck would check them
+        for key in swdic:
+            key2 = key.replace(' ', '') if cfg['del_whitespace'] else key
+            assys[key2] = (key, (source[('sw', key)], source.get(('sl', key2)), settings_key))
+        todo = [key2 for key2, (key, sig) in assys.items()
+                if key2 not in self.checked or self.checked[key2][0] != sig]
+        checked = self.check_assys([(key2, swdic[assys[key2][0]].copy(),
+                                     sldic[key2].copy() if key2 in sldic else None) for key2 in todo])
+        for key2, (df, printStrs) in zip(todo, checked):
+            self.checked[key2] = (assys[key2][1], df, printStrs)
+        for key2 in list(self.checked):
+            if key2 not in assys:
+                del self.checked[key2]
+        for key2 in assys:
+            self.add_messages(self.checked[key2][2])
+        self.assys = {key2: (key, source[('sw', key)][0], source.get(('sl', key2), (None,))[0])
+                      for key2, (key, sig) in assys.items()}
+        self.assys_checked += len(todo)
+        self.assys_reused += len(assys) - len(todo)
+        self.update_results()
+        self.last_check = {'seconds': time.perf_counter() - t0,
+                           'files': {'read': nread, 'in_memory': len(files) - nread},
+                           'assys': {'checked': len(todo), 'reused': len(assys) - len(todo)}}
+        return dict(self.last_check,
+                    lone_sw=[k for k in assys if not self.is_compared(k)],
+                    compared=[k for k in assys if self.is_compared(k)],
+                    messages=list(session.printStrs))
+
+    def is_compared(self, key2):
+        sig = self.checked[key2][0]
+        return sig[1] is not None
+
+    def update_results(self):
+        ''' Put the results of the assemblies of the last check into the
+        session's results; concatenated like bomcheck does.'''
+        sig = tuple((key2, self.checked[key2][0]) for key2 in self.assys)
+        if sig == self.last:
+            return
+        title_dfsw, title_dfmerged = [], []
+        for key2 in self.assys:
+            df = self.checked[key2][1].copy(deep=False)   # concat_boms adds a column to df
+            (title_dfmerged if self.is_compared(key2) else title_dfsw).append((key2, df))
+        self.session.results = self.bc.concat_boms(title_dfsw, title_dfmerged)
+        self.last = sig
+
+    def recheck(self, assy):
+        ''' Check the assembly assy of the last check again.  Its files are
+        read again if they have changed.  Returns a summary.'''
+        bc = self.bc
+        t0 = time.perf_counter()
+        cfg = self.session.cfg
+        key2 = assy.replace(' ', '') if cfg['del_whitespace'] else assy
+        if key2 not in self.assys:
+            raise KeyError(f'{assy} was not among the assemblies of the last check')
+        self.session.printStrs = []
+        key, swfile, slfile = self.assys[key2]
+        files = [('sw', os.path.basename(swfile).split('_')[0], swfile)]
+        if slfile:
+            files.append(('sl', os.path.basename(slfile).split('_')[0], slfile))
+        loaded, nread = self.load(files)
+        for dic, printStrs, stat in loaded:
+            self.add_messages(printStrs)
+        dfsw = loaded[0][0].get(key)
+        dfsl = loaded[1][0].get(key2) if slfile else None
+        if dfsw is None:
+            raise KeyError(f'{assy} is no longer in {swfile}')
+        sig = ((swfile, loaded[0][2]), (slfile, loaded[1][2]) if dfsl is not None else None,
+               self.settings_key())
+        (df, printStrs), = self.check_assys([(key2, dfsw.copy(),
+                                              None if dfsl is None else dfsl.copy())])
+        self.add_messages(printStrs)
+        self.checked[key2] = (sig, df, printStrs)
+        self.assys_checked += 1
+        self.update_results()
+        return {'seconds': time.perf_counter() - t0, 'assy': key2,
+                'files': {'read': nread, 'in_memory': len(files) - nread},
+                'compared': dfsl is not None, 'messages': list(self.session.printStrs)}
+
+    def results(self, i=1, assy=None):
+        ''' Return results of the last check as {"columns": [...], "data":
+        [[...], ...]}.'''
+        df = self.session.getresults(i)
+        if df is None:
+            return {'columns': [], 'data': []}
+        if assy:
+            key2 = assy.replace(' ', '') if self.session.cfg['del_whitespace'] else assy
+            df = df[df.index.get_level_values(0) == key2]
+        return json.loads(df.reset_index().to_json(orient='split', index=False))
+
+    def stats(self):
+        return {'uptime': time.time() - self.started, 'requests': self.requests,
+                'boms_in_memory': self.store.stats(),
+                'assys': {'in_memory': len(self.checked), 'checked': self.assys_checked,
+                          'reused': self.assys_reused},
+                'last_check': self.last_check,
+                'cache': self.session.getcachestats(),
+                'workers': self.session.executor_jobs}
+
+    def handle(self, method, path, query, body):
+        ''' Do what a request asks for.  Returns (HTTP status, reply).'''
+        endpoints = {('POST', '/check'): lambda: self.check(body['fn'], body.get('settings')),
+                     ('POST', '/recheck'): lambda: self.recheck(body['assy']),
+                     ('GET', '/results'): lambda: self.results(int(query.get('i', 1)), query.get('assy')),
+                     ('GET', '/stats'): self.stats}
+        if (method, path) not in endpoints:
+            return 404, {'ok': False, 'error': f'no such endpoint: {method} {path}'}
+        with self.lock, self.session.activate():
+            self.requests += 1
+            try:
+                return 200, dict(endpoints[(method, path)](), ok=True)
+            except (KeyError, TypeError, ValueError, OSError) as e:
+                return 400, {'ok': False, 'error': f'{type(e).__name__}: {e}'}
+            except Exception as e:
+                return 500, {'ok': False, 'error': f'{type(e).__name__}: {e}'}
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    ''' Pass HTTP requests to the BomServer object, server.bomserver.'''
+
+    def do_GET(self):
+        self.reply('GET')
+
+    def do_POST(self):
+        self.reply('POST')
+
+    def reply(self, method):
+        url = urllib.parse.urlsplit(self.path)
+        query = dict(urllib.parse.parse_qsl(url.query))
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+            body = json.loads(self.rfile.read(length) or b'{}')
+            status, reply = self.server.bomserver.handle(method, url.path, query, body)
+        except json.JSONDecodeError as e:
+            status, reply = 400, {'ok': False, 'error': f'request is not JSON: {e}'}
+        data = json.dumps(reply, default=str).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass   # don't print a line for each request
+
+
+def make_server(session, bc, host='127.0.0.1', port=8765, max_mb=1000):
+    ''' Return an HTTP server, not yet started, for session.  (Start it
+    with its serve_forever() method.)'''
+    server = ThreadingHTTPServer((host, port), RequestHandler)
+    server.bomserver = BomServer(session, bc, max_mb)
+    return server
+
+
+def serve(session, bc, host='127.0.0.1', port=8765, max_mb=1000):
+    ''' Run a bomcheck server until Ctrl-C is pressed.
+
+    Parameters
+    ----------
+    session: bomcheck.BomcheckSession
+        Session whose settings are used.
+    bc: module
+        The bomcheck module.
+    host: str, optional
+        Address to listen at.  Default: 127.0.0.1, i.e. only programs on
+        this computer can connect.
+    port: int, optional
+        Port to listen at.  Default: 8765
+    max_mb: float, optional
+        Size limit, in megabytes, of the BOMs kept in memory.
+        Default: 1000
+    '''
+    server = make_server(session, bc, host, port, max_mb)
+    session.start_workers()
+    print(f'bomcheck server listening at http://{host}:{server.server_address[1]}.  '
+          'Press Ctrl-C to stop.')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print('bomcheck server stopped.')
+    finally:
+        server.server_close()
+        session.stop_workers()
@@ -32,39 +32,78 @@ __version__ = '2.5'
 __author__ = 'Kenneth E. Carlton'
 
 #import pdb # use with pdb.set_trace()
-import glob, argparse, sys, warnings
-import pandas as pd
+import glob, argparse, sys, warnings, time, io, csv, itertools, contextlib
+import collections.abc
+import concurrent.futures
+import contextvars
+import importlib
+import importlib.util
 import os.path
 import os
 import ast
-import webbrowser
 import json
 import re
-import check_sm_parts
+import bom_cache
 from pathlib import Path
-from check_sm_parts import is_in
 from datetime import date
-try:
-    from python_calamine.pandas import pandas_monkeypatch
-except:
-    pass
-toml_imported = False
-if sys.version_info >= (3, 11):
-    import tomllib
-    toml_imported=True
-else:
-    try:
-        import tomli as tomllib
-        toml_imported=True
-    except:
-        toml_imported=False
-        print('\ntomli (for python < 3.11) or tomllib (for python >= 3.11), not found.\n'
-              'Therefore bomcheck.cfg will not be used.\n\n')
 warnings.filterwarnings('ignore')  # the program has its own error checking.
-pd.set_option('display.max_rows', None)  # was pd.set_option('display.max_rows', 150)
-pd.set_option('display.max_columns', None)
-pd.set_option('display.max_colwidth', 100)
-pd.set_option('display.width', 250)
+
+
+class LazyModule:
+    ''' Stand-in for a module that is not imported until one of its
+    attributes is first used.  Importing pandas takes about half a second.
+    This way "bomcheck --version", "bomcheck --help", and "import bomcheck"
+    don't pay for it.  Once imported, the stand-in is replaced, within this
+    module, by the module itself.
+
+    Parameters
+    ----------
+    name: str
+        Name of the module, e.g. "pandas"
+    alias: str
+        Name the module is known by within this module, e.g. "pd"
+    setup: function, optional
+        Function to run just after the module is imported.  Default: None
+    '''
+    def __init__(self, name, alias, setup=None):
+        self._name = name
+        self._alias = alias
+        self._setup = setup
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+            globals()[self._alias] = self._module
+            if self._setup:
+                self._setup()
+        return getattr(self._module, attr)
+
+
+def set_display_options():
+    ''' Set how pandas displays DataFrames.  (Done when pandas is first
+    used.)'''
+    pd.set_option('display.max_rows', None)  # was pd.set_option('display.max_rows', 150)
+    pd.set_option('display.max_columns', None)
+    pd.set_option('display.max_colwidth', 100)
+    pd.set_option('display.width', 250)
+
+
+def pandas_monkeypatch():
+    ''' Let pandas read Excel files with calamine (pandas < 2.2 can't do
+    so on its own).  Raises ImportError if python-calamine isn't
+    installed.'''
+    from python_calamine.pandas import pandas_monkeypatch
+    pandas_monkeypatch()
+
+
+pd = LazyModule('pandas', 'pd', setup=set_display_options)
+np = LazyModule('numpy', 'np')
+check_sm_parts = LazyModule('check_sm_parts', 'check_sm_parts')  # imports pandas and difflib
+
+# Whether bomcheck.cfg files can be read.  Found without importing tomllib or
+# tomli, which get_bomcheckcfg imports when it's first needed.
+toml_imported = bool(importlib.util.find_spec('tomllib') or importlib.util.find_spec('tomli'))
 #sys.path.insert(0, 'C:\\Users\\a90003183\\OneDrive - ONEVIRTUALOFFICE\\python\\_projects\\bomcheck\\src')
 
 # 
@@ -102,7 +141,7 @@ def getcfg():
 
     getcfg()
     '''
-    return cfg
+    return current_session().cfg
 
 
 def setcfg(**kwargs):
@@ -162,6 +201,20 @@ def get_bomcheckcfg(filename):
         dictionary of settings
     '''
     global printStrs, toml_imported
+    try:
+        import tomllib              # python >= 3.11
+        toml_imported = True
+    except ImportError:
+        try:
+            import tomli as tomllib
+            toml_imported = True
+        except ImportError:
+            toml_imported = False
+            printStr = ('\ntomli (for python < 3.11) or tomllib (for python >= 3.11), not found.\n'
+                        'Therefore bomcheck.cfg will not be used.\n\n')
+            if not printStr in printStrs:
+                printStrs.append(printStr)
+                print(printStr)
     if toml_imported:
         try:
             with open(filename, 'rb') as f:
@@ -189,16 +242,24 @@ def set_globals():
     ''' Create a global variables including the primary one named cfg.
     cfg is a dictionary containing settings used by this program.
 
+    cfg and printStrs stand in for the cfg and printStrs of the
+    BomcheckSession in use (see current_session).  set_globals() also
+    creates the default session, i.e. the one used by the function
+    bomcheck, replacing any previous one.
+
     set_globals() is ran when bomcheck first starts up.
     '''
-    global cfg, printStrs, excelTitle
-
-    cfg = {}
-    printStrs = []
+    global cfg, printStrs, excelTitle, default_session
+    cfg = SessionCfg()
+    printStrs = SessionPrintStrs()
     excelTitle = []
+    default_session = BomcheckSession()
 
+
+def default_cfg():
+    ''' Return a new dictionary of bomcheck's default settings.'''
     # default settings for bomcheck.  See bomcheck.cfg are explanations about variables
-    cfg = {'accuracy': 2,   'ignore': ['3086-*'], 'drop': [],  'exceptions': [],
+    return {'accuracy': 2,   'ignore': ['3086-*'], 'drop': [],  'exceptions': [],
            'from_um': 'IN', 'to_um': 'FT', 'toL_um': 'GAL', 'toA_um': 'SQF',
            'part_num':  ["Material", "PARTNUMBER", "PART NUMBER", "Part Number", "Item"],
            'qty':       ["QTY", "QTY.", "Qty", "Quantity", "Qty Per", "Quantity Per"],
@@ -209,6 +270,15 @@ def set_globals():
            'length_sw': ["LENGTH", "Length", "L", "SIZE", "AMT", "AMOUNT", "MEAS",
                          "COST", "LN.", "LN"],
            'obs': ['Obsolete Date', 'Obsolete'], 'del_whitespace': True,
+           'jobs': 1,   # no. of worker processes used to read and to compare BOMs
+           'engine': 'assy',  # 'assy': compare BOMs one assy at a time; 'batched': all at once
+           'cache': False, 'cache_dir': '', 'cache_mb': 500,  # on-disk cache of BOMs read from files
+           'stats': False,  # collect timings and counts of each run; see getstats()
+           'serve_mb': 1000,  # size limit of BOMs kept in memory by bomcheck --serve
+           'max_alternates': None,  # max no. of slow moving alternates shown per pn; None: no limit
+           'alt_search': 'pn',  # find slow moving alternates by 'pn' (filter_pn) or by 'descrip'
+           'alter_score': [],  # [regex, factor] pairs added to check_sm_parts.ALTER_SCORE
+           'drop_at_read': False,  # drop pns of the drop list, and obsolete ERP pns, as BOMs are read
            # Column names shown in the results (for a given key, one value only):
            'assy':'assy', 'Item':'Item', 'iqdu':'IQDU', 'Q':'Q', 'Item No.':'Item No.',
            'Description':'Description', 'U':'U',
@@ -218,14 +288,291 @@ def set_globals():
           }
 
 
+class BomcheckSession:
+    ''' A session has its own settings (cfg), messages (printStrs),
+    results, run statistics, and cache.  So checks run in different
+    sessions, e.g. in different threads, don't interfere with one another.
+    (A session should run only one check at a time.)  A session also keeps
+    state derived from its settings, e.g. the dictionaries used to rename
+    columns, that is built once and reused from one check to the next.
+
+    The function bomcheck, and the functions getresults, getcfg, setcfg,
+    getstats, and getcachestats, use the default session, which
+    set_globals() creates.
+
+    Parameters
+    ----------
+    cfgpathname: str, optional
+        Pathname of a bomcheck.cfg file whose settings are to be used.
+        Default: None
+    **settings:
+        Settings that replace default ones, e.g. accuracy=4.  (See getcfg)
+
+    Examples
+    --------
+    >>> session = BomcheckSession(drop=['3*-025'], accuracy=4)
+    >>> sw, bom_check, sm, msgs = session.bomcheck('C:/myprojects/folder1')
+    >>> session.getresults(1)   # same as bom_check
+
+    Check several folders at once, in threads:
+
+    >>> from concurrent.futures import ThreadPoolExecutor
+    >>> with ThreadPoolExecutor() as executor:
+    ...     outs = list(executor.map(lambda d: BomcheckSession().bomcheck(d), dirs))
+    '''
+    def __init__(self, cfgpathname=None, **settings):
+        self.cfg = default_cfg()
+        self.printStrs = []
+        self.results = [None, None]
+        self.runstats = new_runstats()  # see getstats()
+        self.bomcache = None            # see get_bom_cache()
+        self.derived_state = {}         # see derived()
+        self.executor = None            # see start_workers()
+        self.executor_jobs = 0
+        if cfgpathname:
+            with self.activate():
+                self.cfg.update(get_bomcheckcfg(cfgpathname))
+        self.cfg.update(settings)
+
+    @contextlib.contextmanager
+    def activate(self):
+        ''' Within a "with session.activate():" block, the cfg, printStrs,
+        etc. used by bomcheck's functions are those of this session.'''
+        token = session_var.set(self)
+        try:
+            yield self
+        finally:
+            session_var.reset(token)
+
+    def bomcheck(self, fn, dic={}, **kwargs):
+        ''' Same as the function bomcheck, but done within this session.'''
+        with self.activate():
+            return check_boms(fn, dic, kwargs)
+
+    def getresults(self, i=1):
+        ''' Same as the function getresults, but for this session.'''
+        with self.activate():
+            return getresults(i)
+
+    def getcfg(self):
+        ''' Return this session's settings.'''
+        return self.cfg
+
+    def setcfg(self, **kwargs):
+        ''' Change this session's settings, e.g. setcfg(accuracy=4).'''
+        self.cfg.update(kwargs)
+
+    def getstats(self):
+        ''' Same as the function getstats, but for this session.'''
+        with self.activate():
+            return getstats()
+
+    def getcachestats(self):
+        ''' Same as the function getcachestats, but for this session.'''
+        with self.activate():
+            return getcachestats()
+
+    def start_workers(self):
+        ''' Start cfg['jobs'] worker processes, and have them import
+        pandas, so that they are ready when BOMs are to be read or
+        compared.  They are kept, and used by this session's checks, until
+        stop_workers() is called.  (Otherwise each check starts its own
+        worker processes and stops them when done.)'''
+        with self.activate():
+            jobs = get_jobs()
+        if self.executor is not None or jobs < 2:
+            return
+        self.executor = concurrent.futures.ProcessPoolExecutor(max_workers=jobs)
+        self.executor_jobs = jobs
+        for future in [self.executor.submit(warm_worker) for _ in range(jobs)]:
+            future.result()
+
+    def stop_workers(self):
+        ''' Stop the worker processes started by start_workers().'''
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    def derived(self, name, cfgkeys, build):
+        ''' Return the state named name that is derived from this
+        session's settings, e.g. a compiled regular expression.  It is made
+        by calling build() when first asked for, and again only if any of
+        the settings named in cfgkeys have changed since.'''
+        key = tuple(repr(self.cfg.get(k)) for k in cfgkeys)
+        found = self.derived_state.get(name)
+        if found is None or found[0] != key:
+            found = self.derived_state[name] = (key, build())
+        return found[1]
+
+
+session_var = contextvars.ContextVar('bomcheck_session', default=None)
+
+
+def current_session():
+    ''' Return the BomcheckSession in use: the one activated in this thread
+    (see BomcheckSession.activate), or else the default session.'''
+    return session_var.get() or default_session
+
+
+class SessionCfg(collections.abc.MutableMapping):
+    ''' Stand-in for the cfg dictionary of the session in use.  (See
+    current_session)'''
+    def __getitem__(self, key):
+        return current_session().cfg[key]
+
+    def __setitem__(self, key, value):
+        current_session().cfg[key] = value
+
+    def __delitem__(self, key):
+        del current_session().cfg[key]
+
+    def __iter__(self):
+        return iter(current_session().cfg)
+
+    def __len__(self):
+        return len(current_session().cfg)
+
+    def __contains__(self, key):
+        return key in current_session().cfg
+
+    def get(self, key, default=None):
+        return current_session().cfg.get(key, default)
+
+    def copy(self):
+        return current_session().cfg.copy()
+
+    def __repr__(self):
+        return repr(current_session().cfg)
+
+
+class SessionPrintStrs(collections.abc.MutableSequence):
+    ''' Stand-in for the printStrs list of the session in use.  (See
+    current_session)'''
+    def __getitem__(self, i):
+        return current_session().printStrs[i]
+
+    def __setitem__(self, i, value):
+        current_session().printStrs[i] = value
+
+    def __delitem__(self, i):
+        del current_session().printStrs[i]
+
+    def __len__(self):
+        return len(current_session().printStrs)
+
+    def insert(self, i, value):
+        current_session().printStrs.insert(i, value)
+
+    def append(self, value):
+        current_session().printStrs.append(value)
+
+    def __contains__(self, value):
+        return value in current_session().printStrs
+
+    def __iter__(self):
+        return iter(current_session().printStrs)
+
+    def __eq__(self, other):
+        return current_session().printStrs == other
+
+    def __repr__(self):
+        return repr(current_session().printStrs)
+
+
+def rename_map(bomtype):
+    ''' Return the dictionary used to rename the columns of a SolidWorks
+    (bomtype "sw") or ERP ("sl") BOM to the names shown in results; e.g.
+    {"PART NUMBER": "Item", "QTY": "Q", ...}.  It is made once per session,
+    and remade only if the settings it depends on change.'''
+    if bomtype == 'sw':
+        keys = ['part_num', 'descrip', 'qty', 'itm_sw', 'Item', 'Description', 'Q', 'Item No.']
+        def build():
+            values = dict.fromkeys(cfg['part_num'], cfg['Item'])
+            values.update(dict.fromkeys(cfg['descrip'], cfg['Description']))
+            values.update(dict.fromkeys(cfg['qty'], cfg['Q']))
+            values.update(dict.fromkeys(cfg['itm_sw'], cfg['Item No.']))
+            return values
+    else:
+        keys = ['part_num', 'um_sl', 'descrip', 'qty', 'obs', 'Item', 'U', 'Description', 'Q']
+        def build():
+            values = dict.fromkeys(cfg['part_num'], cfg['Item'])  # type(cfg['Item']) is a str
+            values.update(dict.fromkeys(cfg['um_sl'], cfg['U']))  # type(cfg['U']) also a str
+            values.update(dict.fromkeys(cfg['descrip'], cfg['Description']))
+            values.update(dict.fromkeys(cfg['qty'], cfg['Q']))
+            values.update(dict.fromkeys(cfg['obs'], 'Obsolete'))
+            return values
+    return current_session().derived('rename_' + bomtype, keys, build)
+
+
+def um_tables():
+    ''' Return two dictionaries: to_ums and factors.  For each unit of
+    measure (um) known to bomcheck, e.g. "mm", to_ums gives the um that a
+    SolidWorks length, area, or volume having that um is converted to, i.e.
+    cfg['to_um'], cfg['toA_um'], or cfg['toL_um']; and factors gives the
+    factor to multiply by to do so.  Made once per session, and remade only
+    if those settings change.'''
+    def build():
+        to_ums, factors = {}, {}
+        for um in set(factorpool) | liquidUMs | areaUMs:
+            to_um = (cfg['toL_um'].lower() if um in liquidUMs else
+                     (cfg['toA_um'].lower() if um in areaUMs else cfg['to_um'].lower()))
+            to_ums[um] = to_um
+            if um in factorpool and to_um in factorpool:
+                factors[um] = factorpool[um] * 1/factorpool[to_um]
+        return to_ums, factors
+    return current_session().derived('um_tables', ['to_um', 'toL_um', 'toA_um'], build)
+
+
+def is_in(find, series, xcept):
+    ''' Same as check_sm_parts.is_in.  (Kept here for programs, e.g.
+    bomcheckgui, that use bomcheck.is_in.)'''
+    return check_sm_parts.is_in(find, series, xcept)
+
+
+def is_ignored(series):
+    ''' Return a boolean Series that is True where a part no. in series
+    matches a glob expression in cfg['ignore'].  Same as
+    check_sm_parts.is_in(cfg['ignore'], series, []), except that the
+    GlobMatcher made from cfg['ignore'] is made once per session.'''
+    def build():
+        find = cfg['ignore'] if isinstance(cfg['ignore'], list) else [cfg['ignore']]
+        if not find:
+            return None
+        return check_sm_parts.GlobMatcher(find)
+    matcher = current_session().derived('ignore', ['ignore'], build)
+    series = series.astype(str).str.strip()
+    if matcher is None:
+        return pd.Series([False]*series.size)
+    return matcher.match(series)
+
+
+def is_dropped(series):
+    ''' Return a boolean Series that is True where a part no. in series
+    matches a glob expression in cfg['drop'] but none in cfg['exceptions'].
+    Same as check_sm_parts.is_in(cfg['drop'], series, cfg['exceptions']),
+    except that the GlobMatcher is made once per session.'''
+    def build():
+        find = cfg['drop'] if isinstance(cfg['drop'], list) else [cfg['drop']]
+        xcept = cfg['exceptions']
+        if not isinstance(xcept, list):
+            xcept = [xcept] if xcept else []
+        return check_sm_parts.GlobMatcher(find, xcept) if find else None
+    matcher = current_session().derived('drop', ['drop', 'exceptions'], build)
+    series = series.astype(str).str.strip()
+    if matcher is None:
+        return pd.Series([False]*series.size)
+    return matcher.match(series)
+
+
 def getresults(i=1):
     ''' If i = 0, return a dataframe containing SW's BOMs
     for which no matching SL BOMs were found.  If i = 1,
     return a dataframe containing compared SW/SL BOMs. If
     i = 2, return a tuple of two items:
     (getresults(0), getresults(1))'''
-    # This function gets results from the global variable named "results".
-    # results is created within the function "bomcheck".
+    # This function gets results from the session in use.  Its results
+    # are created within the function "bomcheck".
+    results = current_session().results
     r = []
     r.append(None) if not results[0] else r.append(results[0][0][1])
     r.append(None) if not results[1] else r.append(results[1][0][1])
@@ -262,7 +609,7 @@ def main():
     parser = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter,
                         description='Program compares CAD BOMs to ERP BOMs.  ' +
                         'Output can be sent to a text file.')
-    parser.add_argument('filename',  help='Filename or a list of filenames.  Each '
+    parser.add_argument('filename', nargs='?', help='Filename or a list of filenames.  Each '
                         'file contains a BOM from SolidWorks or SyteLine.  File '
                         'extensions are .csv or .xlsx only.  If BOM is from SolidWorks, '
                         'filename should end with _sw.csv.  If from Styeline, then _sl.xlsx.  '
@@ -277,6 +624,10 @@ def main():
                         "bomcheck's home: https://github.com/kcarlton55/bomcheck."
                         '  Version: ' + __version__,
                         help="Show author, date, web site, version, then exit")
+    parser.add_argument('--cache', action='store_true', default=False,
+                        help='Keep BOMs that are read from files in an on-disk cache.  '
+                        'Files that have not changed since the last run will not be '
+                        'read again.'),
     parser.add_argument('-d', '--drop_bool', action='store_true', default=False,
                         help="Don't show part nos. from the drop list in check results."),
     parser.add_argument('-dp', '--drop', help='A "drop list"; i.e. a list of part '
@@ -284,8 +635,20 @@ def main():
                         'when searching for slow moving parts, E.g. -dp \"[\'10*\','
                         ' \'26*\', \'479*\']\" (When user submits this list, switch '
                         ' -d will be automatically set to True.)', type=str),
+    parser.add_argument('--drop_at_read', action='store_true', default=False,
+                        help='Remove part nos. of the drop list (when -d is set), and '
+                        'obsolete part nos. of ERP BOMs, from BOMs as soon as they are '
+                        'read, rather than later on.  Thus they are left out of the '
+                        'bom check results too.'),
+    parser.add_argument('--engine', choices=['assy', 'batched'], default=None,
+                        help='How SolidWorks and ERP BOMs are compared: "assy", one '
+                        'assembly at a time, or "batched", all assemblies at once '
+                        '(faster when there are many assemblies).  Results are the same.')
     parser.add_argument('-exc', '--exceptions', help='Exceptions to part numbers shown in '
                         "the drop list.  E.g. -exc \"['2672*']\"", type=str)
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='Number of worker processes used to read and to compare '
+                        'BOMs.  0 means use all CPUs.'),
     parser.add_argument('-fp', '--filter_pn', default=r'....-....-',
                         help='Truncate pns in the SW/SL BOM to allow a comparison of '
                         "the slow_moving part's BOM. "
@@ -298,14 +661,33 @@ def main():
                         'the filename.  If filename ends with _alts or _alts.xlsx '
                         'then, if a _sm.xlsx file is present, a comparison of '
                         'the sm BOM will be made to a sw and/or sl BOM.')
+    parser.add_argument('--stats', action='store_true', default=False,
+                        help='Show how long each stage of the run took, and how many '
+                        'files, rows, and assemblies were processed.')
     parser.add_argument('-v', '--version', action='version', version=__version__,
                         help="Show program's version number and exit"),
+    parser.add_argument('-w', '--watch', metavar='DIR',
+                        help='Watch directory DIR.  Whenever _sw or _sl files therein '
+                        'are added or changed, recheck only the BOMs affected.  Press '
+                        'Ctrl-C to stop.  (Use with -s to keep an Excel file of results '
+                        'up to date.)')
+    parser.add_argument('--serve', type=int, metavar='PORT',
+                        help='Run a bomcheck server at http://127.0.0.1:PORT that other '
+                        'programs send check requests to.  BOMs read, and results of '
+                        'assemblies checked, are kept in memory so that files and '
+                        'assemblies that have not changed are not processed again.  '
+                        'Press Ctrl-C to stop.')
+    parser.add_argument('-i', '--interval', type=float, default=2.0,
+                        help='When watching, seconds to wait between looking for '
+                        'changed files.')
 
   
     if len(sys.argv)==1:
         parser.print_help(sys.stderr)
     else:
         args = parser.parse_args()
+        if not args.filename and not args.watch and not args.serve:
+            parser.error('the following arguments are required: filename')
         bomcheck(args.filename, vars(args))
         
 
@@ -369,6 +751,18 @@ def bomcheck(fn, dic={}, **kwargs):
         bomcheck program.  Other keys and types of
         values that those keys can accept are:
 
+        cache: bool
+            If True, keep BOMs that are read from files in an
+            on-disk cache.  Files that have not changed since
+            the last run will not be read again.  (See
+            getcachestats())  Default: False
+
+        stats: bool
+            If True, collect the wall and CPU time of each
+            stage of the run, and counts of files, rows, and
+            assemblies processed.  Get them afterwards with
+            getstats().  Default: False
+
         d: bool
             If True (or = 1), make use of the list named
             "drop".  See bomcheck_help for more
@@ -383,17 +777,53 @@ def bomcheck(fn, dic={}, **kwargs):
            list of exceptions to part nos. shown in the
            drop list.  e.g. [3125-*-025]
 
+        drop_at_read: bool
+            If True, remove part nos. of the drop list (if d
+            is True) from BOMs, and obsolete part nos. from
+            ERP BOMs, as soon as the BOMs are read.  Parts
+            so removed don't show up in bom check results
+            either.  Default: False
+
         f: bool
             If True (or = 1), follow symbolic links when
             searching for files to process.  (Doesn't work
             when using MS Windows.)  Default: False
 
+        engine: str
+            "assy" or "batched".  How SolidWorks and ERP BOMs
+            are compared: one assembly at a time, or all
+            assemblies at once.  Results are the same, but
+            "batched" is faster when there are many assemblies.
+            Default: "assy"
+
+        jobs: int
+            Number of worker processes used to read BOM files
+            and to compare BOMs.  If 0, use all CPUs.
+            Default: 1
+
         m: int
             Display only m rows of the results to the user.
 
         s: str
             Output file name. Default: bomcheck
 
+        watch: bool
+            If True, fn is the name of a directory to watch.
+            Whenever _sw or _sl files therein are added or
+            changed, only the BOMs affected are rechecked.
+            Ctrl-C stops watching, and then the tuple
+            (getresults(0), getresults(1)) is returned.  (See
+            the function "watch".)  Default: False
+
+        interval: float
+            When watching, seconds to wait between looking
+            for changed files.  Default: 2.0
+
+        serve: int
+            If given, run a bomcheck server at this port no.
+            instead of checking fn.  (See bom_server.py)
+            Default: None
+
     Returns
     =======
 
@@ -443,10 +873,20 @@ def bomcheck(fn, dic={}, **kwargs):
 
         >>> bomcheck("C:/myprojects/folder1", c="C:/mycfgpath/bomcheck.cfg")
 
+    (To run checks at the same time, e.g. in different threads, use a
+    BomcheckSession for each.)
     '''
-    global printStrs, cfg, results
-    printStrs = []
-    results = [None, None]
+    return current_session().bomcheck(fn, dic, **kwargs)
+
+
+def check_boms(fn, dic, kwargs):
+    ''' Do the work of the function bomcheck within the session in use.
+    dic and kwargs are those given to bomcheck.'''
+    session = current_session()
+    session.printStrs = []
+    session.results = [None, None]
+    session.runstats = new_runstats()
+    wall0, cpu0 = time.perf_counter(), cputime()
 
     c = dic.get('cfgpathname')    # if from the command line, e.g. bomcheck or python bomcheck.py
 
@@ -480,6 +920,16 @@ def bomcheck(fn, dic={}, **kwargs):
             exit()
 
     cfg['filter_descrip'] = dic.get('filter_descrip', None)   
+    if dic.get('jobs') is not None:
+        cfg['jobs'] = dic.get('jobs')
+    if dic.get('cache'):
+        cfg['cache'] = True
+    if dic.get('engine'):
+        cfg['engine'] = dic.get('engine')
+    if dic.get('drop_at_read'):
+        cfg['drop_at_read'] = True
+    if dic.get('stats'):
+        cfg['stats'] = True
     cfg['filter_pn'] = dic.get('filter_pn', r'....-....-')
 
     cfg['run_bomcheck'] = True   
@@ -501,6 +951,21 @@ def bomcheck(fn, dic={}, **kwargs):
         cfg['filter_descrip'] = kwargs.get('filter_description')
     if kwargs.get('filter_pn'):
         cfg['filter_pn'] = kwargs.get('filter_pn')
+    if kwargs.get('jobs') is not None:
+        cfg['jobs'] = kwargs.get('jobs')
+    if kwargs.get('cache') is not None:
+        cfg['cache'] = kwargs.get('cache')
+    if kwargs.get('engine'):
+        cfg['engine'] = kwargs.get('engine')
+    if kwargs.get('drop_at_read') is not None:
+        cfg['drop_at_read'] = kwargs.get('drop_at_read')
+    if kwargs.get('stats') is not None:
+        cfg['stats'] = kwargs.get('stats')
+    if kwargs.get('max_alternates') is not None:
+        cfg['max_alternates'] = kwargs.get('max_alternates')
+    if kwargs.get('alt_search'):
+        cfg['alt_search'] = kwargs.get('alt_search')
+    cache0 = getcachestats()
     f = kwargs.get('f', False)
     m = kwargs.get('m', None)
       
@@ -543,16 +1008,30 @@ def bomcheck(fn, dic={}, **kwargs):
         
     ####################################################################
 
+    if dic.get('watch'):   # from the command line: bomcheck --watch DIR
+        return watch(dic['watch'], dic.get('interval', 2.0), f)
+    if kwargs.get('watch'):
+        return watch(fn, kwargs.get('interval', 2.0), f)
+    if dic.get('serve') or kwargs.get('serve'):   # bomcheck --serve PORT
+        import bom_server
+        return bom_server.serve(session, sys.modules[__name__], port=dic.get('serve') or kwargs['serve'],
+                                max_mb=cfg.get('serve_mb', 1000))
+
     if isinstance(fn, str) and fn.startswith('[') and fn.endswith(']'):
         fn = ast.literal_eval(fn)  # change a string to a list
     elif isinstance(fn, str):
         fn = [fn]    
     pd.set_option('display.max_rows', m)
-    fn = get_fnames(fn, followlinks=f)  # get filenames with any extension.
-    dirname, swfiles, slfiles, smfiles = gatherBOMs_from_fnames(fn)
+    with stage('find'):
+        fn = get_fnames(fn, followlinks=f, bomtypes=('sw', 'sl', 'sm'))  # get _sw, _sl, & _sm filenames
+    with stage('read'):
+        dirname, swfiles, slfiles, smfiles = gatherBOMs_from_fnames(fn)
     if smfiles and cfg['run_bomcheck'] == False:
         try:
-            sm_pts_comparison = check_sm_parts.check_sm_parts([swfiles, slfiles], smfiles, cfg)
+            with stage('slow_moving'):
+                sm_pts_comparison = check_sm_parts.check_sm_parts([swfiles, slfiles], smfiles, session.cfg,
+                                                                  get_jobs(), worker_pool,
+                                                                  column_layout)
         except Exception as e:
             printStr = ('\nError 206. \n' +
                         'Unknown error occured in the function "sm_pts_comparison".\n' +
@@ -568,24 +1047,29 @@ def bomcheck(fn, dic={}, **kwargs):
         sm_pts_comparison = None  
     
     if cfg['run_bomcheck']:    
-        if ('mtltest' in cfg) and cfg['mtltest']:
-            typeNotMtl(slfiles) # report on corrupt data within SyteLine.  See function typeNotMtl
-            
-        # lone_sw is a dic; Keys are assy nos; Values are DataFrame objects (SW
-        # BOMs only).  merged_sw2sl is a dic; Keys are assys nos; Values are
-        # Dataframe objects (merged SW and SL BOMs).
-        lone_sw, merged_sw2sl = collect_checked_boms(swfiles, slfiles)
-    
-        title_dfsw = []                # Create a list of tuples: [(title, swbom)... ]
-        for k, v in lone_sw.items():   # where "title" is is the title of the BOM,
-            title_dfsw.append((k, v))  # usually the part no. of the BOM.
-    
-        title_dfmerged = []            # Create a list of tuples: [(title, mergedbom)... ]
-        for k, v in merged_sw2sl.items():
-            title_dfmerged.append((k, v))  # e.g. {assynum1:bomdf1, ... assynumn:bomdfn}
-    
-        title_dfsw, title_dfmerged = concat_boms(title_dfsw, title_dfmerged)
-        results = title_dfsw, title_dfmerged
+        with stage('compare'):
+            if ('mtltest' in cfg) and cfg['mtltest']:
+                typeNotMtl(slfiles) # report on corrupt data within SyteLine.  See function typeNotMtl
+
+            # lone_sw is a dic; Keys are assy nos; Values are DataFrame objects (SW
+            # BOMs only).  merged_sw2sl is a dic; Keys are assys nos; Values are
+            # Dataframe objects (merged SW and SL BOMs).
+            if cfg.get('engine') == 'batched':
+                title_dfsw, title_dfmerged = collect_checked_boms_batched(swfiles, slfiles)
+            else:
+                lone_sw, merged_sw2sl = collect_checked_boms(swfiles, slfiles)
+
+                title_dfsw = []                # Create a list of tuples: [(title, swbom)... ]
+                for k, v in lone_sw.items():   # where "title" is is the title of the BOM,
+                    title_dfsw.append((k, v))  # usually the part no. of the BOM.
+
+                title_dfmerged = []            # Create a list of tuples: [(title, mergedbom)... ]
+                for k, v in merged_sw2sl.items():
+                    title_dfmerged.append((k, v))  # e.g. {assynum1:bomdf1, ... assynumn:bomdfn}
+
+        with stage('concat'):
+            title_dfsw, title_dfmerged = concat_boms(title_dfsw, title_dfmerged)
+        session.results = title_dfsw, title_dfmerged
     
         if title_dfsw or title_dfmerged:
             print('calculation done')
@@ -601,21 +1085,31 @@ def bomcheck(fn, dic={}, **kwargs):
         print('\n', sm_pts_comparison)
         print('\n', printStrs)
 
-    if cfg.get('export') and not cfg['run_bomcheck'] and not sm_pts_comparison.empty: 
-        cfg['export'] = cfg['export'].replace('_alts', '')
-        export2xlsx(cfg['export'], sm_pts_comparison, False) 
-    if cfg.get('export') and cfg['run_bomcheck'] and not getresults(1).empty:
-        export2xlsx(cfg['export'], getresults(1), True) 
-    if cfg.get('export') and cfg['run_bomcheck'] and not getresults(0).empty:
-        export2xlsx(cfg['export'], getresults(0), True) 
+    with stage('export'):
+        if cfg.get('export') and not cfg['run_bomcheck'] and not sm_pts_comparison.empty: 
+            cfg['export'] = cfg['export'].replace('_alts', '')
+            export2xlsx(cfg['export'], sm_pts_comparison, False) 
+        if cfg.get('export') and cfg['run_bomcheck']:
+            sheets = [(name, df) for name, df in [('BOM Check', getresults(1)),
+                                                  ('SW BOMs', getresults(0))]
+                      if df is not None and not df.empty]
+            if sheets:
+                export2xlsx(cfg['export'], sheets, True)
+
+    if cfg.get('stats'):
+        finish_runstats(wall0, cpu0, cache0)
+        if dic:   # bomcheck --stats from the command line
+            print('\n' + stats_report(getstats()))
 
-    return getresults(0), getresults(1), sm_pts_comparison, printStrs
+    return getresults(0), getresults(1), sm_pts_comparison, session.printStrs
 
 
-def get_fnames(fn, followlinks=False):
+def get_fnames(fn, followlinks=False, bomtypes=None):
     ''' Interpret fn to get a list of filenames based on
     fn's value.
 
+    calls: iter_fnames
+
     Parameters
     ----------
     fn: str or list
@@ -632,6 +1126,12 @@ def get_fnames(fn, followlinks=False):
         direcory, then filenames are gathered from that
         directory and from subdirectories thereof.  The
         default is False.
+    bomtypes: tuple, optional
+        If given, e.g. ('sw', 'sl', 'sm'), only filenames
+        that the function bom_type classifies as one of
+        these are returned.  Other files are passed over as
+        directories are searched.  The default is None,
+        i.e. return all filenames.
 
     Returns
     -------
@@ -642,27 +1142,86 @@ def get_fnames(fn, followlinks=False):
         a pathname, e.g. "C:/dir1/dir2/filename".  The
         filenames can have any type of extension.
     '''
+    return list(iter_fnames(fn, followlinks, bomtypes))
+
+
+def iter_fnames(fn, followlinks=False, bomtypes=None):
+    ''' Like get_fnames, but yield filenames one at a time as they are
+    found.  A directory is searched only once, even if it is within more
+    than one of the directories of fn.  So, too, when followlinks is True,
+    a symbolic link that leads back to a directory already searched (a
+    cycle) is not followed.
+
+    calls: walk_dir, bom_type
+    '''
     if isinstance(fn, str) and fn.startswith('[') and fn.endswith(']'):
         fn = ast.literal_eval(fn)  # if fn a string like "['fname1', 'fname2', ...]", convert to a list
     elif isinstance(fn, str):
         fn = [fn]   # fn a string like "fname1", convert to a list like [fname1]
 
-    _fn1 = []
+    seen = set()   # directories searched; see walk_dir
     for f in fn:
-        _fn1 += glob.glob(f)
-
-    _fn2 = []    # temporary holder
-    for f in _fn1:
-        if followlinks==True and os.path.islink(f) and os.path.exists(f):
-            _fn2 += get_fnames(os.readlink(f))
-        elif os.path.isdir(f):  # if a dir, gather all filenames in dirs and subdirs thereof
-            for root, dirs, files in os.walk(f, followlinks=followlinks):
-                for filename in files:
-                  _fn2.append(os.path.join(root, filename))
-        else:
-            _fn2.append(f)
+        for g in glob.glob(f):
+            if os.path.isdir(g):  # if a dir, gather all filenames in dirs and subdirs thereof
+                for entry in walk_dir(g, followlinks, seen):
+                    if bomtypes is None or bom_type(entry.name) in bomtypes:
+                        yield entry.path
+            elif bomtypes is None or bom_type(g) in bomtypes:
+                yield g
+
+
+def walk_dir(top, followlinks=False, seen=None):
+    ''' Yield os.DirEntry objects of the files within directory top and
+    its subdirectories, in the same order that os.walk would find them.
+    (Used by iter_fnames and scan_bom_files.)
+
+    Parameters
+    ----------
+    top: str
+        Name of the directory.
+    followlinks: bool, optional
+        If True, follow symbolic links to directories.  Default: False
+    seen: set, optional
+        (st_dev, st_ino) of directories already searched.  These are not
+        searched again, and directories searched are added to it.  (Where
+        the file system gives no inode no., i.e. st_ino is 0, the real
+        pathname of a directory is used instead.)  Default: None, i.e. an
+        empty set.
+    '''
+    def first_visit(path):
+        try:
+            st = os.stat(path)   # not DirEntry.stat(); on MS Windows its st_ino is 0
+        except OSError:
+            return False
+        if st.st_ino:
+            key = (st.st_dev, st.st_ino)
+        else:   # e.g. FAT volumes and some network shares; st_ino is 0 for every directory
+            key = os.path.normcase(os.path.realpath(path))
+        if key in seen:
+            return False
+        seen.add(key)
+        return True
 
-    return _fn2
+    seen = set() if seen is None else seen
+    if not first_visit(top):
+        return
+    stack = [top]
+    while stack:
+        try:
+            entries = list(os.scandir(stack.pop()))
+        except OSError:   # directory deleted or not accessible
+            continue
+        subdirs = []
+        for e in entries:
+            try:
+                is_dir = e.is_dir()
+            except OSError:
+                is_dir = False
+            if not is_dir:
+                yield e
+            elif (followlinks or not e.is_symlink()) and first_visit(e.path):
+                subdirs.append(e.path)
+        stack.extend(reversed(subdirs))
 
 
 def gatherBOMs_from_fnames(filename):
@@ -684,7 +1243,11 @@ def gatherBOMs_from_fnames(filename):
     then the subassembly BOMs will be extracted from that
     BOM and be added to the dictionaries.
 
-    calls:  deconstructMultilevelBOM, test_for_missing_columns
+    If cfg['jobs'] is greater than 1, files are read by that
+    many worker processes.  Results are the same as when
+    files are read one at a time.
+
+    calls:  ingest_tasks
 
     Parmeters
     =========
@@ -724,163 +1287,47 @@ def gatherBOMs_from_fnames(filename):
     count_sl = 0
     count_sm = 0
     for f in filename:  # from filename extract all _sw & _sl files and put into swfilesdic & slfilesdic
-        i = f.rfind('_')
-        if f[i:i+4].lower() == '_sw.' or f[i:i+4].lower() == '_sl.' or f[i:i+4].lower() == '_sm.'  :
-            dname, fname = os.path.split(f)
-            k = fname.find('_')
-            fntrunc = fname[:k]  # Name of the sw file, excluding path, and excluding _sw.xlsx
-            if f[i:i+4].lower() == '_sw.' and '~' not in fname: # Ignore names like ~$085637_sw.xlsx
+        bomtype = bom_type(f)  # None for names like ~$085637_sw.xlsx
+        if bomtype:
+            fname = os.path.basename(f)
+            fntrunc = fname[:fname.find('_')]  # Name of the sw file, excluding path, and excluding _sw.xlsx
+            if bomtype == 'sw':
                 swfilesdic.update({fntrunc: f})
                 if dirname == '.':
                     dirname = os.path.dirname(os.path.abspath(f)) # use 1st dir where a _sw file is found to put bomcheck.xlsx
-            elif f[i:i+4].lower() == '_sl.' and '~' not in fname:
+            elif bomtype == 'sl':
                 slfilesdic.update({fntrunc: f})
-            elif f[i:i+4].lower() == '_sm.' and '~' not in fname:
+            elif bomtype == 'sm':
                 smfilesdic.update({fntrunc: f})
 
-    swdfsdic = {}  # for collecting SW BOMs to a dic
-    for k, v in swfilesdic.items():   # e.g., k = '0300-2024-045', v = 'C:\path\0300-2024-045_sw.xlsx'
-        ptsonlyflag = False
-        try:
-            _, file_extension = os.path.splitext(v)
-            if file_extension.lower() == '.xlsx' or  file_extension.lower() == '.xls':
+    tasks = []   # e.g. [('sw', '0300-2024-045', 'C:\path\0300-2024-045_sw.xlsx'), ...]
+    for bomtype, filesdic in [('sw', swfilesdic), ('sl', slfilesdic), ('sm', smfilesdic)]:
+        count('files_' + bomtype, len(filesdic))
+        for k, v in filesdic.items():
+            tasks.append((bomtype, k, v))
+            file_extension = os.path.splitext(v)[1].lower()
+            if bomtype == 'sw' and file_extension in ('.xlsx', '.xls'):
                 count_sw_xlsx += 1
-                df = pd.read_excel(v, na_values=[' '], engine='calamine')
-                df.columns = df.columns.str.replace(r'\n', '', regex=True)
-                df.replace(r'\n',' ', regex=True, inplace=True)
-                if df.columns[1] == 'Unnamed: 1':
-                    df = pd.read_excel(v, na_values=[' '], skiprows=1, engine='calamine')
-                    df.columns = df.columns.str.replace(r'\n', '', regex=True)
-                    df.replace(r'\n',' ', regex=True, inplace=True)
-                    if get_col_name(df, cfg['descrip']):
-                        df[get_col_name(df, cfg['descrip'])].fillna('----- sw_description_missing -----', inplace=True)
-                    df = df.astype(str)
-                    df = df.replace('nan', 0)
-                dfsw_found=True
-                if dfsw_found:  # do this if a _sl.xlsx file renamed to a _sw.xlsx file.  That is a sl file maskarading as a sw file.
-                    df.drop(df[df.iloc[:,0].astype('str').str.contains('Group')].index, inplace=True)
-            elif file_extension.lower() == '.csv':
+            elif bomtype == 'sw' and file_extension == '.csv':
                 count_sw_csv += 1
-                df = csv_to_df(v, descrip=cfg['descrip'], encoding="ISO-8859-1")
-                dfsw_found=True
-            else:
-                dfsw_found = False
-            if 'partsonly' in v.lower() or 'onlyparts' in v.lower():
-                ptsonlyflag = True
-            if (dfsw_found and (not (test_for_missing_columns('sw', df, k))) and
-                    get_col_name(df, cfg['level_sl'])): # if "Level" found if df.columns, return "Level".  For if sl BOM renamed to a sw BOM.
-                toplevel = True
-                swdfsdic.update(deconstructMultilevelBOM(df, 'sw', k, toplevel, ptsonlyflag))
-            elif dfsw_found and (not test_for_missing_columns('sw', df, k)):
-                toplevel = False
-                swdfsdic.update(deconstructMultilevelBOM(df, 'sw', k, toplevel, ptsonlyflag))
-        except:
-            printStr = ('\nError 204. '
-                        'File has been excluded from analysis:\n\n ' + v + '\n\n'
-                        'Perhaps you have it open in another application?\n'
-                        'Or possibly the BOM is misconstructed.\n\n')
-            printStrs.append(printStr)
-            print(printStr)
-
-    sldfsdic = {}  # for collecting SL BOMs to a dic
-    for k, v in slfilesdic.items():
-        ptsonlyflag = False
-        try:
-            _, file_extension = os.path.splitext(v)
-            if file_extension.lower() == '.xlsx' or  file_extension.lower() == '.xls':
+            elif bomtype == 'sl' and file_extension in ('.xlsx', '.xls'):
                 count_sl += 1
-                df = pd.read_excel(v, na_values=[' '], engine='calamine')
-                if 'Item' in df.columns:
-                    df.dropna(subset=['Item'], inplace=True)  # Costed BOM has useless 2nd row that starts with "BOM Alternate ID: 0".  Item in that row is NaN.  Delete that row.
-
-                if 'Type' in df.columns:
-                    df['Type'].fillna('Material', inplace=True) # costed BOM and a black value in 'Type' column. Give it value 'Material'.  This will keep bomcheck quiet.
-
-                dfsl_found=True
-            else:
-                dfsl_found=False
-
-            # Grrr! SyteLine version 10 puts in unwanted lines.  Deal with it:
-            if dfsl_found:
-                df.drop(df[df.iloc[:,0].astype(str).str.contains('Group')].index, inplace=True)
-                # df.iloc[:,0]                                  yields: Group Item: SC300TL2111311, 0, 1, 1, 2, 2, ...
-                # df[df.iloc[:,0].str.contains('Group')].index  yields: Index([0], dtype='int64')
-                # df.index                                      yields: df.drop([0], inplace=True) RangeIndex(start=0, stop=74, step=1)
-                # df[df.iloc[:,0].str.contains('1')].index      yields: Index([0, 2, 3, 6, 10, 47, 52, 57, 58, 59, 60, 61, 73], dtype='int64')
-                # df.drop(index=[0, 8, 12, 23])                 will drop rows 0, 8, 12, 23
-                # reference: https://www.geeksforgeeks.org/drop-a-list-of-rows-from-a-pandas-dataframe/, see row: Drop Rows with Conditions in Pandas
-            if 'Labor' in df.columns:  # df comes from a costed BOM
-                df.drop(columns=['Outside', 'Material', 'Labor', 'Overhead'], inplace=True) # Most importantly, drop "Material".  It causes issues in function "typeNotMtl"
-            if 'partsonly' in v.lower() or 'onlyparts' in v.lower():
-                ptsonlyflag = True
-            if (dfsl_found and (not (test_for_missing_columns('sl', df, k))) and
-                    get_col_name(df, cfg['level_sl'])):
-                toplevel = True
-                sldfsdic.update(deconstructMultilevelBOM(df, 'sl', k, toplevel, ptsonlyflag))
-            elif dfsl_found and (not test_for_missing_columns('sl', df, k)):
-                sldfsdic.update(deconstructMultilevelBOM(df, 'sl', k, ptsonlyflag))
-
-        except:
-            printStr = ('\nError 201. '
-                        'File has been excluded from analysis:\n\n ' + v + '\n\n'
-                        'Perhaps you have it open in another application?\n\n')
-            printStrs.append(printStr)
-            print(printStr)
+            elif bomtype == 'sm' and file_extension in ('.xlsx', '.xls'):
+                count_sm += 1
 
-    def alter_sm_df(df):
-            df = df.drop(df.index[-2:])  # Last two rows of a SM BOM are garbage
-            df['Unit Cost'] = df['Unit Cost'].replace('[$,]', '', regex=True).astype(float).astype(int)
-            df = df.fillna({'Item': '', 'Description': '', 'Qty On Hand': 0, 'Last Movement (Days)': 0,
-                       'Unit Cost': 0, 'Movement?': '', 'Year n-1 Usage': 0,
-                       'Year n-2 Usage': 0})
-            df = df.astype({'Qty On Hand': int, 'Last Movement (Days)': int,
-                            'Unit Cost': int, 'Year n-1 Usage': int, 
-                            'Year n-2 Usage': int, 'Last Movement (Days)': int})
-            df = df.rename(columns={'Qty On Hand':'On\nHand', 'Movement?': 'De-\nmand?',
-                                    'Year n-1 Usage': 'Yr n-1\nUsage',
-                                    'Year n-2 Usage': 'Yr n-2\nUsage',
-                                    'Last Movement (Days)': 'Last Used\n(Days)'} )
-            today = date.today()
-            formatted_date = today.strftime("%m/%d/%Y")
-            df['Last Receipt'] = df['Last Receipt'].fillna(formatted_date)
-            df['today'] = formatted_date                 # add new column
-            df['today'] = pd.to_datetime(df['today'])    # convert object so that subtraction is possible
-            df['on\nshelf\n(days)'] = (df['today'] - df['Last Receipt']).astype('int64')  # today - 'Last Receipt'
-            df['on\nshelf\n(days)'] = df['on\nshelf\n(days)'] / 10**9              # convert to seconds
-            df['on\nshelf\n(days)'] = (df['on\nshelf\n(days)'] / 86400).astype('int')  # convert to days
-            return df
-        
+    swdfsdic = {}  # for collecting SW BOMs to a dic
+    sldfsdic = {}  # for collecting SL BOMs to a dic
     smdfsdic = {}
-    dfsm_found = False
-    for k, v in smfilesdic.items():
-        try:
-            _, file_extension = os.path.splitext(v)
-            if file_extension.lower() == '.xlsx' or  file_extension.lower() == '.xls':
-                count_sm += 1
-                df = pd.read_excel(v, engine='calamine', usecols=['Item', 'Description', 'Unit Cost',
-                                               'Movement?', 'Qty On Hand', 'Year n-1 Usage', 'Last Receipt',
-                                               'Year n-2 Usage', 'Last Movement (Days)'])                             
-                df = alter_sm_df(df)
-                dfsm_found = True
-            else:
-                dfsm_found=False
-        except:
-            printStr = ('\nError 205 occurred regarading file ' + v + '\n'
-                        'Some possible reasons error occured\n\n'
-                        '1) Counld not read file. Is file present at the location \n'
-                        '   that you indicated.  Has the add-on module named \n'
-                        '   calamine been installed properly?'
-                        '2) Perhaps you have it open in another application?\n\n'
-                        '3) At minimum, columns with these names are expected\n'
-                        '   to be in the SM BOM: Item, Description, Unit Cost,\n' 
-                        '   Movement?, Qty On Hand, Year n-1 Usage,\n' 
-                        '   Year n-2 Usage,  Last Movement (Days).\n'
-                        '   (Names are case sensitive.)')
-            printStrs.append(printStr)
-            print(printStr)
-        if dfsm_found:
-            smdfsdic.update({k: df})
-                
+    dfsdic = {'sw': swdfsdic, 'sl': sldfsdic, 'sm': smdfsdic}
+    ingested = ingest_tasks(tasks)
+    for (bomtype, k, v), (dic, _printStrs, from_cache) in zip(tasks, ingested):
+        dfsdic[bomtype].update(dic)
+        for printStr in _printStrs:
+            if printStr not in printStrs:
+                printStrs.append(printStr)
+                if from_cache:
+                    print(printStr)
+
     try:
         df = pd.read_clipboard(engine='python')
         if 'Year n-1 Usage' in df.columns:
@@ -889,8 +1336,8 @@ def gatherBOMs_from_fnames(filename):
             smdfsdic.update({'BOMfromClipboard': df})
 
     except Exception as e:
-        print('Error reading clipbard: ' + str(e))   
-            
+        print('Error reading clipbard: ' + str(e))
+
     if count_sl > 0 and (count_sw_csv + count_sw_xlsx) ==  0 and count_sm == 0:
         printStr = ('_sl.xlsx file(s) submitted, but no _sw.csv/_sw.xlsx or _sm.xlsx '
                     'to match against.  Therefore no results to show.  ')
@@ -910,144 +1357,811 @@ def gatherBOMs_from_fnames(filename):
     if os.path.islink(dirname):
         dirname = os.readlink(dirname)
 
+    count('assys_sw', len(swdfsdic))
+    count('assys_sl', len(sldfsdic))
     return dirname, swdfsdic, sldfsdic, smdfsdic
 
 
-def typeNotMtl(sldic):
-    ''' SyteLine has a column named "Type" within its multilevel BOM tables.
-    The value in that column should ALWAYS be "Material".  If it is not, then
-    some sort of signal is sent within SyteLine causing parts to have no lead
-    time for particular purchased parts.  I was told that for some inexplicable
-    reason sometimes SyteLine puts another value in the Type column, usually
-    "other".  This small function, typeNotMtl, added December 2024, detects
-    when this hiccup occurs and notifies the user.
+def ingest_tasks(tasks):
+    ''' Read the BOM files listed in tasks.  Files are taken from the
+    cache if cfg['cache'] is True (see get_bom_cache), and are read by
+    worker processes if cfg['jobs'] > 1.
+
+    calls: read_sw_file, read_sl_file, read_sm_file, ingest_file
 
     Parameters
     ----------
-    sldic: dictionary
-        Dictionary of ERP BOMs.  Dictionary keys are strings
-        and they are of assembly part numbers.  Dictionary
-        values are pandas DataFrame objects which are BOMs
-        for those assembly pns.
+    tasks: list
+        List of tuples: [(bomtype, k, v), ...]; where bomtype is "sw",
+        "sl", or "sm"; k is the part no. derived from the filename; and v is
+        the pathname of the file.
 
     Returns
     -------
-    None.  (global value "printStrs" will be appended to.  This will result
-            in the contatenation of printStrs being shown to the user.)
+    out: list
+        List of tuples: [(dic, printStrs, from_cache), ...], one for each
+        item in tasks.  dic is a dictionary of BOMs extracted from the
+        file, printStrs a list of messages generated while reading the file,
+        and from_cache is True if dic was found in the cache.
     '''
     global printStrs
-    printStr = None
-    flag = False
-    _values_ = dict.fromkeys(cfg['part_num'], cfg['Item'])  # type(cfg['Item']) is a str
-    for key, value in sldic.items():
-        # Elminate useless columns from SyteLine that cause bomcheck to be confused
-        # about which contains part nos. and which contains part no. descriptions.
-        # If Material and Material Description both present, they contain the pns and pn descrips
-        if 'Material' in value.columns and 'Material Description' in value.columns:
-            if 'Item' in value.columns:
-                value.drop('Item', axis=1, inplace=True)
-            if 'Description' in value.columns:
-                value.drop('Description', axis=1, inplace=True)
-        if 'Type' in value.columns: # and 'WC' in value.columns:
-            value.rename(columns=_values_, inplace=True)
-            value_filtered = value[(value.Type != 'Material') & (value[cfg['Item']].str.slice(-3) != '-OP')]
-            corrupt_pns = list(value_filtered[cfg['Item']])
-            if corrupt_pns and not flag:
-                printStr = ('\nCorrupt subassemblies found from SyteLine.  Though the "Source" ' 
-                            'of various items is "Material", in the subassembly BOM however '
-                            'they are shown otherwise.  That is, when "Type" is not "Material" '
-                            'in the subassembly BOM, the items will not be placed on order.  '
-                            'To correct, open up the subassembly, and for the problematic item '
-                            'change "Type" to "Material".')
-                flag = True
-            if corrupt_pns:
-                printStr = printStr + f'\n\nSubassembly {key}.  Problematic parts are:\n'
-                for corrupt_pn in corrupt_pns:
-                    printStr = printStr + f'{corrupt_pn}, '
-    if printStr:
-        printStrs.append(printStr)
-
-
-def test_for_missing_columns(bomtype, df, pn):
-    ''' SolidWorks and SyteLine BOMs require certain
-    essential columns to be present.  This function
-    looks at those BOMs that are within df to see if
-    any required columns are missing.  If found,
-    print to screen.
+    ingested = [None] * len(tasks)
+    cache = get_bom_cache()
+    todo = []
+    for n, (bomtype, k, v) in enumerate(tasks):
+        if cache and bomtype != 'sm':  # sm BOMs are cached by read_sm_cached instead
+            cached = cache.get(v, bomtype, cfg)
+            if cached is not None:
+                ingested[n] = cached + (True,)
+                continue
+        todo.append(n)
+
+    jobs = get_jobs()
+    if jobs > 1 and len(todo) > 1:
+        _cfg = picklable_cfg()
+        chunksize = max(1, len(todo) // (jobs * 4))
+        with worker_pool(jobs) as executor:
+            results = executor.map(ingest_file, [tasks[n] + (_cfg,) for n in todo],
+                                   chunksize=chunksize)
+            for n, (dic, _printStrs, _runstats) in zip(todo, results):
+                ingested[n] = (dic, _printStrs, False)
+                merge_runstats(_runstats)
+    else:
+        readers = {'sw': read_sw_file, 'sl': read_sl_file, 'sm': read_sm_file}
+        for n in todo:
+            bomtype, k, v = tasks[n]
+            i = len(printStrs)
+            dic = readers[bomtype](k, v)
+            ingested[n] = (dic, printStrs[i:], False)
+
+    if cache:
+        for n in todo:
+            bomtype, k, v = tasks[n]
+            dic, _printStrs, from_cache = ingested[n]
+            if dic and bomtype != 'sm':
+                cache.put(v, bomtype, cfg, dic, _printStrs)
+    return ingested
+
+
+def bom_type(filename):
+    ''' Return "sw", "sl", or "sm" if filename is that of a SolidWorks,
+    SyteLine, or slow moving parts BOM; e.g. 0300-2024-045_sw.xlsx.
+    Otherwise return None.  (Names containing ~, like ~$085637_sw.xlsx, are
+    temporary files made by Excel.  None is returned for them.)'''
+    fname = os.path.basename(filename)
+    i = fname.rfind('_')
+    suffix = fname[i:i+4].lower()
+    if suffix in ('_sw.', '_sl.', '_sm.') and '~' not in fname:
+        return suffix[1:3]
+    return None
+
+
+def read_sw_file(k, v):
+    ''' Read a SolidWorks BOM from a _sw.xlsx or _sw.csv file.  If it is a
+    multilevel BOM, subassembly BOMs are extracted from it.
+
+    calls: sniff_header_row, needed_columns, csv_to_df,
+           test_for_missing_columns, deconstructMultilevelBOM
 
     Parameters
-    ==========
-
-    bomtype: string
-        "sw" or "sl"
-
-    df: Pandas DataFRame
-        A SW or SL BOM
-
-    pn: string
-        Part number of the BOM
+    ----------
+    k: str
+        Part no. of the BOM derived from the filename; e.g. 0300-2024-045
+        from 0300-2024-045_sw.xlsx
+    v: str
+        Pathname of the file.
 
     Returns
-    =======
-
-    out: bool
-        True if BOM afoul.  Otherwise False.
+    -------
+    out: dict
+        {assypn1: BOM1, assypn2: BOM2, ...}.  Empty if the file could not
+        be processed.  (Error 204 is then reported.)
     '''
     global printStrs
-    if bomtype == 'sw':
-        required_columns = [cfg['qty'], cfg['descrip'],
-                            cfg['part_num']]#, cfg['itm_sw']]
-    else: # 'for sl bom'
-        required_columns = [cfg['qty'], cfg['descrip'],
-                            cfg['part_num'], cfg['um_sl']]
+    ptsonlyflag = False
+    try:
+        _, file_extension = os.path.splitext(v)
+        if file_extension.lower() == '.xlsx' or  file_extension.lower() == '.xls':
+            with pd.ExcelFile(v, engine='calamine') as xl:
+                header = sniff_header_row(xl)
+                usecols = needed_columns(xl.parse(header=header, nrows=0).columns)
+                df = xl.parse(header=header, na_values=[' '], usecols=usecols)
+            df.columns = df.columns.str.replace(r'\n', '', regex=True)
+            for i in np.flatnonzero((df.dtypes == object).to_numpy()):  # only strings can contain newlines
+                df.isetitem(i, df.iloc[:, i].replace(r'\n',' ', regex=True))
+            if header > 0:   # BOM has a title row
+                __descrip = column_layout(df)['Description']
+                if __descrip:
+                    df[__descrip].fillna('----- sw_description_missing -----', inplace=True)
+                df = df.astype(str)
+                df = df.replace('nan', 0)
+            dfsw_found=True
+            if dfsw_found:  # do this if a _sl.xlsx file renamed to a _sw.xlsx file.  That is a sl file maskarading as a sw file.
+                df.drop(df[df.iloc[:,0].astype('str').str.contains('Group')].index, inplace=True)
+        elif file_extension.lower() == '.csv':
+            df = csv_to_df(v, descrip=cfg['descrip'], encoding="ISO-8859-1")
+            dfsw_found=True
+        else:
+            dfsw_found = False
+        if 'partsonly' in v.lower() or 'onlyparts' in v.lower():
+            ptsonlyflag = True
+        if dfsw_found:
+            count('rows_sw', len(df))
+            df, layout = normalize_columns(df)
+        if (dfsw_found and (not (test_for_missing_columns('sw', df, k))) and
+                layout['Level']): # if "Level" found if df.columns, return "Level".  For if sl BOM renamed to a sw BOM.
+            toplevel = True
+            with stage('deconstruct'):
+                return deconstructMultilevelBOM(df, 'sw', k, toplevel, ptsonlyflag)
+        elif dfsw_found and (not test_for_missing_columns('sw', df, k)):
+            toplevel = False
+            with stage('deconstruct'):
+                return deconstructMultilevelBOM(df, 'sw', k, toplevel, ptsonlyflag)
+    except:
+        printStr = ('\nError 204. '
+                    'File has been excluded from analysis:\n\n ' + v + '\n\n'
+                    'Perhaps you have it open in another application?\n'
+                    'Or possibly the BOM is misconstructed.\n\n')
+        printStrs.append(printStr)
+        print(printStr)
+    return {}
 
-    if bomtype == 'sw' and  get_col_name(df, cfg['level_sl']) and not get_col_name(df, cfg['itm_sw']):
-        pass
-    elif bomtype == 'sw' and not get_col_name(df, cfg['itm_sw']):
-        printStr = ('\nBOM column {0} missing from sw file {1}.\n'.format(' or '.join(cfg['itm_sw']), pn)
-                    + "This if fine unless you're intending that it be a multilevel BOM.\n")
-        if not printStr in printStrs:
-            printStrs.append(printStr)
-            print(printStr)
 
-    missing = []
-    for r in required_columns:
-        if not get_col_name(df, r):
-            m = ', '.join(r)                     # e.g. ['QTY', 'Qty', 'Qty Per'] -> "QTY, Qty, Qty Per"
-            m = ', or '.join(m.rsplit(', ', 1))  # e.g. "QTY, Qty, Qty Per" ->  "QTY, Qty, or Qty Per"
-            missing.append(m)
-    if missing:
-        jm = ';\n    '.join(missing)
-        s = ''
-        _is = 'is'
-        if len(missing) > 1:
-            s = 's'
-            _is = 'are'
-        printStr = ('\nBOM column{0} missing. This BOM will not be processed:\n    {1}'
-                     '_{2}\nColumn{3} missing {4}:\n    {5}\n'.format(s, pn, bomtype, s, _is, jm))
-        if not printStr in printStrs:
-            printStrs.append(printStr)
-            print(printStr)
-        return True
-    else:
-        return False
+def sniff_header_row(xl, nrows=5):
+    ''' Find the row of a SolidWorks Excel BOM that contains the column
+    names.  Only the first few rows of the file are read to do this.  The
+    row is the first one that contains a name found in cfg['descrip'] or
+    cfg['part_num'].  If none does, then if the second cell of the first
+    row is empty, the first row is taken to be a title row and the second
+    row is returned; otherwise the first row is.
 
+    Parameters
+    ----------
+    xl: pandas ExcelFile
+        The opened Excel file.
+    nrows: int, optional
+        No. of rows to look at.  Default: 5
 
-def get_col_name(df, col):
+    Returns
+    -------
+    out: int
+        Row no. (0 is the first row) to use as the header row when the
+        file is read.
     '''
-    Starting at the beginning of the list of column names in df, return the
-    first name found that is also in the list called col.  For example, if
-    the column names in df are:
+    top = xl.parse(header=None, nrows=nrows)
+    names = set(cfg['descrip'] + cfg['part_num'])
+    for i, row in enumerate(top.itertuples(index=False)):
+        if any(isinstance(x, str) and x.replace('\n', '') in names for x in row):
+            return i
+    if len(top) and len(top.columns) > 1 and (pd.isna(top.iat[0, 1]) or top.iat[0, 1] == ''):
+        return 1
+    return 0
+
+
+def needed_columns(names, extra=()):
+    ''' From the column names of a BOM file, determine which columns need
+    to be read from it: the first column (see "Group" in read_sl_file), and
+    those whose names, ignoring newlines, are in cfg's lists of column names
+    (see LAYOUT_ROLES), in KEEP_COLUMNS, or in extra.  Other columns, e.g.
+    the cost columns of a costed BOM, are not read.
 
-    ["Operation", "WC", "Material", "Quantity", "Material Description", "U/M",
-     "Obsolete Date", "Effective Date", "Item", "Item Description"]
+    Parameters
+    ----------
+    names: list
+        Column names, as found in the header row of the file.
+    extra: list, optional
+        Names of additional columns to read.  Default: ()
 
-    and col is:
+    Returns
+    -------
+    out: list
+        Positions of the columns to read; for the usecols argument of
+        pandas' read_excel.
+    '''
+    known = set(KEEP_COLUMNS).union(extra, *(cfg[key] for key in LAYOUT_ROLES.values()))
+    return [0] + [i for i, c in enumerate(names)
+                  if i and isinstance(c, str) and c.replace('\n', '') in known]
 
-    ["Material", "PARTNUMBER", "PART NUMBER", "Part Number", "Item"],
 
-    It can be seen that the common names in these two lists are Material and
-    Item.  Material will be returned because it will be the first found from
+def read_sl_file(k, v):
+    ''' Read a SyteLine BOM from a _sl.xlsx file.  If it is a multilevel
+    BOM, subassembly BOMs are extracted from it.
+
+    calls: needed_columns, test_for_missing_columns, deconstructMultilevelBOM
+
+    Parameters
+    ----------
+    k: str
+        Part no. of the BOM derived from the filename; e.g. 0300-2024-045
+        from 0300-2024-045_sl.xlsx
+    v: str
+        Pathname of the file.
+
+    Returns
+    -------
+    out: dict
+        {assypn1: BOM1, assypn2: BOM2, ...}.  Empty if the file could not
+        be processed.  (Error 201 is then reported.)
+    '''
+    global printStrs
+    ptsonlyflag = False
+    try:
+        _, file_extension = os.path.splitext(v)
+        if file_extension.lower() == '.xlsx' or  file_extension.lower() == '.xls':
+            with pd.ExcelFile(v, engine='calamine') as xl:
+                usecols = needed_columns(xl.parse(nrows=0).columns,
+                                         extra=['Outside', 'Overhead'])  # dropped below if a costed BOM
+                df = xl.parse(na_values=[' '], usecols=usecols)
+            if 'Item' in df.columns:
+                df.dropna(subset=['Item'], inplace=True)  # Costed BOM has useless 2nd row that starts with "BOM Alternate ID: 0".  Item in that row is NaN.  Delete that row.
+
+            if 'Type' in df.columns:
+                df['Type'].fillna('Material', inplace=True) # costed BOM and a black value in 'Type' column. Give it value 'Material'.  This will keep bomcheck quiet.
+
+            dfsl_found=True
+        else:
+            dfsl_found=False
+
+        # Grrr! SyteLine version 10 puts in unwanted lines.  Deal with it:
+        if dfsl_found:
+            df.drop(df[df.iloc[:,0].astype(str).str.contains('Group')].index, inplace=True)
+            # df.iloc[:,0]                                  yields: Group Item: SC300TL2111311, 0, 1, 1, 2, 2, ...
+            # df[df.iloc[:,0].str.contains('Group')].index  yields: Index([0], dtype='int64')
+            # df.index                                      yields: df.drop([0], inplace=True) RangeIndex(start=0, stop=74, step=1)
+            # df[df.iloc[:,0].str.contains('1')].index      yields: Index([0, 2, 3, 6, 10, 47, 52, 57, 58, 59, 60, 61, 73], dtype='int64')
+            # df.drop(index=[0, 8, 12, 23])                 will drop rows 0, 8, 12, 23
+            # reference: https://www.geeksforgeeks.org/drop-a-list-of-rows-from-a-pandas-dataframe/, see row: Drop Rows with Conditions in Pandas
+        if dfsl_found and 'Labor' in df.columns:  # df comes from a costed BOM
+            df.drop(columns=['Outside', 'Material', 'Labor', 'Overhead'], inplace=True) # Most importantly, drop "Material".  It causes issues in function "typeNotMtl"
+        if 'partsonly' in v.lower() or 'onlyparts' in v.lower():
+            ptsonlyflag = True
+        if dfsl_found:
+            count('rows_sl', len(df))
+            df, layout = normalize_columns(df)
+        if (dfsl_found and (not (test_for_missing_columns('sl', df, k))) and
+                layout['Level']):
+            toplevel = True
+            with stage('deconstruct'):
+                return deconstructMultilevelBOM(df, 'sl', k, toplevel, ptsonlyflag)
+        elif dfsl_found and (not test_for_missing_columns('sl', df, k)):
+            with stage('deconstruct'):
+                return deconstructMultilevelBOM(df, 'sl', k, ptsonlyflag)
+
+    except:
+        printStr = ('\nError 201. '
+                    'File has been excluded from analysis:\n\n ' + v + '\n\n'
+                    'Perhaps you have it open in another application?\n\n')
+        printStrs.append(printStr)
+        print(printStr)
+    return {}
+
+
+def read_sm_file(k, v):
+    ''' Read a slow moving parts BOM from a _sm.xlsx file.
+
+    calls: get_bom_cache, read_sm_cached, read_sm_excel, alter_sm_df
+
+    Parameters
+    ----------
+    k: str
+        Name derived from the filename; e.g. inventory from
+        inventory_sm.xlsx
+    v: str
+        Pathname of the file.
+
+    Returns
+    -------
+    out: dict
+        {k: BOM}.  Empty if the file could not be processed.  (Error 205
+        is then reported.)
+    '''
+    global printStrs
+    try:
+        _, file_extension = os.path.splitext(v)
+        if file_extension.lower() == '.xlsx' or  file_extension.lower() == '.xls':
+            cache = get_bom_cache()
+            if cache:
+                return {k: read_sm_cached(v, cache.columns)}
+            df = read_sm_excel(v)
+            count('rows_sm', len(df))
+            df = alter_sm_df(df)
+            return {k: df}
+    except:
+        printStr = ('\nError 205 occurred regarading file ' + v + '\n'
+                    'Some possible reasons error occured\n\n'
+                    '1) Counld not read file. Is file present at the location \n'
+                    '   that you indicated.  Has the add-on module named \n'
+                    '   calamine been installed properly?'
+                    '2) Perhaps you have it open in another application?\n\n'
+                    '3) At minimum, columns with these names are expected\n'
+                    '   to be in the SM BOM: Item, Description, Unit Cost,\n'
+                    '   Movement?, Qty On Hand, Year n-1 Usage,\n'
+                    '   Year n-2 Usage,  Last Movement (Days).\n'
+                    '   (Names are case sensitive.)')
+        printStrs.append(printStr)
+        print(printStr)
+    return {}
+
+
+def read_sm_excel(v):
+    ''' Read the columns needed from the slow moving parts BOM of the
+    Excel file v.'''
+    return pd.read_excel(v, engine='calamine', usecols=['Item', 'Description', 'Unit Cost',
+                                   'Movement?', 'Qty On Hand', 'Year n-1 Usage', 'Last Receipt',
+                                   'Year n-2 Usage', 'Last Movement (Days)'])
+
+
+def read_sm_cached(v, cache):
+    ''' Read a slow moving parts BOM from the Excel file v like
+    read_sm_file does, but use a cache.  If the file hasn't changed since
+    it was last read, the BOM is loaded from the cache and the file is not
+    read.  Otherwise the file is read, and only those rows that differ
+    from what was stored in the cache before are cleaned up anew (by
+    clean_sm_rows).  Either way, the no. of days that parts have been on
+    the shelf is calculated anew, so that they are correct for today.
+
+    calls: read_sm_excel, clean_sm_rows, add_shelf_days
+
+    Parameters
+    ----------
+    v: str
+        Pathname of the file.
+    cache: ColumnCache
+        See bom_cache.py
+
+    Returns
+    -------
+    out: DataFrame
+        The same as alter_sm_df returns.
+    '''
+    fingerprint = cache.fingerprint(v)
+    stored = cache.get(v)
+    if stored is not None and stored['fingerprint'] == fingerprint:
+        count('rows_sm_cached', len(stored['df']))
+        return add_shelf_days(stored['df'])
+    raw = read_sm_excel(v)
+    count('rows_sm', len(raw))
+    raw = raw.drop(raw.index[-2:])  # Last two rows of a SM BOM are garbage
+    rowhashes = pd.util.hash_pandas_object(raw, index=False).to_numpy()
+    raw_dtypes = [str(t) for t in raw.dtypes]
+    if stored is not None and stored['raw_dtypes'] == raw_dtypes:
+        positions = dict(zip(stored['rowhashes'].tolist(), range(len(stored['rowhashes']))))
+        found = np.array([positions.get(h, -1) for h in rowhashes.tolist()], dtype=np.int64)
+        changed = found < 0
+        count('rows_sm_reused', int((~changed).sum()))
+        df = stored['df'].iloc[found[~changed]].set_axis(raw.index[~changed])
+        if changed.any():
+            df = pd.concat([df, clean_sm_rows(raw[changed].copy())]).sort_index()
+    else:
+        df = clean_sm_rows(raw)
+    df = df.reset_index(drop=True)
+    cache.put(v, fingerprint, df, rowhashes, raw_dtypes)
+    return add_shelf_days(df)
+
+
+def alter_sm_df(df):
+    ''' Clean up a slow moving parts BOM: remove garbage rows, convert
+    costs and quantities to ints, rename columns, and add a column showing
+    the no. of days that parts have been on the shelf.
+
+    calls: clean_sm_rows, add_shelf_days'''
+    df = df.drop(df.index[-2:])  # Last two rows of a SM BOM are garbage
+    return add_shelf_days(clean_sm_rows(df))
+
+
+def clean_sm_rows(df):
+    ''' Convert costs and quantities of a slow moving parts BOM to ints,
+    and rename columns.  (Each row is cleaned up independently of the
+    others.  So read_sm_cached can clean up only rows that have changed.)'''
+    df['Unit Cost'] = df['Unit Cost'].replace('[$,]', '', regex=True).astype(float).astype(int)
+    df = df.fillna({'Item': '', 'Description': '', 'Qty On Hand': 0, 'Last Movement (Days)': 0,
+               'Unit Cost': 0, 'Movement?': '', 'Year n-1 Usage': 0,
+               'Year n-2 Usage': 0})
+    df = df.astype({'Qty On Hand': int, 'Last Movement (Days)': int,
+                    'Unit Cost': int, 'Year n-1 Usage': int,
+                    'Year n-2 Usage': int, 'Last Movement (Days)': int})
+    df = df.rename(columns={'Qty On Hand':'On\nHand', 'Movement?': 'De-\nmand?',
+                            'Year n-1 Usage': 'Yr n-1\nUsage',
+                            'Year n-2 Usage': 'Yr n-2\nUsage',
+                            'Last Movement (Days)': 'Last Used\n(Days)'} )
+    return df
+
+
+def add_shelf_days(df):
+    ''' Add to a slow moving parts BOM a column showing the no. of days
+    that parts have been on the shelf, i.e. since their last receipt.'''
+    today = date.today()
+    formatted_date = today.strftime("%m/%d/%Y")
+    df['Last Receipt'] = df['Last Receipt'].fillna(formatted_date)
+    df['today'] = formatted_date                 # add new column
+    df['today'] = pd.to_datetime(df['today'])    # convert object so that subtraction is possible
+    df['on\nshelf\n(days)'] = (df['today'] - df['Last Receipt']).astype('int64')  # today - 'Last Receipt'
+    df['on\nshelf\n(days)'] = df['on\nshelf\n(days)'] / 10**9              # convert to seconds
+    df['on\nshelf\n(days)'] = (df['on\nshelf\n(days)'] / 86400).astype('int')  # convert to days
+    return df
+
+
+def ingest_file(task):
+    ''' Read one BOM file within a worker process.  (Used by
+    gatherBOMs_from_fnames when cfg['jobs'] > 1.)
+
+    Parameters
+    ----------
+    task: tuple
+        (bomtype, k, v, cfg); where bomtype is "sw", "sl", or "sm"; k is
+        the part no. derived from the filename; v is the pathname of the
+        file; and cfg is the cfg dictionary of the parent process.  (cfg
+        is passed explicitly because a worker process doesn't necessarily
+        share the global variables of the parent process.)
+
+    Returns
+    -------
+    out: tuple
+        (dic, printStrs, runstats); where dic is that returned by
+        read_sw_file, read_sl_file, or read_sm_file; printStrs is a list of
+        the messages generated while reading the file; and runstats holds
+        the timings and counts collected while reading it (see getstats).
+    '''
+    bomtype, k, v, _cfg = task
+    session = BomcheckSession(**_cfg)
+    with session.activate():
+        try:
+            pandas_monkeypatch()
+        except:
+            pass
+        readers = {'sw': read_sw_file, 'sl': read_sl_file, 'sm': read_sm_file}
+        dic = readers[bomtype](k, v)
+    return dic, session.printStrs, session.runstats
+
+
+def get_bom_cache():
+    ''' Return the BomCache object (see bom_cache.py) used to store BOMs
+    that have been read from files, or None if cfg['cache'] is False.
+    cfg['cache_dir'] is the directory where the cache is kept, and
+    cfg['cache_mb'] is the cache's size limit in megabytes.'''
+    global printStrs
+    if not cfg.get('cache'):
+        return None
+    session = current_session()
+    cachedir = cfg.get('cache_dir') or bom_cache.default_cachedir()
+    max_mb = cfg.get('cache_mb', 500)
+    if (session.bomcache is None or session.bomcache.cachedir != cachedir
+            or session.bomcache.max_bytes != int(float(max_mb) * 1024 * 1024)):
+        try:
+            session.bomcache = bom_cache.BomCache(cachedir, max_mb, salt=__version__ + pd.__version__)
+        except OSError as e:
+            printStr = f'\nUnable to use the cache directory {cachedir}: {e}\n'
+            if printStr not in printStrs:
+                printStrs.append(printStr)
+                print(printStr)
+            return None
+    return session.bomcache
+
+
+def getcachestats():
+    ''' Return a dictionary showing how well the cache of BOMs read from
+    files is working; e.g. {'hits': 212, 'misses': 3, 'stores': 3,
+    'evictions': 0, 'files': 215, 'bytes': 18213420}.  Counts are since the
+    cache was first used.  If the cache has not been used (i.e. cfg['cache']
+    is False), an empty dictionary is returned.'''
+    bomcache = current_session().bomcache
+    if bomcache is None:
+        return {}
+    return bomcache.stats()
+
+
+def getstats():
+    ''' Return timings and counts collected during the last run of
+    bomcheck, if cfg['stats'] was True (e.g. bomcheck("C:/myprojects",
+    stats=True), or bomcheck --stats from the command line).  Otherwise
+    an empty dictionary is returned.  Example:
+
+        {'wall': 3.42, 'cpu': 3.31,
+         'stages': {'find': {'wall': 0.01, 'cpu': 0.01, 'calls': 1},
+                    'read': {'wall': 2.05, 'cpu': 1.98, 'calls': 1},
+                    'deconstruct': {'wall': 0.31, 'cpu': 0.30, 'calls': 80},
+                    'compare': ..., 'concat': ..., 'export': ...},
+         'counts': {'files_sw': 40, 'files_sl': 40, 'files_sm': 0,
+                    'rows_sw': 5600, 'rows_sl': 5640, 'assys_sw': 280,
+                    'assys_sl': 280, 'comparisons': 280, 'lone_sw': 0},
+         'cache': {'hits': 38, 'misses': 2, 'stores': 2, 'evictions': 0},
+         'peak_memory': {'self': 212336640, 'workers': 0},
+         'jobs': 1, 'engine': 'assy'}
+
+    Times are in seconds, and memory is in bytes.  CPU time includes that
+    of worker processes (when cfg['jobs'] > 1).  Stages are "find" (find
+    files), "read" (read files, which includes "deconstruct", i.e.
+    extracting subassemblies from multilevel BOMs), "slow_moving",
+    "compare", "concat", and "export".  With worker processes, the wall
+    time of "deconstruct" is summed over all workers.  "cache" is present
+    only if cfg['cache'] is True.  peak_memory is None where it can't be
+    determined (MS Windows).
+    '''
+    runstats = current_session().runstats
+    if 'wall' not in runstats:
+        return {}
+    return runstats
+
+
+def new_runstats():
+    ''' Return an empty dictionary for collecting timings and counts of a
+    run.  (See getstats.)'''
+    return {'stages': {}, 'counts': {}}
+
+
+def cputime():
+    ''' Return CPU seconds used by this process and by worker processes
+    that have ended.'''
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+
+@contextlib.contextmanager
+def stage(name):
+    ''' Add the wall and CPU time taken by the code within a "with
+    stage(name):" block to runstats.  Does nothing if cfg['stats'] is
+    False.'''
+    if not cfg.get('stats'):
+        yield
+        return
+    runstats = current_session().runstats
+    wall0, cpu0 = time.perf_counter(), cputime()
+    try:
+        yield
+    finally:
+        s = runstats['stages'].setdefault(name, {'wall': 0.0, 'cpu': 0.0, 'calls': 0})
+        s['wall'] += time.perf_counter() - wall0
+        s['cpu'] += cputime() - cpu0
+        s['calls'] += 1
+
+
+def count(name, n=1):
+    ''' Add n to the count named name in runstats.  Does nothing if
+    cfg['stats'] is False.'''
+    if cfg.get('stats'):
+        counts = current_session().runstats['counts']
+        counts[name] = counts.get(name, 0) + n
+
+
+def merge_runstats(_runstats):
+    ''' Add timings and counts collected by a worker process to
+    runstats.'''
+    runstats = current_session().runstats
+    for name, s in _runstats['stages'].items():
+        t = runstats['stages'].setdefault(name, {'wall': 0.0, 'cpu': 0.0, 'calls': 0})
+        for key in t:
+            t[key] += s[key]
+    for name, n in _runstats['counts'].items():
+        count(name, n)
+
+
+def peak_memory():
+    ''' Return {'self': bytes, 'workers': bytes}, the peak resident memory
+    of this process and of the largest worker process that has ended; or
+    None if the resource module isn't available (MS Windows).'''
+    try:
+        import resource
+    except ImportError:
+        return None
+    scale = 1 if sys.platform == 'darwin' else 1024   # ru_maxrss is in bytes on macOS, KB otherwise
+    return {'self': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale,
+            'workers': resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale}
+
+
+def finish_runstats(wall0, cpu0, cache0):
+    ''' Add totals, cache activity, and peak memory to runstats at the end
+    of a run.  wall0 and cpu0 are the wall and CPU times at the start of the
+    run, and cache0 is what getcachestats() returned then.'''
+    runstats = current_session().runstats
+    runstats['wall'] = time.perf_counter() - wall0
+    runstats['cpu'] = cputime() - cpu0
+    cache1 = getcachestats()
+    if cache1:
+        runstats['cache'] = {k: cache1[k] - cache0.get(k, 0)
+                             for k in ('hits', 'misses', 'stores', 'evictions')}
+    runstats['peak_memory'] = peak_memory()
+    runstats['jobs'] = get_jobs()
+    runstats['engine'] = cfg.get('engine', 'assy')
+
+
+def stats_report(stats):
+    ''' Return a printable summary of what getstats() returns.'''
+    lines = [f'{"stage":<14}{"wall (s)":>10}{"cpu (s)":>10}{"calls":>8}']
+    for name, s in stats['stages'].items():
+        lines.append(f'{name:<14}{s["wall"]:>10.3f}{s["cpu"]:>10.3f}{s["calls"]:>8}')
+    lines.append(f'{"total":<14}{stats["wall"]:>10.3f}{stats["cpu"]:>10.3f}')
+    lines.append(', '.join(f'{k}: {v}' for k, v in stats['counts'].items()))
+    if stats.get('cache'):
+        lines.append('cache ' + ', '.join(f'{k}: {v}' for k, v in stats['cache'].items()))
+    if stats['peak_memory']:
+        lines.append('peak memory: {:.1f} MB'.format(stats['peak_memory']['self'] / 2**20)
+                     + ('; worker processes: {:.1f} MB'.format(stats['peak_memory']['workers'] / 2**20)
+                        if stats['jobs'] > 1 else ''))
+    lines.append(f'jobs: {stats["jobs"]}, engine: {stats["engine"]}')
+    return '\n'.join(lines)
+
+
+def get_jobs():
+    ''' Return the no. of worker processes to use, as set by cfg['jobs'].
+    If cfg['jobs'] is 0 or less, the no. of CPUs is returned.'''
+    try:
+        jobs = int(cfg.get('jobs', 1))
+    except (TypeError, ValueError):
+        jobs = 1
+    if jobs < 1:
+        jobs = os.cpu_count() or 1
+    return jobs
+
+
+@contextlib.contextmanager
+def worker_pool(jobs):
+    ''' Provide a pool of jobs worker processes: "with worker_pool(jobs)
+    as executor: ...".  The pool kept by the session in use is provided if
+    there is one of that size (see BomcheckSession.start_workers).
+    Otherwise a new pool is started, and then stopped at the end of the
+    with block.'''
+    session = current_session()
+    if session.executor is not None and session.executor_jobs == jobs:
+        yield session.executor
+    else:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+            yield executor
+
+
+def warm_worker():
+    ''' Import, within a worker process, the modules needed to read and
+    compare BOMs.  (Used by BomcheckSession.start_workers.)'''
+    pd.DataFrame, np.ndarray, check_sm_parts.is_in
+    try:
+        pandas_monkeypatch()
+    except:
+        pass
+    return os.getpid()
+
+
+def picklable_cfg():
+    ''' Return a copy of cfg suitable to be sent to a worker process.
+    (bomcheckgui may put objects into cfg, e.g. text widgets, that can't be
+    sent to another process.  These are left out.)'''
+    return {k: v for k, v in cfg.items()
+            if isinstance(v, (str, int, float, bool, list, tuple, dict, type(None)))}
+
+
+def typeNotMtl(sldic):
+    ''' SyteLine has a column named "Type" within its multilevel BOM tables.
+    The value in that column should ALWAYS be "Material".  If it is not, then
+    some sort of signal is sent within SyteLine causing parts to have no lead
+    time for particular purchased parts.  I was told that for some inexplicable
+    reason sometimes SyteLine puts another value in the Type column, usually
+    "other".  This small function, typeNotMtl, added December 2024, detects
+    when this hiccup occurs and notifies the user.
+
+    Parameters
+    ----------
+    sldic: dictionary
+        Dictionary of ERP BOMs.  Dictionary keys are strings
+        and they are of assembly part numbers.  Dictionary
+        values are pandas DataFrame objects which are BOMs
+        for those assembly pns.
+
+    Returns
+    -------
+    None.  (global value "printStrs" will be appended to.  This will result
+            in the contatenation of printStrs being shown to the user.)
+    '''
+    global printStrs
+    printStr = None
+    flag = False
+    _values_ = current_session().derived('rename_pn', ['part_num', 'Item'],
+                   lambda: dict.fromkeys(cfg['part_num'], cfg['Item']))  # type(cfg['Item']) is a str
+    for key, value in sldic.items():
+        # Elminate useless columns from SyteLine that cause bomcheck to be confused
+        # about which contains part nos. and which contains part no. descriptions.
+        # If Material and Material Description both present, they contain the pns and pn descrips
+        if 'Material' in value.columns and 'Material Description' in value.columns:
+            if 'Item' in value.columns:
+                value.drop('Item', axis=1, inplace=True)
+            if 'Description' in value.columns:
+                value.drop('Description', axis=1, inplace=True)
+        if 'Type' in value.columns: # and 'WC' in value.columns:
+            value.rename(columns=_values_, inplace=True)
+            value_filtered = value[(value.Type != 'Material') & (value[cfg['Item']].str.slice(-3) != '-OP')]
+            corrupt_pns = list(value_filtered[cfg['Item']])
+            if corrupt_pns and not flag:
+                printStr = ('\nCorrupt subassemblies found from SyteLine.  Though the "Source" ' 
+                            'of various items is "Material", in the subassembly BOM however '
+                            'they are shown otherwise.  That is, when "Type" is not "Material" '
+                            'in the subassembly BOM, the items will not be placed on order.  '
+                            'To correct, open up the subassembly, and for the problematic item '
+                            'change "Type" to "Material".')
+                flag = True
+            if corrupt_pns:
+                printStr = printStr + f'\n\nSubassembly {key}.  Problematic parts are:\n'
+                for corrupt_pn in corrupt_pns:
+                    printStr = printStr + f'{corrupt_pn}, '
+    if printStr:
+        printStrs.append(printStr)
+
+
+def test_for_missing_columns(bomtype, df, pn):
+    ''' SolidWorks and SyteLine BOMs require certain
+    essential columns to be present.  This function
+    looks at those BOMs that are within df to see if
+    any required columns are missing.  If found,
+    print to screen.
+
+    Parameters
+    ==========
+
+    bomtype: string
+        "sw" or "sl"
+
+    df: Pandas DataFRame
+        A SW or SL BOM
+
+    pn: string
+        Part number of the BOM
+
+    Returns
+    =======
+
+    out: bool
+        True if BOM afoul.  Otherwise False.
+    '''
+    global printStrs
+    if bomtype == 'sw':
+        required_columns = ['Q', 'Description', 'Item']#, 'ItemNo']
+    else: # 'for sl bom'
+        required_columns = ['Q', 'Description', 'Item', 'U']
+    layout = column_layout(df)
+
+    if bomtype == 'sw' and layout['Level'] and not layout['ItemNo']:
+        pass
+    elif bomtype == 'sw' and not layout['ItemNo']:
+        printStr = ('\nBOM column {0} missing from sw file {1}.\n'.format(' or '.join(cfg['itm_sw']), pn)
+                    + "This if fine unless you're intending that it be a multilevel BOM.\n")
+        if not printStr in printStrs:
+            printStrs.append(printStr)
+            print(printStr)
+
+    missing = []
+    for r in required_columns:
+        if not layout[r]:
+            m = ', '.join(cfg[LAYOUT_ROLES[r]])  # e.g. ['QTY', 'Qty', 'Qty Per'] -> "QTY, Qty, Qty Per"
+            m = ', or '.join(m.rsplit(', ', 1))  # e.g. "QTY, Qty, Qty Per" ->  "QTY, Qty, or Qty Per"
+            missing.append(m)
+    if missing:
+        jm = ';\n    '.join(missing)
+        s = ''
+        _is = 'is'
+        if len(missing) > 1:
+            s = 's'
+            _is = 'are'
+        printStr = ('\nBOM column{0} missing. This BOM will not be processed:\n    {1}'
+                     '_{2}\nColumn{3} missing {4}:\n    {5}\n'.format(s, pn, bomtype, s, _is, jm))
+        if not printStr in printStrs:
+            printStrs.append(printStr)
+            print(printStr)
+        return True
+    else:
+        return False
+
+
+def get_col_name(df, col):
+    '''
+    Starting at the beginning of the list of column names in df, return the
+    first name found that is also in the list called col.  For example, if
+    the column names in df are:
+
+    ["Operation", "WC", "Material", "Quantity", "Material Description", "U/M",
+     "Obsolete Date", "Effective Date", "Item", "Item Description"]
+
+    and col is:
+
+    ["Material", "PARTNUMBER", "PART NUMBER", "Part Number", "Item"],
+
+    It can be seen that the common names in these two lists are Material and
+    Item.  Material will be returned because it will be the first found from
     df.  Thus it is determined that the column named Material contains the
     part numbers that are in the BOM named df.
 
@@ -1077,16 +2191,8 @@ def get_col_name(df, col):
         # depending on where in SL you get a BOM from.  If both Material and
         # Item exist in a BOM, then Material is the column that contains part
         # numbers.
-        if ('Item' in s and 'Material' in s
-                and 'Item' in col and 'Material' in col
-                and s.index('Material') > s.index('Item')
-                and not 'Labor' in s):   #if 'Labor' in s, then dealing w/ a costed BOM, and so 'Item' is correct column for pns.
-            printStr = ('\n\nA SyteLine BOM found that is not arranged\n'
-                        "correctly.  See page 3, item 2 of bomcheck's help\n"
-                        'to see how to best arrange BOMs\n')
-            if printStr not in printStrs:
-                printStrs.append(printStr)
-                print(printStr)
+        if material_misplaced(s, col):
+            explainMaterialMisplaced()
             return 'Material'
         for x in s:
             if x in col:
@@ -1096,6 +2202,97 @@ def get_col_name(df, col):
         return ""
 
 
+def material_misplaced(s, col):
+    ''' Return True if, in the list of column names s, both Item and Material
+    are found, and are in col, but Material comes after Item.  (Used by the
+    function get_col_name.)'''
+    return ('Item' in s and 'Material' in s
+            and 'Item' in col and 'Material' in col
+            and s.index('Material') > s.index('Item')
+            and not 'Labor' in s)   #if 'Labor' in s, then dealing w/ a costed BOM, and so 'Item' is correct column for pns.
+
+
+def explainMaterialMisplaced():
+    printStr = ('\n\nA SyteLine BOM found that is not arranged\n'
+                "correctly.  See page 3, item 2 of bomcheck's help\n"
+                'to see how to best arrange BOMs\n')
+    if printStr not in printStrs:
+        printStrs.append(printStr)
+        print(printStr)
+
+
+# Canonical names of the columns of a BOM, and the cfg keys that list the
+# names that a BOM's columns may have; e.g. the part no. column, i.e. Item,
+# may be named Material, PART NUMBER, etc.
+LAYOUT_ROLES = {'Item': 'part_num', 'Q': 'qty', 'Description': 'descrip',
+                'U': 'um_sl', 'Level': 'level_sl', 'ItemNo': 'itm_sw',
+                'Length': 'length_sw', 'Obsolete': 'obs'}
+
+# Columns, other than those listed in cfg (see LAYOUT_ROLES), that are looked
+# for by name after a BOM has been read.
+KEEP_COLUMNS = ['Type', 'Material', 'Material Description', 'Item',
+                'Description', 'Obsolete', 'Labor', 'Op', 'WC']
+
+
+def column_layout(df):
+    ''' Determine which column of a BOM holds part nos., which holds
+    quantities, and so forth; i.e. do what get_col_name does for every
+    canonical column name of LAYOUT_ROLES at once.  A layout is resolved only
+    once per session for a given set of column names (the layout's
+    fingerprint), so BOMs whose columns are alike, e.g. all the subassembly
+    BOMs of a file or all the BOMs exported from one ERP screen, share it.
+
+    Parameters
+    ----------
+    df: Pandas DataFrame or list
+        A BOM, or a list of its column names.
+
+    Returns
+    -------
+    out: dict
+        {canonical name: column name of df, ...}; e.g. {'Item': 'PART
+        NUMBER', 'Q': 'QTY', ..., 'Length': '', 'Obsolete': '', 'Type': ''}.
+        A column name is "" if the column is not in df.  In addition the key
+        'drop' gives the columns of df that are not needed by bomcheck.
+    '''
+    columns = tuple(df.columns) if isinstance(df, pd.DataFrame) else tuple(df)
+    layouts = current_session().derived('layouts', list(LAYOUT_ROLES.values()), dict)
+    layout = layouts.get(columns)
+    if layout is None:
+        s = list(columns)
+        layout = {}
+        misplaced = False
+        for name, key in LAYOUT_ROLES.items():
+            misplaced = misplaced or material_misplaced(s, cfg[key])
+            layout[name] = get_col_name(s, cfg[key])
+        layout['Type'] = 'Type' if 'Type' in s else ''
+        known = set(KEEP_COLUMNS).union(*(cfg[key] for key in LAYOUT_ROLES.values()))
+        layout['drop'] = [c for c in s if c not in known]
+        layout['misplaced'] = misplaced
+        if len(layouts) > 1000:
+            layouts.clear()
+        layouts[columns] = layout
+    elif layout['misplaced']:
+        explainMaterialMisplaced()   # for this BOM's messages too
+    return layout
+
+
+def normalize_columns(df):
+    ''' Resolve the layout of a BOM that has just been read from a file (see
+    column_layout), and drop the columns that bomcheck has no use for.
+
+    Returns
+    -------
+    out: tuple
+        (df, layout)
+    '''
+    layout = column_layout(df)
+    if layout['drop']:
+        df = df.drop(columns=layout['drop'])
+        layout = column_layout(df)
+    return df, layout
+
+
 def row_w_DESCRIPTION(filedata):
     ''' Return the row no. of the row that contains the word
     DESRIPTION (or the equivalent of, i.e. DESCRIP,
@@ -1164,44 +2361,196 @@ def deconstructMultilevelBOM(df, source, k, toplevel=False, ptsonlyflag=False):
     Returns
     =======
 
-    out: python dictionary
-        The dictionary has the form {assypn1: BOM1,
-        assypn2: BOM2, ...}, where assypn1, assypn2, etc.
-        are string objects and are the part numbers for
-        BOMs; and BOM1, BOM2, etc. are pandas DataFrame
-        objects that pertain to those part numbers.
+    out: python dictionary
+        The dictionary has the form {assypn1: BOM1,
+        assypn2: BOM2, ...}, where assypn1, assypn2, etc.
+        are string objects and are the part numbers for
+        BOMs; and BOM1, BOM2, etc. are pandas DataFrame
+        objects that pertain to those part numbers.
+    '''
+    layout = column_layout(df)
+    __lvl = layout['Level']  # if not a multilevel BOM from SL, then is empty string, ""
+    __itm = layout['ItemNo']
+    __pn = layout['Item']  # get the column name for pns
+
+    df[__pn] = df[__pn].astype('str').str.strip() # make sure pt nos. are "clean"
+    df[__pn].replace('', 'PN_MISSING', inplace=True)
+
+    # https://stackoverflow.com/questions/2974022/is-it-possible-to-assign-the-same-value-to-multiple-keys-in-a-dict-object-at-onc
+    values = dict.fromkeys((cfg['qty'] + cfg['length_sw']), 0)
+    values.update(dict.fromkeys(cfg['descrip'], 'no descrip from BOM!'))
+    values.update(dict.fromkeys(cfg['part_num'], 'no pn from BOM!'))
+    df.fillna(value=values, inplace=True)
+
+    # Generate a column named __Level which contains integers based based upon
+    # the level of a part within within an assembly or within subassembly of
+    # an assembly. 0 is the top level assembly, 1 is a part or subassembly one
+    # level deep, and 2, 3, etc. are levels within subassemblies.
+    if source=='sw' and __itm and __itm in df.columns:
+        __itm = df[__itm].astype('str')
+        __itm = __itm.str.replace('.0', '') # stop something like 5.0 from slipping through
+        df['__Level'] = __itm.str.count(r'\.') # level is the number of periods (.) in the string.
+    elif __lvl and __lvl in df.columns:  # dealing w/ SL
+        df['__Level'] = df[__lvl].astype(float).astype(int)
+    else:
+        df['__Level'] = 0
+
+    # Take the the column named __Level and based on it create and add a new
+    # column to df: Level_pn.  __Level will look something like 0, 1, 2, 2, 1.
+    # Level_pn on the other hand contains the parent part no. of each part in df,
+    # e.g. ['TOPLEVEL', '068278', '2648-0300-001', '2648-0300-001', '068278']
+    levels = df['__Level'].to_numpy()
+    pns = df[__pn].to_numpy()
+    if not len(levels) or levels[0] != 0 or (np.diff(levels) > 1).any():
+        # Malformed levels, e.g. 0, 1, 3.  Handle as was always done.
+        level_pn, assys, pn0 = level_pns_by_row(df, __pn, source, k, toplevel)
+    elif not levels.any():  # single level BOM
+        level_pn = 'TOPLEVEL' if toplevel else k
+        assys = [] if toplevel else [k]
+        pn0 = pns[0] if source == 'sl' else ''
+    else:
+        level_pn, assys = level_pns(levels, pns, k, toplevel)
+        pn0 = pns[0] if source == 'sl' else ''
+    df['Level_pn'] = level_pn
+    if cfg.get('drop_at_read'):
+        # The parent of each part is known now, so rows can be removed
+        # without upsetting the structure of a multilevel BOM.  (A dropped
+        # subassembly's own BOM is kept.)
+        keep = kept_rows(df, layout, source)
+        if not keep.all():
+            count('rows_dropped', int(len(keep) - keep.sum()))
+            df = df.iloc[np.flatnonzero(keep)]
+    # Collect all assys within df and return a dictionary.  Keys
+    # of the dictionary are pt. numbers collected.
+    dic_assys = {}
+    if not levels.any() and len(assys) == 1:
+        dic_assys[k.upper()] = df
+    elif assys:
+        groups = df.groupby('Level_pn', sort=False).indices  # {pn: row positions}
+        for k2 in assys:
+            dic_assys[k2.upper()] = df.iloc[groups.get(k2, [])]
+
+    # If the user provided a part no. in the SL file name, e.g 095544_sl.xlsx,
+    # then replace the part no. that is at level 0 of df with the user supplied
+    # pn (e.g. 095544)
+
+    if (ptsonlyflag and pn0 and k.lower()[:4]!='none' and k!=pn0 and k!=""
+            and pn0 in dic_assys):
+        dic_assys[k] = dic_assys[pn0]
+        del dic_assys[pn0]
+        return partsOnly(k, dic_assys)
+
+    if (pn0 and k.lower()[:4]!='none' and k!=pn0 and k!=""
+            and pn0 in dic_assys):
+        dic_assys[k] = dic_assys[pn0]
+        del dic_assys[pn0]
+        return dic_assys
+
+    if ptsonlyflag:
+        return partsOnly(k, dic_assys)
+
+    return dic_assys
+
+
+def kept_rows(df, layout, source):
+    ''' When cfg['drop_at_read'] is True, determine which rows of a BOM
+    that has just been read are to be kept: those whose part nos. aren't in
+    the drop list (see is_dropped; used only if cfg['drop_bool'] is True),
+    and, for an ERP BOM, those without an obsolete date.  (Used by the
+    function deconstructMultilevelBOM.)
+
+    Parameters
+    ----------
+    df: Pandas DataFrame
+        The BOM
+    layout: dict
+        The BOM's layout; see column_layout.
+    source: str
+        "sw" or "sl"
+
+    Returns
+    -------
+    out: numpy array
+        Boolean array, True for rows to keep.
+    '''
+    keep = np.ones(len(df), dtype=bool)
+    if cfg.get('drop_bool') and cfg.get('drop'):
+        keep &= ~is_dropped(df[layout['Item']]).to_numpy()
+    if source == 'sl' and layout['Obsolete']:
+        keep &= df[layout['Obsolete']].isnull().to_numpy()
+    return keep
+
+
+def level_pns(levels, pns, k, toplevel=False):
+    ''' Find the parent part no. of each part of a multilevel BOM.  (Used
+    by the function deconstructMultilevelBOM.)
+
+    The parent of the part at a row is the part at the closest row above it
+    that is one level higher in the BOM (e.g. level 1 is higher than level
+    2).  If a part is an assy that has already been found in the BOM, its
+    children are given the parent "repeat" so that the assy's BOM is only
+    collected once.  levels must start at 0 and must never increase by more
+    than one from one row to the next.
+
+    Parmeters
+    =========
+
+    levels: numpy array of ints
+        Level of each part within the BOM, e.g. [0, 1, 2, 2, 1]
+
+    pns: numpy array of strings
+        Part no. at each row of the BOM.
+
+    k: string
+        Top level part no. of the BOM.
+
+    toplevel: bool
+        If True, parts at level 0 are given the parent "TOPLEVEL".
+        Otherwise they are given the parent k.  Default = False
+
+    Returns
+    =======
+
+    out: tuple
+        (level_pn, assys), where level_pn is a numpy array, the parent of
+        the part at each row, and assys is a list of the parents found, in
+        the order that they were found, excluding "TOPLEVEL" and "repeat".
+    '''
+    n = len(levels)
+    rows = np.arange(n)
+    parent = np.full(n, -1)  # row no. of each part's parent
+    for lvl in range(1, levels.max() + 1):
+        # at every row, the row no. of the last part at level lvl - 1 so far
+        last = np.maximum.accumulate(np.where(levels == lvl - 1, rows, -1))
+        at_lvl = levels == lvl
+        parent[at_lvl] = last[at_lvl]
+    assy_rows = np.unique(parent[parent >= 0])  # rows of assys, in order
+    assy_pns = pns[assy_rows]
+    repeat = pd.Series(assy_pns).duplicated().to_numpy()
+    if not toplevel:
+        repeat |= (assy_pns == k)
+    assy_names = np.empty(n, dtype=object)
+    assy_names[assy_rows] = np.where(repeat, 'repeat', assy_pns)
+    level_pn = np.where(levels == 0, 'TOPLEVEL' if toplevel else k,
+                        assy_names[parent])
+    assys = ([] if toplevel else [k]) + list(assy_pns[~repeat])
+    return level_pn, assys
+
+
+def level_pns_by_row(df, __pn, source, k, toplevel=False):
+    ''' Find the parent part no. of each part of a multilevel BOM row by
+    row.  Slower than the function level_pns, but works with any sequence
+    of levels.  (Used by the function deconstructMultilevelBOM.)
+
+    Returns
+    =======
+
+    out: tuple
+        (level_pn, assys, pn0), where level_pn is a list, the parent
+        of the part at each row, assys is a list of the parents found,
+        and pn0 is the first pn at level 0 if source is "sl", else "".
     '''
-    __lvl = get_col_name(df, cfg['level_sl'])  # if not a multilevel BOM from SL, then is empty string, ""
-    __itm = get_col_name(df, cfg['itm_sw'])
-    __pn = get_col_name(df, cfg['part_num'])  # get the column name for pns
-
     p = None
-    df[__pn] = df[__pn].astype('str').str.strip() # make sure pt nos. are "clean"
-    df[__pn].replace('', 'PN_MISSING', inplace=True)
-
-    # https://stackoverflow.com/questions/2974022/is-it-possible-to-assign-the-same-value-to-multiple-keys-in-a-dict-object-at-onc
-    values = dict.fromkeys((cfg['qty'] + cfg['length_sw']), 0)
-    values.update(dict.fromkeys(cfg['descrip'], 'no descrip from BOM!'))
-    values.update(dict.fromkeys(cfg['part_num'], 'no pn from BOM!'))
-    df.fillna(value=values, inplace=True)
-
-    # Generate a column named __Level which contains integers based based upon
-    # the level of a part within within an assembly or within subassembly of
-    # an assembly. 0 is the top level assembly, 1 is a part or subassembly one
-    # level deep, and 2, 3, etc. are levels within subassemblies.
-    if source=='sw' and __itm and __itm in df.columns:
-        __itm = df[__itm].astype('str')
-        __itm = __itm.str.replace('.0', '') # stop something like 5.0 from slipping through
-        df['__Level'] = __itm.str.count(r'\.') # level is the number of periods (.) in the string.
-    elif __lvl and __lvl in df.columns:  # dealing w/ SL
-        df['__Level'] = df[__lvl].astype(float).astype(int)
-    else:
-        df['__Level'] = 0
-
-    # Take the the column named __Level and based on it create and add a new
-    # column to df: Level_pn.  __Level will look something like 0, 1, 2, 2, 1.
-    # Level_pn on the other hand contains the parent part no. of each part in df,
-    # e.g. ['TOPLEVEL', '068278', '2648-0300-001', '2648-0300-001', '068278']
     lvl = 0
     level_pn = []  # at every row in df, parent of the part at that row
     assys = []  # a subset of level_pn.  Collection of parts (i.e. assemblies) that have children
@@ -1239,33 +2588,7 @@ def deconstructMultilevelBOM(df, source, k, toplevel=False, ptsonlyflag=False):
             level_pn.append(poplist[-1])
         p = row[__pn]
         lvl = row['__Level']
-    df['Level_pn'] = level_pn
-    # Collect all assys within df and return a dictionary.  Keys
-    # of the dictionary are pt. numbers collected.
-    dic_assys = {}
-    for k2 in assys:
-        dic_assys[k2.upper()] = df[df['Level_pn'] == k2]
-
-    # If the user provided a part no. in the SL file name, e.g 095544_sl.xlsx,
-    # then replace the part no. that is at level 0 of df with the user supplied
-    # pn (e.g. 095544)
-
-    if (ptsonlyflag and pn0 and k.lower()[:4]!='none' and k!=pn0 and k!=""
-            and pn0 in dic_assys):
-        dic_assys[k] = dic_assys[pn0]
-        del dic_assys[pn0]
-        return partsOnly(k, dic_assys)
-
-    if (pn0 and k.lower()[:4]!='none' and k!=pn0 and k!=""
-            and pn0 in dic_assys):
-        dic_assys[k] = dic_assys[pn0]
-        del dic_assys[pn0]
-        return dic_assys
-
-    if ptsonlyflag:
-        return partsOnly(k, dic_assys)
-
-    return dic_assys
+    return level_pn, assys, pn0
 
 
 def convert_sw_bom_to_sl_format(df):
@@ -1306,18 +2629,14 @@ def convert_sw_bom_to_sl_format(df):
         A SolidWorks BOM with a structure like that of ERP.
 
     '''
-    values = dict.fromkeys(cfg['part_num'], cfg['Item'])
-    values.update(dict.fromkeys(cfg['descrip'], cfg['Description']))
-    values.update(dict.fromkeys(cfg['qty'], cfg['Q']))
-    values.update(dict.fromkeys(cfg['itm_sw'], cfg['Item No.']))
-    df.rename(columns=values, inplace=True)
+    df.rename(columns=rename_map('sw'), inplace=True)
 
     # if a non-numberic character is in the quantity column, set it eqaul to zero
     df[cfg['Q']] = pd.to_numeric(df[cfg['Q']], errors='coerce').fillna(0.0)
 
     checkforbaddata(df)
     df[cfg['Item']] = df[cfg['Item']].str.upper()
-    __len = get_col_name(df, cfg['length_sw'])
+    __len = column_layout(df)['Length']
 
     if __len:  # convert lengths to other unit of measure, i.e. to_um
         ser = df[__len].apply(str)
@@ -1337,11 +2656,11 @@ def convert_sw_bom_to_sl_format(df):
         from_um = df_extract[0].str.lower().fillna('') + df_extract[2].str.lower().fillna('') # e.g. '$ft^2; actually '$' or 'ft^2'
         from_um.replace('', cfg['from_um'].lower(), inplace=True)  # e.g. "" -> "ft"
         from_um = from_um.str.strip().str.lower()   # e.g. "SQI\n" -> "sqi"
-        to_um = from_um.apply(lambda x: cfg['toL_um'].lower() if x.lower() in liquidUMs else
-                                       (cfg['toA_um'].lower() if x.lower() in areaUMs else cfg['to_um'].lower()))
-        ignore_filter = ~is_in(cfg['ignore'], df[cfg['Item']], [])
+        to_ums, um_factors = um_tables()
+        to_um = from_um.map(to_ums).fillna(cfg['to_um'].lower())
+        ignore_filter = ~is_ignored(df[cfg['Item']])
         df[cfg['U']] = to_um.str.upper().mask(value <= 0.0001, 'EA').mask(~ignore_filter, 'EA')
-        factors = (from_um.map(factorpool) * 1/to_um.map(factorpool)).fillna(-1)
+        factors = from_um.map(um_factors).fillna(-1)
         _q = df[cfg['Q']].replace(r'[^\d]', '', regex=True).apply(str).str.strip('.')  # strip away any text (problem found 10/18/25: \d captures the . in 37.5)
         _q = _q.replace('', '0').astype(float)  # if any empty strings, set to '0'
         value2 = value * _q * factors * ignore_filter
@@ -1446,12 +2765,7 @@ def compare_a_sw_bom_to_a_sl_bom(dfsw, dfsl):
         if 'Description' in dfsl.columns:
             dfsl.drop('Description', axis=1, inplace=True)
 
-    values = dict.fromkeys(cfg['part_num'], cfg['Item'])  # type(cfg['Item']) is a str
-    values.update(dict.fromkeys(cfg['um_sl'], cfg['U']))  # type(cfg['U']) also a str
-    values.update(dict.fromkeys(cfg['descrip'], cfg['Description']))
-    values.update(dict.fromkeys(cfg['qty'], cfg['Q']))
-    values.update(dict.fromkeys(cfg['obs'], 'Obsolete'))
-    dfsl.rename(columns=values, inplace=True) # rename columns so proper comparison can be made
+    dfsl.rename(columns=rename_map('sl'), inplace=True) # rename columns so proper comparison can be made
         
     dfsl[cfg['Item']] = dfsl[cfg['Item']].str.upper()
 
@@ -1523,7 +2837,11 @@ def collect_checked_boms(swdic, sldic):
     SolidWorks BOMs for which no ERP BOM was found, put
     those in a separate dictionary for output.
 
-    calls: convert_sw_bom_to_sl_format, compare_a_sw_bom_to_a_sl_bom
+    If cfg['jobs'] is greater than 1, assemblies are checked
+    by that many worker processes.  Results are the same as
+    when assemblies are checked one at a time.
+
+    calls: check_assy, check_assys
 
     Parameters
     ==========
@@ -1554,21 +2872,418 @@ def collect_checked_boms(swdic, sldic):
 
     '''
 
+    global printStrs
     lone_sw_dic = {}  # sw boms with no matching sl bom found
     combined_dic = {}   # sl bom found for given sw bom.  Then merged
+    assys = []   # [(key2, dfsw, dfsl), ...]; dfsl is None if no sl bom found
     for key, dfsw in swdic.items():
         key2 = key.replace(' ', '') if cfg['del_whitespace'] else key
-        if key2 in sldic:
-            combined_dic[key2] = compare_a_sw_bom_to_a_sl_bom(
-                                convert_sw_bom_to_sl_format(dfsw), sldic[key2])
-        else:
-            df = convert_sw_bom_to_sl_format(dfsw)
-            df[cfg['Q']] = round(df[cfg['Q']].astype(float), cfg['accuracy'])
+        assys.append((key2, dfsw, sldic[key2] if key2 in sldic else None))
+
+    jobs = get_jobs()
+    if jobs > 1 and len(assys) > 1:
+        # Put assys into chunks, each with about the same no. of rows, so
+        # that each worker process has about the same amount of work to do.
+        rows = [len(a[1]) + (0 if a[2] is None else len(a[2])) for a in assys]
+        target = max(1, sum(rows) // (jobs * 4))
+        chunks = [[]]
+        n = 0
+        for assy, r in zip(assys, rows):
+            if n >= target:
+                chunks.append([])
+                n = 0
+            chunks[-1].append(assy)
+            n += r
+        _cfg = picklable_cfg()
+        with worker_pool(jobs) as executor:
+            checked = []
+            for _checked, _printStrs in executor.map(check_assys, [(c, _cfg) for c in chunks]):
+                checked += _checked
+                for printStr in _printStrs:
+                    if printStr not in printStrs:
+                        printStrs.append(printStr)
+    else:
+        checked = [check_assy(*assy) for assy in assys]
+
+    for (key2, dfsw, dfsl), df in zip(assys, checked):
+        if dfsl is None:
             lone_sw_dic[key2] = df
-            
+        else:
+            combined_dic[key2] = df
+
+    count('comparisons', len(combined_dic))
+    count('lone_sw', len(lone_sw_dic))
     return lone_sw_dic, combined_dic
 
 
+def check_assy(key2, dfsw, dfsl):
+    ''' Check one assembly.  (Used by the function
+    collect_checked_boms.)
+
+    Parameters
+    ==========
+
+    key2: string
+        Assembly part no.
+
+    dfsw: Pandas DataFrame
+        SolidWorks BOM of the assembly.
+
+    dfsl: Pandas DataFrame or None
+        ERP BOM of the assembly, or None if there isn't one.
+
+    Returns
+    =======
+
+    out: Pandas DataFrame
+        If dfsl is None, dfsw converted to an ERP like format.
+        Otherwise dfsw and dfsl merged, i.e. the BOM check.
+    '''
+    if dfsl is not None:
+        return compare_a_sw_bom_to_a_sl_bom(convert_sw_bom_to_sl_format(dfsw), dfsl)
+    df = convert_sw_bom_to_sl_format(dfsw)
+    df[cfg['Q']] = round(df[cfg['Q']].astype(float), cfg['accuracy'])
+    return df
+
+
+def check_assys(task):
+    ''' Check assemblies within a worker process.  (Used by
+    collect_checked_boms when cfg['jobs'] > 1.)
+
+    Parameters
+    ----------
+    task: tuple
+        (assys, cfg); where assys is a list of tuples: [(key2, dfsw,
+        dfsl), ...] (see check_assy), and cfg is the cfg dictionary of the
+        parent process.  (cfg is passed explicitly because a worker process
+        doesn't necessarily share the global variables of the parent
+        process.)
+
+    Returns
+    -------
+    out: tuple
+        (checked, printStrs); where checked is a list of the DataFrames
+        returned by check_assy, one for each item in assys; and printStrs
+        is a list of the messages generated while checking.
+    '''
+    assys, _cfg = task
+    session = BomcheckSession(**_cfg)
+    with session.activate():
+        checked = [check_assy(*assy) for assy in assys]
+    return checked, session.printStrs
+
+
+def collect_checked_boms_batched(swdic, sldic):
+    ''' Does what the functions collect_checked_boms and concat_boms do, but
+    instead of converting and comparing one assembly at a time, all the
+    SolidWorks BOMs are stacked into one DataFrame, as are the ERP BOMs, with
+    a column identifying the assembly to which each row belongs.  Then one
+    unit of measure conversion, one merge, and one IQDU calculation are done
+    for all assemblies at once.  With many small assemblies this is much
+    faster.  Results are the same as those from collect_checked_boms.
+
+    Used when cfg['engine'] is "batched".
+
+    calls: stack_boms, convert_sw_boms_batched, compare_sw_boms_to_sl_boms_batched
+
+    Parameters
+    ==========
+
+    swdic: dictionary
+        Dictionary of SolidWorks BOMs.  Dictionary keys are
+        strings and they are of assembly part numbers.
+        Dictionary values are pandas DataFrame objects which
+        are BOMs for those assembly pns.
+
+    sldic: dictionary
+        Dictionary of ERP BOMs.  Dictionary keys are strings
+        and they are of assembly part numbers.  Dictionary
+        values are pandas DataFrame objects which are BOMs
+        for those assembly pns.
+
+    Returns
+    =======
+
+    out: tuple
+        (title_dfsw, title_dfmerged), each of which is ready to be given to
+        the function concat_boms.  Each is a list that is either empty or
+        has one item: (None, DataFrame), where DataFrame contains the BOMs
+        of all the assemblies and has a column named cfg['assy'].
+    '''
+    keys = []   # keys of swdic, whitespace removed if cfg['del_whitespace']
+    for key in swdic:
+        keys.append(key.replace(' ', '') if cfg['del_whitespace'] else key)
+    if not keys:
+        return [], []
+    last = {key2: i for i, key2 in enumerate(keys)}  # like a dict, the last of duplicate keys is used
+    names = np.array(keys, dtype=object)
+    used = np.array([last[key2] == i for i, key2 in enumerate(keys)])
+    in_sl = np.array([key2 in sldic for key2 in keys])
+    dfsw = convert_sw_boms_batched(list(swdic.values()))
+    ids = dfsw['__id'].to_numpy()
+    dfsw = dfsw[used[ids]]
+    ids = dfsw['__id'].to_numpy()
+
+    count('comparisons', int((used & in_sl).sum()))
+    count('lone_sw', int((used & ~in_sl).sum()))
+    title_dfsw = []
+    if (used & ~in_sl).any():
+        df = dfsw[~in_sl[ids]].drop(columns='__id')
+        df[cfg['Q']] = round(df[cfg['Q']].astype(float), cfg['accuracy'])
+        df[cfg['assy']] = names[ids[~in_sl[ids]]]
+        title_dfsw.append((None, df.infer_objects().set_index(cfg['Op'])))
+
+    title_dfmerged = []
+    combined_ids = [i for i in last.values() if in_sl[i]]
+    if combined_ids:
+        df = compare_sw_boms_to_sl_boms_batched(dfsw[in_sl[ids]],
+                            [sldic[keys[i]] for i in combined_ids], combined_ids)
+        df[cfg['assy']] = names[df['__id'].to_numpy()]
+        title_dfmerged.append((None, df.drop(columns='__id').set_index(cfg['Item'])))
+
+    return title_dfsw, title_dfmerged
+
+
+def stack_boms(frames, ids, rename):
+    ''' Concatenate BOMs into one DataFrame.  BOMs having identical column
+    names are concatenated, and their columns renamed, as a group, so that
+    the time taken doesn't grow much with the no. of BOMs.  (Used by the
+    function collect_checked_boms_batched.)
+
+    Parameters
+    ==========
+
+    frames: list
+        List of DataFrames, each a BOM.
+
+    ids: list
+        Integers, one for each BOM, identifying the BOM.
+
+    rename: function
+        Function that takes a DataFrame of BOMs having the same column names
+        and the list of the original BOMs, [(id, BOM), ...], and returns a
+        DataFrame with the columns needed.
+
+    Returns
+    =======
+
+    out: pandas DataFrame
+        BOMs concatenated.  The column named __id identifies the BOM from
+        which a row came.
+    '''
+    layouts = {}
+    for i, df in zip(ids, frames):
+        layouts.setdefault(tuple(df.columns), []).append((i, df))
+    stacked = []
+    for group in layouts.values():
+        df = pd.concat([g[1] for g in group], ignore_index=True)
+        df['__id'] = np.repeat([g[0] for g in group], [len(g[1]) for g in group])
+        stacked.append(rename(df, group))
+    df = pd.concat(stacked, ignore_index=True)
+    return df.sort_values('__id', kind='stable', ignore_index=True)
+
+
+def convert_sw_boms_batched(frames):
+    ''' Does for all SolidWorks BOMs in the list frames what the function
+    convert_sw_bom_to_sl_format does for one.  (Used by the function
+    collect_checked_boms_batched.)
+
+    Returns
+    =======
+
+    out: pandas DataFrame
+        All the BOMs, restructured to be like SyteLine BOMs, with columns
+        __id (index of the BOM in frames), Op, WC, Item, Q, Description, and
+        U.  Rows are sorted by __id, and then by Item.
+    '''
+    Item, Q, D, U = cfg['Item'], cfg['Q'], cfg['Description'], cfg['U']
+    values = rename_map('sw')
+
+    def rename(df, group):
+        df = df.rename(columns=values)
+        __len = column_layout(df)['Length']
+        out = pd.DataFrame({'__id': df['__id'], Item: df[Item], Q: df[Q]})
+        out[D] = df[D] if D in df.columns else np.nan
+        out[cfg['Item No.']] = df[cfg['Item No.']] if cfg['Item No.'] in df.columns else np.nan
+        out['__len'] = df[__len] if __len else np.nan
+        out['__haslen'] = bool(__len)
+        return out
+
+    df = stack_boms(frames, range(len(frames)), rename)
+    df[Q] = pd.to_numeric(df[Q], errors='coerce').fillna(0.0)
+    df[Item] = df[Item].str.upper()
+    haslen = df['__haslen'].to_numpy()
+    _q = df[Q].astype(float).to_numpy()
+    um = np.full(len(df), 'EA', dtype=object)
+    trash = np.zeros(len(df), dtype=bool)
+
+    if haslen.any():  # convert lengths to other unit of measure, i.e. to_um
+        ser = df.loc[haslen, '__len'].apply(str).reset_index(drop=True)
+        trash_filter = ser.str.contains('@')
+        trash[haslen] = trash_filter.to_numpy()
+        ser = ser.where(~trash_filter, '')
+        ser = ser.mask(ser < '-9999999', '-9999999')  # i.e. max(ser, '-9999999')
+        df_extract = ser.str.extract(r'(\W*)([\d.]*)\s*([\w\^]*)')
+        value = df_extract[1].astype(float)
+        from_um = df_extract[0].str.lower().fillna('') + df_extract[2].str.lower().fillna('')
+        from_um = from_um.replace('', cfg['from_um'].lower())
+        from_um = from_um.str.strip().str.lower()
+        to_ums, um_factors = um_tables()
+        to_um = from_um.map(to_ums).fillna(cfg['to_um'].lower())
+        ignore_filter = ~is_ignored(df.loc[haslen, Item].reset_index(drop=True))
+        um[haslen] = to_um.str.upper().mask(value <= 0.0001, 'EA').mask(~ignore_filter, 'EA').to_numpy()
+        factors = from_um.map(um_factors).fillna(-1)
+        q = df.loc[haslen, Q].reset_index(drop=True)
+        q = q.replace(r'[^\d]', '', regex=True).apply(str).str.strip('.')
+        q = q.replace('', '0').astype(float)
+        value2 = value * q * factors * ignore_filter
+        _q[haslen] = (q*(value2<.0001) + value2).to_numpy()
+
+    # Messages are shown in the same order as if one BOM at a time were converted.
+    ids = df['__id'].to_numpy()
+    firsts = set()   # for each kind of message, the first BOM needing it
+    for flags in [~(df[Q].astype(float)%1 == 0).to_numpy(), df[cfg['Item No.']].eq(0).to_numpy(), trash]:
+        if flags.any():
+            firsts.add(ids[flags][0])
+    for i in sorted(firsts):
+        checkforbaddata(df.loc[ids == i, [Q, cfg['Item No.']]])
+        if trash[ids == i].any():
+            explainNegativeLengths()
+
+    df[Q] = _q
+    df[U] = um
+    dd = {Q: 'sum', D: 'first', U: 'first'}
+    df = df.groupby(['__id', Item], as_index=False).aggregate(dd)
+
+    for col in [Item, D, U]:   # " BASEPLATE 095000  " -> "BASEPLATE 095000"
+        df[col] = df[col].map(lambda x: x.strip() if type(x)==str else x)
+    if cfg['del_whitespace']:
+        df[Item] = df[Item].str.replace(' ', '')
+    df.insert(1, cfg['Op'], cfg['OpValue'])
+    df.insert(2, cfg['WC'], cfg['WCvalue'])
+    return df
+
+
+def compare_sw_boms_to_sl_boms_batched(dfsw, frames, ids):
+    ''' Does for all SolidWorks BOMs in dfsw, and their matching ERP BOMs,
+    what the function compare_a_sw_bom_to_a_sl_bom does for one pair of
+    BOMs.  (Used by the function collect_checked_boms_batched.)
+
+    Parmeters
+    =========
+
+    dfsw: Pandas DataFrame
+        SolidWorks BOMs as returned by convert_sw_boms_batched.
+
+    frames: list
+        ERP BOMs (DataFrames), one for each BOM in dfsw.
+
+    ids: list
+        For each ERP BOM in frames, the __id of its SolidWorks BOM in dfsw.
+
+    Returns
+    =======
+
+    out: Pandas DataFrame
+        Side-by-side comparisons of the SolidWorks and ERP BOMs, with a
+        column named __id identifying the BOM that a row belongs to.
+    '''
+    Item, Q, D, U = cfg['Item'], cfg['Q'], cfg['Description'], cfg['U']
+    values = rename_map('sl')
+    int_ids = set()   # BOMs whose quantities are integers
+
+    def rename(df, group):
+        if 'Material' in df.columns and 'Material Description' in df.columns:
+            df = df.drop(columns=[c for c in ['Item', 'Description'] if c in df.columns])
+        qcol = [c for c in df.columns if values.get(c) == Q]
+        if qcol:
+            int_ids.update(i for i, g in group if g[qcol[0]].dtype.kind in 'iu')
+        df = df.rename(columns=values)
+        out = pd.DataFrame({'__id': df['__id'], Item: df[Item]})
+        for col in [Q, D, U, 'Obsolete', 'Type']:
+            out[col] = df[col] if col in df.columns else np.nan
+        out['__hastype'] = 'Type' in df.columns
+        return out
+
+    dfsl = stack_boms(frames, ids, rename)
+    dfsl[Item] = dfsl[Item].str.upper()
+    dfsl = dfsl[dfsl['Obsolete'].isnull().to_numpy()]   # Don't use any obsolete pns
+    if 'mtltest' in cfg and cfg['mtltest']:
+        filtrT = (dfsl['__hastype'] & (dfsl['Type'] != 'Material') & (dfsl[Item].str.slice(-3) != '-OP'))
+        dfsl[D] = dfsl[D].where(~filtrT, "Note: 'Type'≠'Material'")
+
+    dfmerged = pd.merge(dfsw[['__id', Item, Q, D, U]], dfsl[['__id', Item, Q, D, U]],
+                        on=['__id', Item], how='outer', suffixes=('_sw', '_sl'), indicator=True)
+    dfmerged.sort_values(by=['__id', Item], kind='stable', inplace=True, ignore_index=True)
+    dfmerged = dfmerged.iloc[quicksort_order(dfmerged['__id'].to_numpy(), dfmerged[Item].to_numpy())]
+    dfmerged.reset_index(drop=True, inplace=True)
+    dfmerged[Q + '_sw'] = dfmerged[Q + '_sw'].fillna(0)
+    dfmerged[U + '_sl'] = dfmerged[U + '_sl'].fillna('')
+
+    from_um = dfmerged[U + '_sw'].str.lower().fillna('')
+    to_um = dfmerged[U + '_sl'].str.lower().fillna('')
+    factors = (from_um.map(factorpool) * 1/to_um.map(factorpool)).fillna(1)
+    dfmerged[Q + '_sw'] = round(dfmerged[Q + '_sw'].astype(float) * factors, cfg['accuracy'])
+    dfmerged[U + '_sw'] = to_um.where((to_um != '') & (from_um != ''), from_um).str.upper()
+
+    filtrI = (dfmerged['_merge'] == 'both').to_numpy()
+    maxdiff = .51 / (10**cfg['accuracy'])
+    filtrQ = (abs(dfmerged[Q + '_sw'].astype(float) - dfmerged[Q + '_sl']) < maxdiff).to_numpy()
+    c1 = dfmerged[D + '_sw'].astype('string').fillna('').str.upper().str.strip()
+    c2 = dfmerged[D + '_sl'].astype('string').fillna('').str.upper().str.strip()
+    filtrD = (c1==c2).to_numpy()
+    filtrU = (dfmerged[U + '_sw'].astype('str').str.upper().str.strip() ==
+              dfmerged[U + '_sl'].astype('str').str.upper().str.strip()).to_numpy()
+    _pass = '\u2012' #   character name: figure dash
+    _fail = 'X'
+    unique = ~dfmerged.duplicated(['__id', Item], keep=False).to_numpy()  # duplicate in SL? iqdu -> blank
+    iqdu = np.full(len(dfmerged), '', dtype=object)
+    for filtr in [filtrI, filtrQ, filtrD, filtrU]:
+        iqdu += np.where(unique, np.where(filtr, _pass, _fail), '')
+    dfmerged[cfg['iqdu']] = iqdu
+
+    left_only_ids = set(dfmerged.loc[dfmerged['_merge'] == 'left_only', '__id'])
+    dfmerged = dfmerged[['__id', Item, cfg['iqdu'], (Q + '_sw'), (Q + '_sl'),
+                         D + '_sw', D + '_sl', (U + '_sw'), (U + '_sl')]]
+    dfmerged = dfmerged.fillna('')
+    dfmerged[Q + '_sw'] = dfmerged[Q + '_sw'].replace(0, '')
+    for col in dfmerged.columns[2:]:
+        dfmerged[col] = dfmerged[col].map(lambda x: x.strip() if type(x)==str else x)
+
+    dfmerged = dfmerged.infer_objects()
+    # Compared one BOM at a time, ERP quantities that are integers stay
+    # integers unless the SolidWorks BOM has parts missing from the ERP BOM.
+    if dfmerged[Q + '_sl'].dtype == object and int_ids - left_only_ids:
+        rows = dfmerged['__id'].isin(int_ids - left_only_ids).to_numpy()
+        qsl = dfmerged[Q + '_sl'].to_numpy(dtype=object, copy=True)
+        qsl[rows] = [int(x) for x in qsl[rows]]
+        dfmerged[Q + '_sl'] = qsl
+    return dfmerged
+
+
+def quicksort_order(ids, items):
+    ''' Rows sorted by ids and then, stably, by items, are put in the order
+    that pandas' sort_values(kind='quicksort'), the default, would put them
+    if each BOM's rows were sorted by items separately.  (quicksort isn't
+    stable, so the two orders can differ for BOMs with duplicate items.
+    Those BOMs are sorted again here the way sort_values sorts them.)
+    (Used by the function compare_sw_boms_to_sl_boms_batched.)
+
+    Returns
+    =======
+
+    out: numpy array
+        Positions of the rows in their new order.
+    '''
+    order = np.arange(len(ids))
+    starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]]) if len(ids) else []
+    ends = np.r_[starts[1:], len(ids)] if len(ids) else []
+    for s, e in zip(starts, ends):
+        if len(set(items[s:e])) < e - s:
+            order[s:e] = s + items[s:e].argsort(kind='quicksort')
+    return order
+
+
 def concat_boms(title_dfsw, title_dfmerged):
     ''' Concatenate all the SW BOMs into one long list
     (if there are any SW BOMs without a matching ERP BOM
@@ -1598,6 +3313,10 @@ def concat_boms(title_dfsw, title_dfmerged):
         DataFrame.  The DataFrame is that derived from a
         merged SW/ERP BOM.
 
+        (For title_dfsw and title_dfmerged, if the string is
+        None, the DataFrame already has a column named assy;
+        see collect_checked_boms_batched.)
+
     Returns
     =======
 
@@ -1624,10 +3343,12 @@ def concat_boms(title_dfsw, title_dfmerged):
     swresults = []
     mrgresults = []
     for t in title_dfsw:
-        t[1][cfg['assy']] = t[0]
+        if t[0] is not None:
+            t[1][cfg['assy']] = t[0]
         dfswDFrames.append(t[1])
     for t in title_dfmerged:
-        t[1][cfg['assy']] = t[0]
+        if t[0] is not None:
+            t[1][cfg['assy']] = t[0]
         dfmergedDFrames.append(t[1])
     if dfswDFrames:
         dfswCCat = pd.concat(dfswDFrames).reset_index()
@@ -1639,18 +3360,175 @@ def concat_boms(title_dfsw, title_dfmerged):
     return swresults, mrgresults
 
 
+def watch(dirname, interval=2.0, followlinks=False, max_cycles=None):
+    ''' Watch a directory, and subdirectories thereof, for _sw and _sl
+    files that are added, changed, or deleted.  When that happens, read
+    only those files and recheck only those BOMs affected by them.  BOMs
+    are kept in memory between checks.  If cfg['export'] is set, the Excel
+    file of results is updated after each recheck.
+
+    Stop watching with Ctrl-C.
+
+    calls: scan_bom_files, ingest_tasks, collect_checked_boms, concat_boms,
+           export2xlsx
+
+    Parameters
+    ----------
+    dirname: str
+        Name of the directory to watch.
+    interval: float, optional
+        Seconds to wait between looking for changed files.  Default: 2.0
+    followlinks: bool, optional
+        If True, follow symbolic links to directories.  Default: False
+    max_cycles: int, optional
+        Stop after looking for changed files this many times.  Default:
+        None, i.e. watch until Ctrl-C is pressed.
+
+    Returns
+    -------
+    out: tuple
+        (getresults(0), getresults(1)), i.e. the results of the last check.
+
+    Examples
+    ========
+
+    $ bomcheck --watch C:/myprojects/project1
+
+        >>> bomcheck("C:/myprojects/project1", watch=True)
+    '''
+    global printStrs
+    session = current_session()
+    files = {}     # {pathname: (bomtype, k, (mtime, size), dic)}
+    lone_sw_dic = {}
+    combined_dic = {}
+    snapshot = {}
+    cycle = 0
+    print(f'Watching {dirname} for changes to _sw and _sl files.  Press Ctrl-C to stop.')
+    try:
+        while max_cycles is None or cycle < max_cycles:
+            if cycle:
+                time.sleep(interval)
+            cycle += 1
+            new_snapshot = scan_bom_files(dirname, followlinks)
+            changed = [f for f in new_snapshot if snapshot.get(f) != new_snapshot[f]]
+            deleted = [f for f in snapshot if f not in new_snapshot]
+            snapshot = new_snapshot
+            if not changed and not deleted:
+                continue
+            t0 = time.perf_counter()
+
+            affected = set()  # assy pns (whitespace removed if cfg['del_whitespace'])
+            for f in changed + deleted:
+                if f in files:
+                    affected.update(files.pop(f)[3])
+            tasks = []
+            for f in changed:
+                bomtype = bom_type(f)
+                k = os.path.basename(f)
+                tasks.append((bomtype, k[:k.find('_')], f))
+            for (bomtype, k, f), (dic, _printStrs, from_cache) in zip(tasks, ingest_tasks(tasks)):
+                files[f] = (bomtype, k, snapshot[f], dic)
+                affected.update(dic)
+                for printStr in _printStrs:
+                    if printStr not in printStrs:
+                        printStrs.append(printStr)
+            if cfg['del_whitespace']:
+                affected = set(a.replace(' ', '') for a in affected)
+
+            # Like gatherBOMs_from_fnames, if two files have the same pn,
+            # e.g. 1234_sw.xlsx and 1234_sw.csv, only the last is used.
+            filesdic = {}
+            for f in sorted(files):
+                filesdic[(files[f][0], files[f][1])] = f
+            swdfsdic, sldfsdic = {}, {}
+            for (bomtype, k), f in filesdic.items():
+                if bomtype == 'sw':
+                    swdfsdic.update(files[f][3])
+                elif bomtype == 'sl':
+                    sldfsdic.update(files[f][3])
+
+            for key2 in affected:
+                lone_sw_dic.pop(key2, None)
+                combined_dic.pop(key2, None)
+            # collect_checked_boms alters the BOMs given to it.  So give it copies.
+            swdic = {}
+            for key, dfsw in swdfsdic.items():
+                key2 = key.replace(' ', '') if cfg['del_whitespace'] else key
+                if key2 in affected:
+                    swdic[key] = dfsw.copy()
+            sldic = {k: sldfsdic[k].copy() for k in affected if k in sldfsdic}
+            i = len(printStrs)
+            if ('mtltest' in cfg) and cfg['mtltest']:
+                typeNotMtl({k: v.copy() for k, v in sldic.items()})
+            for printStr in printStrs[i:]:
+                print(printStr)
+            lone, combined = collect_checked_boms(swdic, sldic)
+            lone_sw_dic.update(lone)
+            combined_dic.update(combined)
+
+            session.results = concat_boms(list(lone_sw_dic.items()), list(combined_dic.items()))
+            print(f'{len(changed) + len(deleted)} file(s) changed; {len(swdic)} BOM(s) '
+                  f'rechecked in {time.perf_counter() - t0:.2f} seconds')
+            sheets = [(name, df) for name, df in [('BOM Check', getresults(1)),
+                                                  ('SW BOMs', getresults(0))]
+                      if df is not None and not df.empty]
+            if cfg.get('export') and sheets:
+                export2xlsx(cfg['export'], sheets, True)
+    except KeyboardInterrupt:
+        print('Stopped watching.')
+    return getresults(0), getresults(1)
+
+
+def scan_bom_files(dirname, followlinks=False):
+    ''' Find all _sw and _sl files within a directory and its
+    subdirectories.  (Used by the function "watch".)
+
+    calls: walk_dir, bom_type
+
+    Parameters
+    ----------
+    dirname: str
+        Name of the directory.
+    followlinks: bool, optional
+        If True, follow symbolic links to directories.  Default: False
+
+    Returns
+    -------
+    out: dict
+        {pathname: (mtime, size), ...}, where mtime is the time, in
+        nanoseconds, that the file was last modified, and size is the size of
+        the file in bytes.
+    '''
+    found = {}
+    for e in walk_dir(dirname, followlinks):
+        try:
+            if bom_type(e.name) in ('sw', 'sl') and e.is_file():
+                st = e.stat()
+                found[e.path] = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            continue
+    return found
+
+
 def export2xlsx(filename, df, run_bomcheck):  
-    '''Export to an Excel file.  
+    '''Export to an Excel file.  The file is written row by row with
+    xlsxwriter's constant_memory mode, so that even a very large DataFrame
+    is exported without much more memory being used.
     (This function is imported into bomcheckgui)
 
+    calls: write_sheet
+
     Parmeters
     =========
 
     filename: string
         Pathname where file is to be saved
 
-    df: DataFrame
-        Dataframe table that is exported.
+    df: DataFrame or list
+        Dataframe table that is exported.  Or a list of tuples,
+        [(sheet_name1, df1), (sheet_name2, df2), ...], in which case each
+        df is exported to its own sheet of the same workbook.  (A single
+        DataFrame is exported to a sheet named Sheet1.)
 
     run_bomcheck: bool
         If run_bomcheck it False the df object that shows includes slow moving
@@ -1663,44 +3541,7 @@ def export2xlsx(filename, df, run_bomcheck):
     out: None
     
     '''  
-    def len2(s):
-        ''' Extract from within a string either a decimal number truncated to two
-        decimal places, or an int value; then return the length of that substring.
-        Why used?  Q_sw, Q_sl, Q, converted to string, are on ocasion something
-        like 3.1799999999999997.  This leads to wrong length calc using len.'''
-        match = re.search(r"\d*\.\d\d|\d+", s)
-        if match:
-            return len(match.group())
-        else:
-            return 0
-        
-    def autosize_excel_columns(worksheet, df):
-        ''' Adjust column width of an Excel worksheet (ref.: https://stackoverflow.com/questions/
-            17326973/is-there-a-way-to-auto-adjust-excel-column-widths-with-pandas-excelwriter)'''
-        autosize_excel_columns_df(worksheet, df.index.to_frame())
-        autosize_excel_columns_df(worksheet, df, offset=df.index.nlevels)
-    
-    def autosize_excel_columns_df(worksheet, df, offset=0):
-        wrap_format = workbook.add_format({'text_wrap': True})
-        worksheet.set_row_pixels(0, 40)
-        worksheet.freeze_panes(1, 0)
-             
-        for idx, col in enumerate(df):
-            x = 1 # add a little extra width to the Excel column
-            series = df[col]
-            if df.columns[idx][0] == 'Q':
-                max_len = max((
-                    series.astype(str).map(len2).max(),
-                    len(str(series.name))
-                )) + x
-            else:
-                max_width_of_header = max([len(word) for word in str(series.name).split('\n')])
-                max_len = max([
-                    series.astype(str).map(len).max(),
-                    max_width_of_header
-                    ]) + x
-            worksheet.set_column(idx+offset, idx+offset, max_len, wrap_format)
-            
+    import xlsxwriter
     file_path = Path(filename)
     parent = file_path.parent
     stem = str(file_path.stem)
@@ -1711,31 +3552,130 @@ def export2xlsx(filename, df, run_bomcheck):
     else:
         name = stem + '.xlsx'
     fn = parent / name
-    
-    with pd.ExcelWriter(fn, engine='xlsxwriter') as writer:  #, if_sheet_exists='new'
-        df.to_excel(writer, sheet_name='Sheet1', startrow=1, header=False)
-         
-        # Get the xlsxwriter workbook and worksheet objects
-        workbook = writer.book
-        worksheet = writer.sheets['Sheet1']
-        # Add a header format. ref: https://xlsxwriter.readthedocs.io/working_with_pandas.html
-        header_format = workbook.add_format({
-            'bold': True,
-            'text_wrap': True,
-            'valign': 'top',
-            'align': 'center',
-            'fg_color': '#D7E4BC',
-            'border': 1})
-    
-        autosize_excel_columns(worksheet, df)           
-        headers = list(df.index.names) + list(df.columns)
-        # Write the column headers with the defined format.
-        for col_num, value in enumerate(headers):
-            worksheet.write(0, col_num + 0, value, header_format)   
-        worksheet.set_row(0, 50.001)
-        writer.close()
-        if len(str(fn))>10:
-            print(f'Saved to: {fn}') 
+
+    sheets = [('Sheet1', df)] if isinstance(df, pd.DataFrame) else df
+    workbook = xlsxwriter.Workbook(str(fn), {'constant_memory': True})
+    try:
+        for sheet_name, _df in sheets:
+            write_sheet(workbook, sheet_name, _df)
+    finally:
+        workbook.close()
+    if len(str(fn))>10:
+        print(f'Saved to: {fn}') 
+
+
+# No. of rows of a DataFrame that export2xlsx looks at to determine the
+# widths of the Excel columns.  If a DataFrame has more rows, a sample of them
+# is looked at.
+EXPORT_WIDTH_ROWS = 10000
+
+
+def write_sheet(workbook, sheet_name, df, chunksize=10000):
+    ''' Write df to a new sheet of an xlsxwriter workbook that is in
+    constant_memory mode; i.e. write rows in order, one after the other.
+    The layout is that of df.to_excel(): the index is at the left, with
+    repeated values of a MultiIndex merged.  Column headers are formatted,
+    and column widths fit the data.  (Used by export2xlsx.)
+
+    Parameters
+    ----------
+    workbook: xlsxwriter.Workbook
+        Workbook to add the sheet to.
+    sheet_name: str
+        Name of the new sheet.
+    df: DataFrame
+        DataFrame to write.
+    chunksize: int, optional
+        No. of rows of df converted to Python values at a time.
+        Default: 10000
+    '''
+    def len2(s):
+        ''' Vectorized: extract from within each string either a decimal
+        number truncated to two decimal places, or an int value; then return
+        the length of that substring.  Why used?  Q_sw, Q_sl, Q, converted
+        to string, are on ocasion something like 3.1799999999999997.  This
+        leads to wrong length calc using len.'''
+        return s.str.extract(r"(\d*\.\d\d|\d+)", expand=False).str.len().fillna(0)
+
+    worksheet = workbook.add_worksheet(sheet_name)
+    header_format = workbook.add_format({
+        'bold': True,
+        'text_wrap': True,
+        'valign': 'top',
+        'align': 'center',
+        'fg_color': '#D7E4BC',
+        'border': 1})
+    index_format = workbook.add_format({'bold': True, 'border': 1, 'align': 'center',
+                                        'valign': 'top'})   # as df.to_excel() formats the index
+    wrap_format = workbook.add_format({'text_wrap': True})
+
+    # Adjust column widths (ref.: https://stackoverflow.com/questions/17326973/
+    # is-there-a-way-to-auto-adjust-excel-column-widths-with-pandas-excelwriter).
+    # In constant_memory mode, this must be done before rows are written.
+    sample = df
+    if len(df) > EXPORT_WIDTH_ROWS:
+        sample = df.iloc[np.linspace(0, len(df) - 1, EXPORT_WIDTH_ROWS).astype(int)]
+    frame = sample.index.to_frame(index=False)
+    frame = pd.concat([frame, sample.reset_index(drop=True)], axis=1)
+    headers = list(df.index.names) + list(df.columns)
+    for idx, header in enumerate(headers):
+        x = 1 # add a little extra width to the Excel column
+        series = frame.iloc[:, idx].astype(str)
+        if str(header)[:1] == 'Q':
+            max_len = max(len2(series).max(), len(str(header))) + x
+        else:
+            max_width_of_header = max([len(word) for word in str(header).split('\n')])
+            max_len = max(series.str.len().max(), max_width_of_header) + x
+        worksheet.set_column(idx, idx, max_len, wrap_format)
+    worksheet.set_row(0, 50.001)
+    worksheet.freeze_panes(1, 0)
+
+    # Write the column headers with the defined format.
+    for col_num, value in enumerate(headers):
+        worksheet.write(0, col_num, value, header_format)
+
+    # Where each run of repeated values of a level of the index begins.  A
+    # run ends, too, where a run of a higher level ends.  (Like df.to_excel(),
+    # cells are merged for runs of all but the last level of a MultiIndex.)
+    nlevels = df.index.nlevels
+    if isinstance(df.index, pd.MultiIndex):
+        starts = []
+        new = np.zeros(len(df), dtype=bool)
+        for codes in df.index.codes[:-1]:
+            codes = np.asarray(codes)
+            new = new | np.concatenate([[True], codes[1:] != codes[:-1]])
+            starts.append(np.flatnonzero(new))
+        ends = [dict(zip(s.tolist(), (np.append(s[1:], len(df)) - 1).tolist())) for s in starts]
+    else:
+        ends = None
+    # merge_range() can't be used in constant_memory mode since it writes to
+    # rows not yet reached.  Instead, ranges to merge are appended to the
+    # worksheet's merge list, which xlsxwriter writes out when the workbook is
+    # closed.  That list isn't public, so if a version of xlsxwriter doesn't
+    # have it, index values are written unmerged, on every row.
+    can_merge = isinstance(getattr(worksheet, 'merge', None), list)
+
+    for chunk in range(0, len(df), chunksize):
+        block = df.iloc[chunk:chunk + chunksize]
+        index = block.index.to_frame(index=False)
+        columns = ([index.iloc[:, n].tolist() for n in range(nlevels)] +
+                   [block.iloc[:, n].tolist() for n in range(block.shape[1])])
+        for i, values in enumerate(zip(*columns)):
+            row = chunk + i
+            for col, value in enumerate(values):
+                if value is None or value is pd.NA or value != value:  # NaN
+                    value = ''
+                if col < nlevels:
+                    if ends is None or col == nlevels - 1 or not can_merge:
+                        worksheet.write(row + 1, col, value, index_format)
+                    elif row in ends[col]:
+                        worksheet.write(row + 1, col, value, index_format)
+                        if ends[col][row] > row:
+                            worksheet.merge.append([row + 1, col, ends[col][row] + 1, col])
+                    else:   # within merged cells
+                        worksheet.write_blank(row + 1, col, None, index_format)
+                elif value != '':
+                    worksheet.write(row + 1, col, value)
             
 
 def view_help(help_type='bomcheck_help', version='master', dbdic=None):
@@ -1755,6 +3695,7 @@ def view_help(help_type='bomcheck_help', version='master', dbdic=None):
     -------
     out : None
     '''
+    import webbrowser
     if dbdic and 'cfgpathname' in dbdic:
         # if dbdic provided, comes from bomcheckgui
         cfg.update(get_bomcheckcfg(dbdic['cfgpathname']))
@@ -1810,10 +3751,11 @@ def partsOnly(k, dic_assys):
     keys = list(dic_assys.keys())
     df = pd.concat(values)
 
-    __pn = get_col_name(df, cfg['part_num'])  # get the column name for pns
-    __qty = get_col_name(df, cfg['qty'])
-    __descrip = get_col_name(df, cfg['descrip'])
-    __um = get_col_name(df, cfg['um_sl'])
+    layout = column_layout(df)
+    __pn = layout['Item']  # get the column name for pns
+    __qty = layout['Q']
+    __descrip = layout['Description']
+    __um = layout['U']
 
     if not __um:
         printStr = ('\nYou used "partsonly" on a file that came from a CAD\n'
@@ -1867,46 +3809,109 @@ def csv_to_df(filename, descrip=['DESCRIPTION'], encoding=None):
         The BOM converted to a DataFrame
     '''
     with open(filename, encoding=encoding) as f:
-        data0 = f.readlines()
+        line0 = f.readline()
+        if not line0:
+            raise ValueError('File is empty: ' + filename)
+        n0 = line0.count(',')
+        if line0.strip()[-3:] == ',,,':   # if 1st line ends in 3 or more commas, line is not column headers
+            line1 = f.readline()
+            if not line1:
+                raise ValueError('No column headers found in ' + filename)
+            columns = line1.strip().split(',')
+        else:
+            columns = line0.strip().split(',')
 
-    n0 = data0[0].count(',')
-    if data0[0].strip()[-3:] == ',,,':   # if 1st line ends in 3 or more commas, line is not column headers
-        columns = data0[1].strip().split(',')
-        data1 = data0[2:]
-    else:
-        columns = data0[0].strip().split(',')
-        data1 = data0[1:]
+        n3 = None
+        for c in descrip:
+            if c in columns:
+                n3 = columns.index(c)  # n3 = number of commas before the word DESCRIPTION
+                break
+            else:
+                printStr = ('\n"DESCRIPTION" column (or equivalent) not found in the csv file\n')
+                printStrs.append(printStr)
 
-    for c in descrip:
-        if c in columns:
-            n3 = columns.index(c)  # n3 = number of commas before the word DESCRIPTION
-            break
-        else:
-            printStr = ('\n"DESCRIPTION" column (or equivalent) not found in the csv file\n')
-            printStrs.append(printStr)
+        # Read the file a chunk of lines at a time so that memory used stays
+        # small even for huge files.
+        arrays = []
+        maxlen = 0   # most no. of fields found in a row
+        while True:
+            lines = list(itertools.islice(f, 100000))
+            if not lines:
+                break
+            array, _maxlen = csv_lines_to_array(lines, n0, n3, len(columns))
+            arrays.append(array)
+            maxlen = max(maxlen, _maxlen)
+
+    if arrays and maxlen != len(columns):
+        raise ValueError(f'{len(columns)} columns passed, passed data had {maxlen} columns')
+    data = np.concatenate(arrays) if arrays else np.empty((0, len(columns)), dtype=object)
+    df = pd.DataFrame(data, columns=columns)
+    df = df.replace('', 0)
+    return df
+
+
+def csv_lines_to_array(lines, n0, n3, ncols):
+    ''' Split lines from a SolidWorks csv file into fields.  (Used by the
+    function csv_to_df.)  Lines that have the expected no. of commas, and
+    nothing that needs to be cleaned up, are parsed by pandas' fast csv
+    reader.  Other lines, e.g. those with commas within the DESCRIPTION
+    field, are repaired one at a time.
+
+    Parmeters
+    =========
+
+    lines: list
+        Lines read from the csv file.
 
-    data2 = list(map(lambda x: x.replace(',', '$') , data1)) # replace ALL commas with $
-    data = []
-    for row in data2:
+    n0: int
+        No. of commas in the first line of the csv file.
+
+    n3: int or None
+        No. of commas before the DESCRIPTION field in the header line.
+
+    ncols: int
+        No. of columns in the header line.
+
+    Returns
+    =======
+
+    out: tuple
+        (array, maxlen); where array is a 2-D numpy array of strings, one
+        row for each line, padded with None if a line has fewer than ncols
+        fields; and maxlen is the most fields found in a line.
+    '''
+    array = np.full((len(lines), ncols), None, dtype=object)
+    fast, slow = [], []
+    for i, line in enumerate(lines):
+        if (line.count(',') == n0 and '$' not in line and '<' not in line
+                and not line[:1].isspace() and not line.rstrip('\n')[-1:].isspace()
+                and n0 + 1 == ncols):
+            fast.append(i)
+        else:
+            slow.append(i)
+    maxlen = ncols if fast else 0
+    if fast:
+        text = '\n'.join(lines[i].rstrip('\n') for i in fast)
+        df = pd.read_csv(io.StringIO(text), header=None, names=range(ncols), dtype=str,
+                         na_filter=False, quoting=csv.QUOTE_NONE, skip_blank_lines=False)
+        array[fast] = df.to_numpy(dtype=object)
+    for i in slow:
+        row = lines[i].replace(',', '$')  # replace ALL commas with $
         row = re.sub('<[^>]+>', '', row) # if exists, remove junk like <FONT size=12PTS> from line
         n4 = row.count('$')
         if n4 != n0:
+            if n3 is None:
+                raise ValueError('"DESCRIPTION" column (or equivalent) not found in the csv file')
             # n5 = location of 1st $ character within the DESCRIPTION field that should be a , character
             n5 = row.replace('$', '?', n3).find('$')
             # In the DESCRIPTION field, replace the '$' chars with ',' chars
-            data.append(row[:n5] + row[n5:].replace('$', ',', (n4-n0))) # n4-n0: no. commas needed
-        else:
-            data.append(row)
-
-    dlist = []
-    for d in data:
-        dlist.append(d.strip().split('$'))
-    df = pd.DataFrame(dlist, columns=columns)
-    df = df.replace('', 0)
-    return df
-
-
-
+            row = row[:n5] + row[n5:].replace('$', ',', (n4-n0)) # n4-n0: no. commas needed
+        fields = row.strip().split('$')
+        if len(fields) > ncols:
+            raise ValueError(f'{ncols} columns passed, passed data had {len(fields)} columns')
+        array[i, :len(fields)] = fields
+        maxlen = max(maxlen, len(fields))
+    return array, maxlen
 
 
 # before program begins, create global variables
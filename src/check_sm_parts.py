@@ -11,13 +11,38 @@ currently being built so that slow_moving parts can be used up.
 """
 
 import pdb # use with pdb.set_trace()
+import numpy as np
 import pandas as pd
+import bisect
+import concurrent.futures
+from collections import Counter
 from difflib import SequenceMatcher
 import fnmatch
+import functools
+import heapq
 import re
 
 
-def check_sm_parts(files_list, sm_files, cfg):
+# Similarity scores of alternates are multiplied by a factor, e.g. .2, if a
+# regex is found in the description of a part but not in the description of
+# the alternate; e.g. if the part is stainless steel and the alternate is not.
+# More regexes can be added, and factors changed, with cfg['alter_score'].
+ALTER_SCORE = [(r'S/S|[^A-Z]SS[^A-Z]|304|316|STAINLESS|LSS|SST|[^A-Z]SS$', .2),
+               (r'NEMA 7|N7', .2), (r'24\s*V', .2), (r'1[0-2][0-5]\s*V', .2),
+               (r'230/460\s*V|230\s*V|460\s*V', .2), (r'575\s*V', .2), (r'200\s*V', .2)]
+
+# When alternates are searched for by description (cfg['alt_search'] =
+# 'descrip'), this many inventory parts with descriptions most like that of a
+# part are scored (or 4 times max_alternates if that is more).
+TRIGRAM_CANDIDATES = 50
+
+# Alternates are found in worker processes only if there are at least this
+# many pairs of parts to score; otherwise starting the workers takes longer
+# than the work saved.
+MIN_PARALLEL_PAIRS = 20000
+
+
+def check_sm_parts(files_list, sm_files, cfg, jobs=1, pool=None, layout=None):
     ''' Collect part numbers and their descriptions that come from SolidWorks
     and SyteLine.  Compare the part numbers to those from a list of slow_moving
     parts to see if any of the slow_moving parts can be substituted.
@@ -39,9 +64,9 @@ def check_sm_parts(files_list, sm_files, cfg):
         is in bomcheck.py.  cfg provides alternative header names that the
         BOMs might have, such as "Material", "PARTNUMBER", "PART NUMBER",
         "Part Number", "Item"; and "DESCRIPTION", "Material Description", and
-        "Description".  With these alternative names, this check_sm_parts
-        function figures out what the correct headers should be for the part
-        no. and descriptions fields.
+        "Description".  With these alternative names, layout (see below)
+        figures out what the correct headers should be for the part no. and
+        descriptions fields.
 
     pn_fltr : string
         Part no. filter.  Normally will be assigned a value like '....-....-'.
@@ -74,6 +99,22 @@ def check_sm_parts(files_list, sm_files, cfg):
 
         The default is ''.
 
+    jobs : int, optional
+        No. of worker processes used to score how similar the descriptions
+        of parts and of their alternates are.  Default: 1
+
+    pool : function, optional
+        Provides a pool of worker processes when used as "with pool(jobs) as
+        executor:".  bomcheck.py supplies its function worker_pool so that
+        the workers it keeps can be used.  Default: None, in which case a
+        concurrent.futures.ProcessPoolExecutor is started when needed.
+
+    layout : function, optional
+        Determines which columns of a BOM hold part nos. and descriptions;
+        i.e. bomcheck.py's function column_layout, which bomcheck.py
+        supplies.  Default: None, in which case bomcheck.column_layout is
+        used.
+
     Returns
     -------
     DataFrame
@@ -83,6 +124,7 @@ def check_sm_parts(files_list, sm_files, cfg):
     '''
     
     # extract from "cfg" args from the user.
+    by_descrip = str(cfg.get('alt_search', 'pn')).lower().startswith('descrip')
     try:
         pn_fltr = cfg['filter_pn'].text()
         descrip_filter = cfg['filter_descrip'].text() if cfg['filter_descrip'] else ''
@@ -93,14 +135,14 @@ def check_sm_parts(files_list, sm_files, cfg):
     ####################################################################################
     ##### create df and populate it.  df is a collection of BOMs from SW & SL      #####
     ####################################################################################
+    if layout is None:
+        from bomcheck import column_layout as layout
     df = pd.DataFrame() # start with an empty DataFrame
     for f in files_list:
         for k, v in f.items():
-            dfi = v.copy()
-            values = dict.fromkeys(cfg['part_num'], 'PN')   # make sure pns headers are all the same: pn
-            values.update(dict.fromkeys(cfg['descrip'], 'DESCRIPTION'))  # make sure descrip headers all the same: descrip
-            dfi.rename(columns=values, inplace=True)   # rename appropriate column headers to "PN" and "descrip"
-            dfi = dfi[['PN', 'DESCRIPTION']]
+            columns = layout(v)   # the headers of v that hold pns and descrips
+            dfi = pd.DataFrame({'PN': v[columns['Item']],
+                                'DESCRIPTION': v[columns['Description']]})
             df = pd.concat([df, dfi])
     df = df.drop_duplicates(subset=['PN'], keep='first')
     df['common_pn'] = df['PN'].str.extract('(' + pn_fltr +')')  # apply the pn_fltr
@@ -116,7 +158,8 @@ def check_sm_parts(files_list, sm_files, cfg):
     for k, v in sm_files.items():
         dfinv = pd.concat([dfinv, v])
 
-    df = df.dropna(subset=['common_pn'])  # drop rows that have NaN in column 'common_pn'
+    if not by_descrip:
+        df = df.dropna(subset=['common_pn'])  # drop rows that have NaN in column 'common_pn'
     df.reset_index(drop=True, inplace=True)
   
     # df doesn't haves cost of parts.  Get them from dfinv and put them into df.  
@@ -147,7 +190,8 @@ def check_sm_parts(files_list, sm_files, cfg):
     dfinv['common_pn'] = dfinv['Item'].str.extract('(' + pn_fltr +')')
     dfinv = dfinv.drop(dfinv.index[-1])
     dfinv['Description'] = dfinv['Description'].fillna('')
-    dfinv = dfinv.dropna(subset=['common_pn'])
+    if not by_descrip:
+        dfinv = dfinv.dropna(subset=['common_pn'])
     dfinv['Unit Cost'] = '$' + dfinv['Unit Cost'].round(2).astype('string')
     # dfinv = dfinv[dfinv['Movement?'] == 'No Demand']
     
@@ -161,34 +205,16 @@ def check_sm_parts(files_list, sm_files, cfg):
   
     
     ####################################################################################
-    ##### merge df & dfinv                                                         #####
-    ####################################################################################    
-    df = df.merge(dfinv, on='common_pn', how='inner')
-    df = df.drop('common_pn', axis=1)
-    
-    alter_score = [(r'S/S|[^A-Z]SS[^A-Z]|304|316|STAINLESS|LSS|SST', .2),
-                              (r'NEMA 7|N7', .2), (r'24V', .2), (r'125V|120V|115V|110V|100V', .2)]
-    
-    
+    ##### find alternates for each pn of df in dfinv                               #####
     ####################################################################################
-    ##### Finish up                                                                #####
-    ####################################################################################
-    
     # similarity_score is based on what the module SequenceMatcher produces.  However
     # I want the score reduced more if, for example, the "description" is SS and
     # "Description" is not SS.  In this case, reduce similarity_score by %20.
-    # The variable 'alter_score' looks for these adjustments.    
-    alter_score = [(r'S/S|[^A-Z]SS[^A-Z]|304|316|STAINLESS|LSS|SST|[^A-Z]SS$', .2),
-                              (r'NEMA 7|N7', .2), (r'24\s*V', .2), (r'1[0-2][0-5]\s*V', .2),
-                              (r'230/460\s*V|230\s*V|460\s*V', .2), (r'575\s*V', .2), (r'200\s*V', .2)] 
+    # The variable 'alter_score' looks for these adjustments.  (See ALTER_SCORE.)
+    alter_score = get_alter_score(cfg)
     
     df['DESCRIPTION'] = df['DESCRIPTION'].replace(0, 'missing description')
-        
-    similarity_score = df.apply(lambda row: SequenceMatcher(None, row['DESCRIPTION'], row['Description']).ratio(), axis=1) 
-    for alter in alter_score:
-        similarity_score = similarity_score.where(~(df['DESCRIPTION'].str.contains(alter[0],case=False, regex=True) &
-                                      ~df['Description'].str.contains(alter[0], case=False, regex=True)),
-										  similarity_score*alter[1])
+    
     # If someone enters a percent character, %, when indicating the min similarity he wishes
     # to see, for example 86%, the % chacter will crash the program.  So this program will
     # fix the problem by extracting the number, i.e. 86, from the text, i.e. 86%
@@ -200,10 +226,34 @@ def check_sm_parts(files_list, sm_files, cfg):
         min_similarity = float(match.group())
     else:
         min_similarity = 0    
-                
-    similarity_bool = similarity_score*100 > min_similarity
-    df['descr\nsimi-\nlarity'] = (similarity_score*100).round().astype(int)
-    df = df[similarity_bool]
+    
+    max_alternates = get_max_alternates(cfg)
+    
+    # Rather than merge df and dfinv on common_pn, which for a common_pn shared
+    # by many parts creates a row for every combination of them, look up
+    # alternates with an index of dfinv, and for each pn keep only the best
+    # max_alternates of them.
+    # With cfg['alt_search'] set to 'descrip', alternates are instead those
+    # of dfinv, of any pn, whose descriptions have the most trigrams in common
+    # with that of the pn.
+    if by_descrip:
+        descrip_index = TrigramIndex(dfinv['Description'].tolist())
+        k = max(TRIGRAM_CANDIDATES, 4*(max_alternates or 0))
+        inv_index = {i: descrip_index.search(d, k) for i, d in enumerate(df['DESCRIPTION'].tolist())}
+        keys = list(range(len(df)))
+    else:
+        inv_index = dfinv.groupby('common_pn', sort=False).indices  # {common_pn: row nos. of dfinv}
+        keys = df['common_pn'].tolist()
+    rows, inv_rows, scores = score_alternates(keys,
+                                     df['DESCRIPTION'].tolist(), inv_index,
+                                     dfinv['Description'].tolist(),
+                                     description_masks(df['DESCRIPTION'], alter_score),
+                                     description_masks(dfinv['Description'], alter_score),
+                                     [alter[1] for alter in alter_score],
+                                     min_similarity, max_alternates, jobs, pool)
+    df = pd.concat([df.iloc[rows].drop('common_pn', axis=1).reset_index(drop=True),
+                    dfinv.iloc[inv_rows].drop('common_pn', axis=1).reset_index(drop=True)], axis=1)
+    df['descr\nsimi-\nlarity'] = pd.Series(scores, dtype=float).mul(100).round().astype(int)
             
     # if leading or trailing spaces differ, for example, between a text
     # in one descrip and another, then the df.drop_duplicates() won't work
@@ -243,7 +293,282 @@ def check_sm_parts(files_list, sm_files, cfg):
                             'Yr n-1\nUsage': 'yr\nn-1\nusage', 'Yr n-2\nUsage': 'yr\nn-2\nusage',
                             'Last Used\n(Days)' : 'last\nused\n(days)'})   
     return df
-    
+
+
+class TrigramIndex:
+    ''' An index of the descriptions of parts in the slow moving inventory
+    that finds those descriptions that have the most character trigrams
+    (three character sequences, e.g. VAL, ALV, LVE of VALVE) in common with
+    a given description.  Case and extra whitespace are ignored.
+
+    Parameters
+    ----------
+    descrips: list
+        Descriptions of the inventory's parts.
+
+    Examples
+    --------
+    >>> index = TrigramIndex(['BALL VALVE SS', 'GATE VALVE', 'HOSE CLAMP'])
+    >>> index.search('VALVE, BALL', 2)
+    array([0, 1])
+    '''
+    def __init__(self, descrips):
+        self.vocab = {}   # {trigram: trigram no.}
+        doc_nos, gram_nos = [], []
+        self.lengths = np.zeros(len(descrips), dtype=np.int64)
+        for n, d in enumerate(descrips):
+            grams = [self.vocab.setdefault(g, len(self.vocab)) for g in trigrams(d)]
+            doc_nos += [n] * len(grams)
+            gram_nos += grams
+            self.lengths[n] = len(grams)
+        # Row nos. of descriptions having trigram no. g are
+        # self.postings[self.starts[g]:self.starts[g+1]], in ascending order.
+        gram_nos = np.array(gram_nos, dtype=np.int64)
+        order = np.argsort(gram_nos, kind='stable')
+        self.postings = np.array(doc_nos, dtype=np.int64)[order]
+        self.starts = np.zeros(len(self.vocab) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(gram_nos, minlength=len(self.vocab)), out=self.starts[1:])
+
+    def search(self, descrip, k):
+        ''' Return row nos., in ascending order, of the k descriptions (or
+        fewer if fewer have any trigram in common) most like descrip, as
+        measured by the Dice coefficient of their trigrams.  In a tie, lower
+        row nos. are preferred.'''
+        query = trigrams(descrip)
+        grams = [self.vocab[g] for g in query if g in self.vocab]
+        if not grams:
+            return np.zeros(0, dtype=np.int64)
+        found = np.concatenate([self.postings[self.starts[g]:self.starts[g+1]] for g in grams])
+        counts = np.bincount(found, minlength=len(self.lengths))
+        rows = np.flatnonzero(counts)
+        if len(rows) <= k:
+            return rows
+        score = counts[rows] / (len(query) + self.lengths[rows])
+        kth = np.partition(score, len(score) - k)[len(score) - k]   # kth highest score
+        above = rows[score > kth]
+        return np.sort(np.concatenate([above, rows[score == kth][:k - len(above)]]))
+
+
+def trigrams(descrip):
+    ''' Return the set of character trigrams of descrip, ignoring case and
+    extra whitespace.  (Used by TrigramIndex.)'''
+    if not isinstance(descrip, str):
+        return set()
+    d = ' ' + ' '.join(descrip.upper().split()) + ' '
+    return set(d[i:i+3] for i in range(len(d) - 2))
+
+
+def get_max_alternates(cfg):
+    ''' Return the max no. of alternates to show for each part no., or
+    None if there is no limit.  The value comes from cfg['max_alternates'],
+    which may be a number or text like "10".
+    '''
+    try:
+        value = cfg.get('max_alternates').text()
+    except:
+        value = cfg.get('max_alternates')
+    match = re.search(r'\d+', str(value)) if value is not None else None
+    if match and int(match.group()) > 0:
+        return int(match.group())
+    return None
+
+
+def get_alter_score(cfg):
+    ''' Return ALTER_SCORE with the changes made by cfg['alter_score'],
+    a list like [["EXPLOSION PROOF|XP", 0.5], ["NEMA 7|N7", 0.1]].  A regex
+    that is in ALTER_SCORE gets the new factor; others are added.  (No more
+    than 64 regexes are allowed.)
+    '''
+    alter_score = list(ALTER_SCORE)
+    regexes = [alter[0] for alter in alter_score]
+    for regex, factor in cfg.get('alter_score') or []:
+        if regex in regexes:
+            alter_score[regexes.index(regex)] = (regex, float(factor))
+        else:
+            alter_score.append((regex, float(factor)))
+            regexes.append(regex)
+    if len(alter_score) > 64:
+        raise ValueError('No more than 64 regexes are allowed in alter_score')
+    return alter_score
+
+
+def description_masks(series, alter_score):
+    ''' Classify each description of series with a bitmask: bit n is set
+    if the nth regex of alter_score is found in the description.  Each
+    distinct description is classified once only.  Returns a numpy array of
+    dtype uint64.
+    '''
+    codes, uniques = pd.factorize(series)
+    uniques = pd.Series(uniques, dtype=object)
+    masks = np.zeros(len(uniques) + 1, dtype=np.uint64)  # last one is for NaN, i.e. code -1
+    for bit, (regex, factor) in enumerate(alter_score):
+        found = uniques.str.contains(regex, case=False, regex=True, na=False).to_numpy(dtype=bool)
+        masks[:-1][found] |= np.uint64(1 << bit)
+    return masks[codes]
+
+
+def score_alternates(common_pns, descrips, inv_index, inv_descrips, masks,
+                     inv_masks, factors, min_similarity, max_alternates=None,
+                     jobs=1, pool=None):
+    ''' Do what the function find_alternates does, but if jobs is more than
+    1, split the part nos. into chunks and find their alternates in jobs
+    worker processes.  The results are the same, and in the same order, as
+    those of find_alternates.  (See find_alternates and check_sm_parts for
+    an explanation of the parameters.)
+    '''
+    work = [len(inv_index.get(pn, ())) for pn in common_pns]  # pairs to score for each pn
+    if jobs < 2 or sum(work) < MIN_PARALLEL_PAIRS:
+        return find_alternates(common_pns, descrips, inv_index, inv_descrips, masks,
+                               inv_masks, factors, min_similarity, max_alternates)
+    # Put part nos. into chunks, each having about the same no. of pairs to
+    # score.  Give each chunk only those rows of the inventory it needs.
+    target = sum(work) // (jobs * 4) + 1
+    bounds, start, n = [], 0, 0
+    for stop, w in enumerate(work, 1):
+        n += w
+        if n >= target or stop == len(work):
+            bounds.append((start, stop))
+            start, n = stop, 0
+    chunks, tasks = [], []
+    for start, stop in bounds:
+        pns = set(common_pns[start:stop]) & inv_index.keys()
+        if not pns:
+            continue
+        needed = np.unique(np.concatenate([inv_index[pn] for pn in pns]))
+        chunks.append((start, needed))
+        tasks.append((common_pns[start:stop], descrips[start:stop],
+                      {pn: np.searchsorted(needed, inv_index[pn]) for pn in pns},
+                      [inv_descrips[j] for j in needed.tolist()],
+                      masks[start:stop], inv_masks[needed],
+                      factors, min_similarity, max_alternates))
+    if pool is None:
+        pool = lambda jobs: concurrent.futures.ProcessPoolExecutor(max_workers=jobs)
+    rows, inv_rows, scores = [], [], []
+    with pool(jobs) as executor:
+        for (start, needed), (_rows, _inv_rows, _scores) in zip(chunks,
+                                executor.map(find_alternates, *zip(*tasks))):
+            rows += [start + i for i in _rows]
+            inv_rows += needed[_inv_rows].tolist()
+            scores += _scores
+    return rows, inv_rows, scores
+
+
+def find_alternates(common_pns, descrips, inv_index, inv_descrips, masks,
+                    inv_masks, factors, min_similarity, max_alternates=None):
+    ''' For each part no. of a BOM, find alternates in the slow moving
+    inventory that have the same common_pn, and score how similar their
+    descriptions are.
+
+    Parmeters
+    =========
+
+    common_pns: list
+        The common_pn of each part no. of the BOM; i.e. the key by which
+        alternates of the part no. are looked up in inv_index
+
+    descrips: list
+        Description of each part no. of the BOM
+
+    inv_index: dict
+        {common_pn: array of row nos. of the inventory having that common_pn}.
+        Row nos. are in ascending order.
+
+    inv_descrips: list
+        Description of each row of the inventory
+
+    masks, inv_masks: numpy arrays
+        Results of the function description_masks for descrips and
+        inv_descrips
+
+    factors: list
+        For each regex of alter_score, i.e. each bit of the masks, the
+        factor by which a score is multiplied when the regex is found in a
+        BOM description but not in the inventory description.
+
+    min_similarity: float
+        Only alternates scoring more than this, in percent, are kept.
+
+    max_alternates: int, optional
+        Keep no more than this many alternates per part no., those with the
+        highest scores.  Default: None, i.e. no limit.
+
+    Returns
+    =======
+
+    out: tuple
+        (rows, inv_rows, scores), three lists of equal length.  rows are
+        row nos. of the BOM, inv_rows are row nos. of the inventory, and
+        scores the similarity scores (0 to 1) of the two.  Alternates of a
+        part no. are in the order that they occur in the inventory.
+    '''
+    rows, inv_rows, scores = [], [], []
+    ratios = {}   # {(descrip, inv_descrip): ratio}, for descriptions that repeat
+    counts = {}   # {description: Counter of its characters}
+    penalties = {0: []}   # {bits set in a BOM mask but not in an inventory mask: factors}
+    prune = all(factor >= 0 for factor in factors)
+    for i, (common_pn, descrip) in enumerate(zip(common_pns, descrips)):
+        candidates = inv_index.get(common_pn)
+        if candidates is None:
+            continue
+        if masks[i]:
+            differ = (masks[i] & ~inv_masks[candidates]).tolist()
+        else:
+            differ = [0] * len(candidates)
+        found = []
+        for j, bits in zip(candidates.tolist(), differ):
+            inv_descrip = inv_descrips[j]
+            penalty = penalties.get(bits)
+            if penalty is None:
+                penalty = penalties[bits] = [factor for n, factor in enumerate(factors)
+                                             if bits >> n & 1]
+            if prune and not could_pass(descrip, inv_descrip, penalty, min_similarity, counts):
+                continue
+            score = ratios.get((descrip, inv_descrip))
+            if score is None:
+                score = SequenceMatcher(None, descrip, inv_descrip).ratio()
+                ratios[(descrip, inv_descrip)] = score
+            for factor in penalty:
+                score = score*factor
+            if score*100 > min_similarity:
+                found.append((j, score))
+        if max_alternates and len(found) > max_alternates:
+            # keep the highest scores, as shown in the results (rounded
+            # percent); in a tie, the one found first.
+            found = heapq.nsmallest(max_alternates, found,
+                                    key=lambda x: (-round(x[1]*100), x[0]))
+            found.sort()
+        for j, score in found:
+            rows.append(i)
+            inv_rows.append(j)
+            scores.append(score)
+    return rows, inv_rows, scores
+
+
+def could_pass(descrip, inv_descrip, penalty, min_similarity, counts):
+    ''' Return False if the similarity score of descrip and inv_descrip can't
+    be more than min_similarity; this without doing the costly calculation
+    of SequenceMatcher's ratio.  The score is the ratio multiplied by each
+    factor of penalty.  Upper bounds of the ratio are tried: first one
+    derived from the lengths of the descriptions (like SequenceMatcher's
+    real_quick_ratio), then one from the characters they have in common
+    (like quick_ratio).  counts, {description: Counter of its characters},
+    is filled in as descriptions are encountered.
+    '''
+    def passes(bound):
+        for factor in penalty:
+            bound = bound*factor
+        return bound*100 > min_similarity
+    length = len(descrip) + len(inv_descrip)
+    if not length:
+        return passes(1.0)
+    if not passes(2.0*min(len(descrip), len(inv_descrip))/length):
+        return False
+    for d in (descrip, inv_descrip):
+        if d not in counts:
+            counts[d] = Counter(d)
+    matches = sum((counts[descrip] & counts[inv_descrip]).values())
+    return passes(2.0*matches/length)
+
 
 def is_in(find, series, xcept):
     '''Argument "find" is a list of strings that are glob
@@ -296,21 +621,112 @@ def is_in(find, series, xcept):
     else:
         xcept = []
     series = series.astype(str).str.strip()  # ensure that all elements are strings & strip whitespace from ends
-    find2 = []
-    for f in find:
-        find2.append('^' + fnmatch.translate(str(f)) + '$')  # reinterpret user input with a regex expression
-    xcept2 = []
-    for x in xcept:  # exceptions is also a global variable
-        xcept2.append('^' +  fnmatch.translate(str(x))  + '$')
-    if find2 and xcept2:
-        filtr = (series.str.contains('|'.join(find2)) &  ~series.str.contains('|'.join(xcept2)))
-    elif find2:
-        filtr = series.str.contains('|'.join(find2))
+    if find:
+        filtr = glob_matcher(find, xcept).match(series)
     else:
         filtr = pd.Series([False]*series.size)
     return filtr
 
 
+def glob_matcher(find, xcept=()):
+    ''' Return a GlobMatcher for the glob expressions find and the
+    exceptions xcept.  A GlobMatcher is made only once for given find and
+    xcept lists, and is reused thereafter.'''
+    return _glob_matcher(tuple(str(f) for f in find), tuple(str(x) for x in xcept))
+
+
+@functools.lru_cache(maxsize=64)
+def _glob_matcher(find, xcept):
+    return GlobMatcher(find, xcept)
+
+
+class GlobMatcher:
+    ''' Finds which strings match any of a list of glob expressions (see
+    is_in), but none of a list of exceptions.  Matching is the same as that
+    of the regular expression "^" + fnmatch.translate(glob) + "$", but the
+    glob expressions are sorted out once, when the GlobMatcher is made:
+    those without wildcards, e.g. 3510-0200-025, are looked up in a set;
+    those whose only wildcard is a trailing *, e.g. 3086-*, by a binary
+    search of their sorted prefixes; and only the rest, e.g. 3*-025, are
+    combined into a regular expression.
+
+    Parameters
+    ----------
+    find: list
+        Glob expressions (strings).
+    xcept: list, optional
+        Glob expressions of exceptions to find.  Default: ()
+
+    Examples
+    --------
+    >>> m = GlobMatcher(['3086-*', '3*-025', '6602-0500-000'], ['3086-1*'])
+    >>> m.match(pd.Series(['3086-0050-000', '3086-1542-025', '3510-0200-025']))
+    0     True
+    1    False
+    2     True
+    dtype: bool
+    '''
+    def __init__(self, find, xcept=()):
+        self.find = GlobSet(find)
+        self.xcept = GlobSet(xcept) if xcept else None
+
+    def match(self, series):
+        ''' Return a boolean Series, with the index of series (a Series of
+        strings), that is True where a string matches.'''
+        values = series.to_numpy()
+        codes = None
+        if len(values) > 100:   # many pns repeat; test each only once
+            codes, values = pd.factorize(values)
+        found = self.find.match(values)
+        if self.xcept is not None:
+            found &= ~self.xcept.match(values)
+        if codes is not None:
+            found = found[codes]
+        return pd.Series(found, index=series.index, name=series.name)
+
+
+class GlobSet:
+    ''' A set of glob expressions, sorted out as described for
+    GlobMatcher.'''
+    def __init__(self, globs):
+        self.literals = set()
+        prefixes = set()
+        wildcards = []
+        for g in map(str, globs):
+            stem = g.rstrip('*')
+            if not any(c in g for c in '*?['):
+                self.literals.add(g)
+            elif not any(c in stem for c in '*?['):
+                prefixes.add(stem)
+            else:
+                wildcards.append('^' + fnmatch.translate(g) + '$')
+        # Keep only prefixes that don't begin with another prefix, e.g. drop
+        # 3086-1 if 3086- is present.  Then the only prefix that a string can
+        # begin with is the greatest prefix not greater than the string.
+        self.prefixes = []
+        for p in sorted(prefixes):
+            if not (self.prefixes and p.startswith(self.prefixes[-1])):
+                self.prefixes.append(p)
+        self.regex = re.compile('|'.join(wildcards)) if wildcards else None
+
+    def match(self, strings):
+        ''' Return a numpy boolean array that is True where a string of
+        the list strings matches a glob expression of the set.'''
+        found = np.zeros(len(strings), dtype=bool)
+        prefixes = self.prefixes
+        for n, s in enumerate(strings):
+            if s in self.literals:
+                found[n] = True
+            elif prefixes:
+                i = bisect.bisect_right(prefixes, s)
+                found[n] = i > 0 and s.startswith(prefixes[i - 1])
+        if self.regex is not None and not found.all():
+            rest = np.flatnonzero(~found)
+            search = self.regex.search
+            found[rest] = [search(strings[n]) is not None for n in rest]
+        return found
+
+
 
 
 